@@ -1,18 +1,13 @@
 import os
-import time
-import subprocess
-import pyodbc
-import concurrent.futures
-from selenium import webdriver
-from datetime import datetime
+import json
 import pandas as pd
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.action_chains import ActionChains
+import banco
+import carga
+import checkpoint
+import explore_http
+import medicao
+import normalizacao
+import tabelas
 
 """Config dotenv"""
 from dotenv import load_dotenv
@@ -31,88 +26,27 @@ load_dotenv(dotenv_path=env_path)
 #               FUNÇÕES DE TRATAMENTO DE DADOS            #
 ############################################################
 
-def converter_data(valor, formato="%Y-%m-%dT%H:%M:%S"):
-    if pd.isnull(valor):
-        return None
-
-    valor_str = str(valor).strip()
-    if not valor_str:
-        return None
-
-    try:
-        dt = datetime.strptime(valor_str, formato)
-        if dt.year < 1753 or dt.year > 9999:
-            return None
-        return dt
-    except ValueError:
-        return None
-    
+@medicao.medido('tratar_dados_created', linhas='resultado', linhas_em='linhas_buscadas')
 def tratar_dados_created(df):
-    mapping = {
-        "ID do ticket": "id_ticket",
-        "Status do ticket": "status_ticket",
-        "Nome do atribuído": "nome_atribuido",
-        "Canal do ticket": "canal_ticket",
-        "Canal de Entrada": "canal_entrada",
-        "Área retorno": "area_retorno",
-        "Função do solicitante": "funcao_solicitante",
-        "Função do emissor": "funcao_emissor",
-        "Criação do ticket - Carimbo de data/hora": "data_criacao",
-        "Resolução do ticket - Carimbo de data/hora": "data_resolucao",
-        "Problema": "problema",
-        "Dúvida": "duvida",
-        "Solicitação": "solicitacao",
-        "Outros": "outros",
-        "E-mail do solicitante": "email_solicitante",
-        "E-mail do emissor": "email_emissor",
-        "Nome da organização do ticket": "org_ticket",
-        "Nome da organização do solicitante": "org_solicitante",
-        "Marca do ticket": "marca_ticket",
-        "Formulário de ticket": "formulario_ticket"
-    }
-
-    df = df.rename(columns=mapping)
-    df = df[list(mapping.values())]
-
-    for col in ["data_criacao", "data_resolucao"]:
-        if col in df.columns:
-            df[col] = df[col].apply(lambda x: converter_data(x, "%Y-%m-%dT%H:%M:%S"))
-
-    # Substituir campos vazios ("", NaN, espaços) por None
-    df = df.map(lambda x: None if pd.isna(x) or str(x).strip() == "" else x)
+    # Nomes, colunas e formatos de data vêm do registro de tabelas.py
+    df = df.rename(columns=tabelas.mapeamento("BD_CreatedTicketsSAC"))
+    df = df[tabelas.colunas("BD_CreatedTicketsSAC")]
+
+    # Datas inválidas ou fora da faixa do SQL e campos vazios ("", espaços) viram NULL
+    df = normalizacao.normalizar(df, tabelas.formatos_data("BD_CreatedTicketsSAC"))
 
     print("✅ Dados de 'Created Tickets' tratados com sucesso.")
     return df
 
 
+@medicao.medido('tratar_dados_solved', linhas='resultado', linhas_em='linhas_buscadas')
 def tratar_dados_solved(df):
-    mapping = {
-        "ID do ticket": "id_ticket",
-        "Status do ticket": "status_ticket",
-        "Nome do atribuído": "nome_atribuido",
-        "Criação do ticket - Data": "data_criacao",
-        "Resolução do ticket - Data": "data_resolucao",
-        "Nome do emissor": "nome_emissor",
-        "Nome do solicitante": "nome_solicitante",
-        "Função do solicitante": "funcao_solicitante",
-        "Nome da organização do ticket": "org_ticket",
-        "Nome da organização do solicitante": "org_solicitante",
-        "Marca do ticket": "marca_ticket",
-        "Canal do ticket": "canal_ticket",
-        "Canal de Entrada": "canal_entrada",
-        "Formulário de ticket": "formulario_ticket",
-        "Função do emissor": "funcao_emissor"
-    }
-
-    df = df.rename(columns=mapping)
-    df = df[list(mapping.values())]
-
-    for col in ["data_criacao", "data_resolucao"]:
-        if col in df.columns:
-            df[col] = df[col].apply(lambda x: converter_data(x, "%Y-%m-%d"))
-
-    # Substituir campos vazios ("", NaN, espaços) por None
-    df = df.map(lambda x: None if pd.isna(x) or str(x).strip() == "" else x)
+    # Nomes, colunas e formatos de data vêm do registro de tabelas.py
+    df = df.rename(columns=tabelas.mapeamento("BD_SolvedTicketsSAC"))
+    df = df[tabelas.colunas("BD_SolvedTicketsSAC")]
+
+    # Datas inválidas ou fora da faixa do SQL e campos vazios ("", espaços) viram NULL
+    df = normalizacao.normalizar(df, tabelas.formatos_data("BD_SolvedTicketsSAC"))
 
     print("✅ Dados de 'Solved Tickets' tratados com sucesso.")
     return df
@@ -142,181 +76,97 @@ def exportar_para_excel(df_created, df_solved, caminho_arquivo="tickets_exportad
         print(f"❌ Erro ao exportar para Excel: {e}")
         return None
 
-def apagar_arquivos_dwnld(diretorio_absoluto):
+def apagar_arquivos_dwnld(caminhos):
     """
-    Apaga todos os arquivos .csv do diretório de download especificado.
-    
+    Apaga os CSVs recebidos (baixados ou retomados por esta execução). A pasta
+    não é varrida: ela também guarda os CSVs pendentes de outras execuções.
+
     Parâmetro:
-    - diretorio_absoluto: caminho absoluto da pasta (ex: dwnld_dir)
+    - caminhos: caminhos absolutos dos arquivos (ex: os valores de explore.executar_exportacoes)
     """
-    if not os.path.exists(diretorio_absoluto):
-        print(f"⚠️ Pasta '{diretorio_absoluto}' não encontrada.")
-        return
-
-    arquivos = [f for f in os.listdir(diretorio_absoluto) if f.lower().endswith(".csv")]
-    if not arquivos:
-        print("📁 Nenhum arquivo .csv para remover.")
-        return
-
-    for arquivo in arquivos:
+    for caminho in caminhos:
+        if not caminho or not os.path.exists(caminho):
+            continue
         try:
-            caminho = os.path.join(diretorio_absoluto, arquivo)
             os.remove(caminho)
-            print(f"🗑️ Arquivo removido: {arquivo}")
+            print(f"🗑️ Arquivo removido: {os.path.basename(caminho)}")
         except Exception as e:
-            print(f"❌ Erro ao remover {arquivo}: {e}")
+            print(f"❌ Erro ao remover {os.path.basename(caminho)}: {e}")
 
 
 ###########################################################
-#              CONFIGURAR BROWSER AUTOMATICAMENTE         #
+#                     CONECTAR AO BANCO                   #
 ###########################################################
 
-def configure_browser():
-    options = Options()
-    options.add_argument("--start-maximized")
-    options.add_argument("--disable-gpu")
+# Nome do processo no checkpoint local
+PROCESSO = 'explore_created_solved'
 
-    # Define diretório de download
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    download_dir = os.path.join(script_dir, "DWNLD")
-    os.makedirs(download_dir, exist_ok=True)
+# Linhas por chunk e threads gravando em paralelo (cada uma com uma conexão do pool)
+tamanho_chunk = 500
+max_workers_carga = max((os.cpu_count() or 2) - 1, 1)
 
-    prefs = {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "safebrowsing.enabled": True
-    }
-    options.add_experimental_option("prefs", prefs)
-
-    # Verifica versão do Chrome
+@medicao.medido('inserir_chunk', linhas='entrada')
+def inserir_chunk_generico(df_chunk, chunk_id, tabela_destino):
     try:
-        output = subprocess.check_output(
-            r'reg query "HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon" /v version',
-            shell=True
-        ).decode()
-        chrome_version = "Desconhecida"
-        for line in output.splitlines():
-            if "version" in line.lower():
-                chrome_version = line.split()[-1]
-                break
-    except Exception:
-        chrome_version = "Desconhecida"
-
-    print(f"🌐 Versão do Chrome instalada: {chrome_version}")
-
-    # Baixa ChromeDriver compatível
-    driver_path = ChromeDriverManager().install()
-    chromedriver_version = os.path.basename(os.path.dirname(driver_path))
-    print(f"🧩 Versão do ChromeDriver utilizada: {chromedriver_version}")
-
-    driver = webdriver.Chrome(service=Service(driver_path), options=options)
-    return driver, download_dir
-
-
-def aguardar_novo_download(diretorio, arquivos_antes, timeout=60):
-    """
-    Aguarda até que um novo arquivo CSV seja detectado na pasta de download.
-    Compara com a lista de arquivos existente ANTES de iniciar o download.
-    """
-    print("⏳ Aguardando novo arquivo CSV ser baixado...")
-    tempo_inicial = time.time()
-
-    while time.time() - tempo_inicial < timeout:
-        arquivos_atual = [f for f in os.listdir(diretorio) if f.lower().endswith(".csv")]
-        novos_arquivos = list(set(arquivos_atual) - set(arquivos_antes))
-
-        if novos_arquivos:
-            print(f"✅ Novo arquivo detectado: {novos_arquivos[0]}")
-            return os.path.join(diretorio, novos_arquivos[0])
-
-        time.sleep(2)
-
-    print("⚠️ Tempo limite atingido! Nenhum novo CSV encontrado.")
-    return None
-
-###########################################################
-#                     CONECTAR AO BANCO                   #
-###########################################################
+        # Colunas, tipos, tamanho máximo dos textos e chave do MERGE vêm do registro de tabelas.py
+        with banco.conexao() as conn:
+            afetadas, rejeitadas = tabelas.mesclar(
+                conn, tabela_destino, df_chunk, tamanho_lote=len(df_chunk) or 1,
+                descrever_linha=lambda linha: f"[Chunk {chunk_id}] {linha}"
+            )
 
-def inserir_chunk_generico(df_chunk, chunk_id, cnxn_str, tabela_destino):
-    try:
-        conn = pyodbc.connect(cnxn_str)
-        cursor = conn.cursor()
-
-        colunas = df_chunk.columns.tolist()
-        colunas_sql = ", ".join([f"[{col}]" for col in colunas])
-        placeholders = ", ".join(["?" for _ in colunas])
-        insert_sql = f"INSERT INTO {tabela_destino} ({colunas_sql}) VALUES ({placeholders})"
-
-        inserted_count = 0
-        for _, row in df_chunk.iterrows():
-            try:
-                valores = [str(v)[:255] if isinstance(v, str) else (None if pd.isna(v) else v) for v in row.tolist()]
-                cursor.execute(insert_sql, valores)
-                inserted_count += 1
-            except Exception as e:
-                print(f"[Chunk {chunk_id}] ⚠️ Erro ao inserir linha: {row.to_dict()}")
-                print("    > Erro:", e)
-
-        conn.commit()
-        cursor.close()
-        conn.close()
-        print(f"[Chunk {chunk_id}] ✅ Inseridos {inserted_count}/{len(df_chunk)} registros.")
+        print(f"[Chunk {chunk_id}] ✅ {afetadas} registros inseridos/atualizados ({rejeitadas} com erro) de {len(df_chunk)}.")
+        return True
     except Exception as e:
         print(f"[Chunk {chunk_id}] ❌ ERRO FATAL: {e}")
+        return False
 
-def inserir_dataframe_em_tabela(df, tabela_destino):
-
-    cnxn_str = (
-        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-        f"SERVER={os.getenv('DB_SERVER_EXCEL')},{os.getenv('DB_PORT_EXCEL')};"
-        f"DATABASE={os.getenv('DB_DATABASE_EXCEL')};"
-        f"UID={os.getenv('DB_USER_EXCEL')};"
-        f"PWD={os.getenv('DB_PASSWORD_EXCEL')};"
-        f"Timeout=60;"
-    )
-
-    batch_size = 500
-    chunks = [df.iloc[i:i+batch_size] for i in range(0, len(df), batch_size)]
+@medicao.medido('inserir_dataframe_em_tabela')
+def inserir_dataframe_em_tabela(dataframes, tabela_destino, chave_checkpoint=None):
+    """
+    Divide os dados em chunks de tamanho_chunk linhas e insere em paralelo.
+    dataframes pode ser um DataFrame ou uma sequência deles (ex: o CSV lido
+    em blocos); nesse caso cada bloco é gravado enquanto o próximo é lido.
+    Com chave_checkpoint, os chunks já gravados numa execução anterior são pulados.
+    Retorna True se todos os chunks foram gravados.
+    """
+    if isinstance(dataframes, pd.DataFrame):
+        dataframes = [dataframes]
 
-    max_workers = max(os.cpu_count() - 1, 1)
+    max_workers = max_workers_carga
+    banco.configurar_pool(max_workers)
     print(f"🚀 Iniciando inserção em {tabela_destino} com {max_workers} threads...")
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {
-            executor.submit(inserir_chunk_generico, chunk, idx, cnxn_str, tabela_destino): idx
-            for idx, chunk in enumerate(chunks)
-        }
+    chave = f"{tabela_destino}:{chave_checkpoint}" if chave_checkpoint else None
+    chunks_gravados = checkpoint.lotes_concluidos(PROCESSO, chave) if chave else set()
+    if chunks_gravados:
+        print(f"⏭️ {len(chunks_gravados)} chunk(s) já gravado(s) em execução anterior serão pulados.")
+
+    sucesso = carga.gravar_blocos_em_paralelo(
+        carga.dividir_em_blocos(dataframes, tamanho_chunk),
+        lambda chunk, idx: inserir_chunk_generico(chunk, idx, tabela_destino),
+        max_workers, pular=chunks_gravados,
+        ao_gravar=(lambda idx: checkpoint.marcar_lote_concluido(PROCESSO, chave, idx)) if chave else None,
+    )
 
-        for future in concurrent.futures.as_completed(futures):
-            idx = futures[future]
-            try:
-                future.result()
-            except Exception as e:
-                print(f"❌ Erro não tratado no chunk {idx}: {e}")
+    if sucesso and chave:
+        checkpoint.limpar_lotes(PROCESSO, chave)
+    return sucesso
 
 
-def remover_duplicatas_banco(tabela, colunas_chave):
+@medicao.medido('remover_duplicatas_banco', tempo_em='deduplicacao')
+def remover_duplicatas_banco(tabela, colunas_chave=None):
     """
     Remove registros duplicados de uma tabela SQL Server, mantendo o primeiro.
+    A carga já faz MERGE pela chave do registro (tabelas.py); esta varredura completa
+    fica só para limpar duplicatas antigas.
     
     Parâmetros:
     - tabela: nome da tabela (ex: "BD_CreatedTicketsSAC")
-    - colunas_chave: lista de colunas que formam a chave única
+    - colunas_chave: lista de colunas que formam a chave única (padrão: a chave do registro)
     """
     try:
-        cnxn_str = (
-        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-        f"SERVER={os.getenv('DB_SERVER_EXCEL')},{os.getenv('DB_PORT_EXCEL')};"
-        f"DATABASE={os.getenv('DB_DATABASE_EXCEL')};"
-        f"UID={os.getenv('DB_USER_EXCEL')};"
-        f"PWD={os.getenv('DB_PASSWORD_EXCEL')};"
-        f"Timeout=60;"
-        )
-        conn = pyodbc.connect(cnxn_str)
-        cursor = conn.cursor()
-
-        chave = ", ".join(colunas_chave)
+        chave = ", ".join(colunas_chave or tabelas.chave(tabela))
         delete_sql = f"""
             WITH CTE AS (
                 SELECT *,
@@ -330,112 +180,56 @@ def remover_duplicatas_banco(tabela, colunas_chave):
         """
 
         print(f"🔄 Removendo duplicatas da tabela {tabela}...")
-        cursor.execute(delete_sql)
-        conn.commit()
+        with banco.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute(delete_sql)
+            conn.commit()
+            cursor.close()
         print(f"✅ Duplicatas removidas da tabela {tabela} com base nas colunas: {chave}.")
 
-        cursor.close()
-        conn.close()
-
     except Exception as e:
         print(f"❌ Erro ao remover duplicatas da tabela {tabela}: {e}")
 
 
 ###########################################################
-#                       LOGIN ZENDESK                     #
+#                   EXPORTAÇÕES DO EXPLORE                #
 ###########################################################
 
-def login(driver):
+# O login e o navegador de cada exportação ficam no explore.py. Ele e o selenium só são
+# importados nas funções que usam o navegador: o modo HTTP e a retomada de CSVs não os carregam
+URL_DASHBOARD = "https://bagaggio.zendesk.com/explore/dashboard/6983FA0B966E9A19DDCC31139F34CADDEFF7B09ADB00D1A687A53FCA7BE6DBE7"
+
+def exportacoes_explore(opcao_scraping="ontem"):
     """
-    Realiza login na nova URL do dashboard da Zendesk.
+    Exportações deste dashboard (Created e Solved), no formato do explore.executar_exportacoes.
     """
-    url_login = "https://bagaggio.zendesk.com/explore/dashboard/6983FA0B966E9A19DDCC31139F34CADDEFF7B09ADB00D1A687A53FCA7BE6DBE7"
-    print("🔄 Acessando o site...")
-    driver.get(url_login)
-    time.sleep(3)
-
-    try:
-        email_input = driver.find_element(By.ID, "user_email")
-        email_input.send_keys(os.getenv('ZENDESK_EMAIL'))
-
-        senha_input = driver.find_element(By.ID, "user_password")
-        senha_input.send_keys(os.getenv('ZENDESK_PASSWORD'))
-
-        botao_entrar = driver.find_element(By.ID, "sign-in-submit-button")
-        botao_entrar.click()
-
-        time.sleep(5)
+    if opcao_scraping == "ontem":
+        filtrar = filtrar_por_data_ontem
+    elif opcao_scraping == "ultima_semana":
+        filtrar = filtrar_por_data_ultima_semana
+    else:
+        print("⚠️ Opção de filtro inválida.")
+        filtrar = None
 
-        if "dashboard" in driver.current_url:
-            print("✅ Login realizado com sucesso!")
-            return True
-        else:
-            print("⚠️ Erro ao fazer login!")
-            return False
-
-    except Exception as e:
-        print("⚠️ Erro no processo de login:", e)
-        return False
+    return [
+        {"nome": "created", "url": URL_DASHBOARD, "periodo": opcao_scraping,
+         "filtrar": filtrar, "baixar": baixar_created_tickets},
+        {"nome": "solved", "url": URL_DASHBOARD, "periodo": opcao_scraping,
+         "filtrar": filtrar, "baixar": baixar_solved_tickets},
+    ]
 
 ###########################################################
 #                   FILTRAR DATA                          #
 ###########################################################
 
 def filtrar_por_data_ultima_semana(driver):
-    try:
-        print("🔄 Aguardando o botão 'Tempo' estar visível...")
-        botao_tempo = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeTimeFilterWidget-2"))
-        )
-        botao_tempo.click()
-
-        botao_simples = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeSwitch-1"))
-        )
-        botao_simples.click()
-
-        ultima_semana = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, "//div[contains(text(), 'Última semana')]"))
-        )
-        ultima_semana.click()
-
-        botao_tempo_close = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeTimeFilterWidget-2"))
-        )
-        botao_tempo_close.click()
-
-        print("✅ Filtro de data (última semana) aplicado com sucesso!")
-
-    except Exception as e:
-        print("⚠️ Erro ao aplicar o filtro de data 'Última semana':", e)
+    # Se o filtro não for aplicado, explore.filtrar_periodo levanta RuntimeError e a exportação falha
+    import explore
+    explore.filtrar_periodo(driver, "Última semana")
 
 def filtrar_por_data_ontem(driver):
-    try:
-        print("🔄 Aguardando o botão 'Tempo' estar visível...")
-        botao_tempo = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeTimeFilterWidget-2"))
-        )
-        botao_tempo.click()
-
-        botao_simples = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeSwitch-1"))
-        )
-        botao_simples.click()
-
-        opcao_ontem = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, "//div[contains(text(), 'Ontem')]"))
-        )
-        opcao_ontem.click()
-
-        botao_tempo_close = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeTimeFilterWidget-2"))
-        )
-        botao_tempo_close.click()
-
-        print("✅ Filtro de data (ontem) aplicado com sucesso!")
-
-    except Exception as e:
-        print("⚠️ Erro ao aplicar o filtro de data 'Ontem':", e)
+    import explore
+    explore.filtrar_periodo(driver, "Ontem")
 
 ###########################################################
 #                     Created Tickets                     #
@@ -444,48 +238,19 @@ def filtrar_por_data_ontem(driver):
 def baixar_created_tickets(driver):
     """
     Clica na métrica 'Created tickets' (query ID: 205693081),
-    em seguida clica em 'Detalhar', aguarda o carregamento e exporta os dados.
+    em seguida clica em 'Detalhar', aguarda a tabela carregar e exporta os dados.
+    Se a página não responder no tempo de explore.timeouts, levanta RuntimeError.
     """
-    try:
-        # Etapa 1: clicar na métrica
-        print("🔎 Procurando a métrica 'Created tickets'...")
-        elemento = WebDriverWait(driver, 60).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "kpi-queryid-205693081"))
-        )
-        print("👆 Clicando na métrica 'Created tickets'...")
-        ActionChains(driver).move_to_element(elemento).pause(1).click().perform()
-        print("✅ Clique na métrica realizado com sucesso!")
-        time.sleep(3)
-
-        # Etapa 2: clicar no botão 'Detalhar'
-        print("🔍 Aguardando botão 'Detalhar' aparecer...")
-        botao_detalhar = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable(
-                (By.XPATH, "//div[contains(@class, 'drill-in')]/span[contains(text(), 'Detalhar')]")
-            )
-        )
-        print("🔄 Clicando no botão 'Detalhar'...")
-        botao_detalhar.click()
-        print("✅ Botão 'Detalhar' clicado com sucesso!")
-        time.sleep(5)
-
-        # Etapa 3: aguardar 30 segundos para garantir o carregamento
-        print("⏳ Aguardando 30 segundos para carregamento completo da tabela...")
-        time.sleep(30)
-
-        # Etapa 4: clicar no botão 'Exportar'
-        print("⬇️ Procurando botão 'Exportar' para iniciar download...")
-        botao_exportar = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable(
-                (By.XPATH, "//button[@data-test-id='drill-in-modal-export-button']")
-            )
-        )
-        print("🔄 Clicando no botão 'Exportar'...")
-        botao_exportar.click()
-        print("✅ Exportação iniciada!")
+    import explore
+    from selenium.webdriver.common.by import By
 
-    except Exception as e:
-        print("❌ Erro no processo de exportação de 'Created tickets':", e)
+    explore.clicar_metrica(driver, (By.CLASS_NAME, "kpi-queryid-205693081"), "Created tickets")
+    explore.abrir_detalhamento(driver)
+    botao_exportar = explore.aguardar_tabela(driver)
+
+    print("🔄 Clicando no botão 'Exportar'...")
+    botao_exportar.click()
+    print("✅ Exportação iniciada!")
 
 ###########################################################
 #                     Solved Tickets                      #
@@ -495,138 +260,221 @@ def baixar_created_tickets(driver):
 def baixar_solved_tickets(driver):
     """
     Clica na métrica 'Solved tickets' (query ID: 205693101),
-    em seguida clica em 'Detalhar', aguarda o carregamento e exporta os dados.
+    em seguida clica em 'Detalhar', aguarda a tabela carregar e exporta os dados.
+    Se a página não responder no tempo de explore.timeouts, levanta RuntimeError.
     """
-    try:
-        # Etapa 1: clicar na métrica
-        print("🔎 Procurando a métrica 'Solved tickets'...")
-        elemento = WebDriverWait(driver, 60).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "kpi-queryid-205693101"))
-        )
-        print("👆 Clicando na métrica 'Solved tickets'...")
-        ActionChains(driver).move_to_element(elemento).pause(1).click().perform()
-        print("✅ Clique na métrica realizado com sucesso!")
-        time.sleep(3)
-
-        # Etapa 2: clicar no botão 'Detalhar'
-        print("🔍 Aguardando botão 'Detalhar' aparecer...")
-        botao_detalhar = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable(
-                (By.XPATH, "//div[contains(@class, 'drill-in')]/span[contains(text(), 'Detalhar')]")
-            )
-        )
-        print("🔄 Clicando no botão 'Detalhar'...")
-        botao_detalhar.click()
-        print("✅ Botão 'Detalhar' clicado com sucesso!")
-        time.sleep(5)
-
-        # Etapa 3: aguardar 30 segundos para garantir o carregamento
-        print("⏳ Aguardando 30 segundos para carregamento completo da tabela...")
-        time.sleep(30)
-
-        # Etapa 4: clicar no botão 'Exportar'
-        print("⬇️ Procurando botão 'Exportar' para iniciar download...")
-        botao_exportar = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable(
-                (By.XPATH, "//button[@data-test-id='drill-in-modal-export-button']")
-            )
-        )
-        print("🔄 Clicando no botão 'Exportar'...")
-        botao_exportar.click()
-        print("✅ Exportação iniciada!")
+    import explore
+    from selenium.webdriver.common.by import By
 
-    except Exception as e:
-        print("❌ Erro no processo de exportação de 'Solved tickets':", e)
+    explore.clicar_metrica(driver, (By.CLASS_NAME, "kpi-queryid-205693101"), "Solved tickets")
+    explore.abrir_detalhamento(driver)
+    botao_exportar = explore.aguardar_tabela(driver)
+
+    print("🔄 Clicando no botão 'Exportar'...")
+    botao_exportar.click()
+    print("✅ Exportação iniciada!")
 
 
 ###########################################################
 #                     EXECUÇÃO PRINCIPAL                  #
 ###########################################################
 
-if __name__ == "__main__":
-    opcao_scraping = "ontem"
-    driver, dwnld_dir = configure_browser()
-
-    if login(driver):
-        if opcao_scraping == "ontem":
-            filtrar_por_data_ontem(driver)
-        elif opcao_scraping == "ultima_semana":
-            filtrar_por_data_ultima_semana(driver)
-        else:
-            print("⚠️ Opção de filtro inválida.")
-        
-        # ===== 1º DOWNLOAD: Created Tickets =====
-        arquivos_antes_1 = [f for f in os.listdir(dwnld_dir) if f.lower().endswith(".csv")]
-        baixar_created_tickets(driver)
-        aguardar_novo_download(dwnld_dir, arquivos_antes_1)
-
-        # ===== 2º DOWNLOAD: Solved Tickets =====
-        arquivos_antes_2 = [f for f in os.listdir(dwnld_dir) if f.lower().endswith(".csv")]
-        baixar_solved_tickets(driver)
-        aguardar_novo_download(dwnld_dir, arquivos_antes_2)
+# Linhas lidas do CSV por vez; cada leitura é tratada e gravada antes da próxima
+linhas_por_leitura = 20000
+
+# Pasta de download só deste script: a DWNLD também guarda os CSVs do ScrapTicketAtribuicao
+dwnld_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DWNLD", "criados_resolvidos")
+
+# Tabela de destino e tratamento de cada exportação
+DESTINOS = {
+    "created": ("BD_CreatedTicketsSAC", tratar_dados_created),
+    "solved": ("BD_SolvedTicketsSAC", tratar_dados_solved),
+}
+
+# Coluna filtrada pelo período em cada exportação (conferida nos CSVs baixados via HTTP)
+COLUNAS_PERIODO = {
+    "created": "data_criacao",
+    "solved": "data_resolucao",
+}
+
+def ler_csv_explore(arquivo, chunksize=None, usecols=None):
+    """
+    Lê um CSV exportado pelo Explore (caminho no disco).
+    Todas as colunas são lidas como texto (o tratamento converte as datas),
+    sem inferência de tipos. Com chunksize, devolve um leitor que entrega
+    o arquivo em DataFrames de chunksize linhas; com usecols, só aquelas colunas.
+    """
+    return pd.read_csv(arquivo, sep=";", encoding="utf-8-sig", dtype=str, chunksize=chunksize, usecols=usecols)
+
+def inserir_csv_em_tabela(arquivo, nome, chave_checkpoint=None):
+    """
+    Lê o CSV da exportação nome (created/solved) em blocos de linhas_por_leitura
+    linhas e grava cada bloco tratado na tabela de DESTINOS, sem carregar o
+    arquivo inteiro em memória.
+    Retorna True se todos os chunks foram gravados.
+    """
+    tabela, tratar = DESTINOS[nome]
+    with ler_csv_explore(arquivo, chunksize=linhas_por_leitura) as leitor:
+        return inserir_dataframe_em_tabela(map(tratar, leitor), tabela, chave_checkpoint)
 
+def conferir_csv_periodo(arquivo, nome, periodo):
+    """
+    Confere as datas do CSV inteiro da exportação nome antes de qualquer
+    gravação: só a coluna de COLUNAS_PERIODO é lida, em blocos.
+    Levanta explore_http.PeriodoDivergente se alguma data estiver fora do
+    período e ValueError se a coluna não existir no arquivo.
+    """
+    tabela, _ = DESTINOS[nome]
+    coluna = COLUNAS_PERIODO[nome]
+    origem = tabelas.origem(tabela, coluna)
+    formato = tabelas.formatos_data(tabela)[coluna]
+    with ler_csv_explore(arquivo, chunksize=linhas_por_leitura, usecols=[origem]) as leitor:
+        for df in leitor:
+            datas = normalizacao.converter_datas(df[origem], formato).to_frame(coluna)
+            explore_http.conferir_periodo(datas, coluna, periodo)
+
+def exportar_http(opcao_scraping):
+    """
+    Exporta Created e Solved sem navegador (explore_http), gravando cada CSV
+    só depois de conferir as datas do arquivo inteiro.
+    Retorna dict nome -> resultado (None nas que falharam).
+    """
+    return explore_http.exportar_varios(
+        {nome: lambda arquivo, nome=nome: inserir_csv_em_tabela(arquivo, nome) for nome in DESTINOS},
+        opcao_scraping,
+        {nome: lambda arquivo, nome=nome: conferir_csv_periodo(arquivo, nome, opcao_scraping) for nome in DESTINOS},
+    )
+
+def carregar_downloads_pendentes():
+    """
+    Pares de CSVs (created/solved) baixados em execuções anteriores que ainda
+    não foram gravados no banco, guardados no checkpoint local.
+    Pares com algum arquivo que sumiu são descartados.
+    """
+    valor = checkpoint.obter_cursor(PROCESSO)
+    if not valor:
+        return []
+
+    pendentes = json.loads(valor)
+    # Execuções antigas guardavam um único par
+    if isinstance(pendentes, dict):
+        pendentes = [pendentes]
+    existentes = [
+        arquivos for arquivos in pendentes
+        if all(caminho and os.path.exists(caminho) for caminho in arquivos.values())
+    ]
+    if len(existentes) != len(pendentes):
+        salvar_downloads_pendentes(existentes)
+    return existentes
+
+def salvar_downloads_pendentes(pendentes):
+    if pendentes:
+        checkpoint.salvar_cursor(PROCESSO, json.dumps(pendentes))
     else:
-        print("❌ Falha no login.")
-        driver.quit()
-        exit()
+        checkpoint.limpar_cursor(PROCESSO)
 
-    driver.quit()
+def inserir_arquivos(arquivos):
+    """
+    Grava no banco o par de CSVs (created e solved), retomando os chunks já
+    gravados de cada arquivo. Os dois são gravados mesmo se o primeiro falhar.
+    Retorna True se ambos foram gravados.
+    """
+    resultados = [
+        inserir_csv_em_tabela(arquivos[nome], nome, checkpoint.chave_arquivo(arquivos[nome]))
+        for nome in DESTINOS
+    ]
+    return all(resultados)
 
-    # Localizar os arquivos com base nas palavras-chave
-    arquivos_csv = os.listdir(dwnld_dir)
-    arquivo_created = next((f for f in arquivos_csv if "created" in f.lower() and f.endswith(".csv")), None)
-    arquivo_solved = next((f for f in arquivos_csv if "solved" in f.lower() and f.endswith(".csv")), None)
+def retomar_downloads_pendentes():
+    """
+    Grava os CSVs mantidos por execuções interrompidas e apaga os que foram
+    gravados. Retorna a lista dos pares que continuam pendentes.
+    """
+    pendentes = carregar_downloads_pendentes()
+    if not pendentes:
+        return []
+
+    print(f"♻️ {len(pendentes)} par(es) de CSVs de execuções anteriores encontrado(s). Gravando antes da exportação...")
+    restantes = []
+    for arquivos in pendentes:
+        if inserir_arquivos(arquivos):
+            apagar_arquivos_dwnld(arquivos.values())
+        else:
+            restantes.append(arquivos)
 
-    if arquivo_created and arquivo_solved:
-        caminho_created = os.path.join(dwnld_dir, arquivo_created)
-        caminho_solved = os.path.join(dwnld_dir, arquivo_solved)
+    salvar_downloads_pendentes(restantes)
+    if restantes:
+        print("⚠️ Retomada incompleta. Os CSVs foram mantidos para a próxima execução.")
+    return restantes
 
-        #acao = input("Escolha o que deseja fazer com os dados:\n1 - Exportar para Excel\n2 - Inserir no banco de dados\n>> ")
-        acao = '2'
+def executar(opcao_scraping="ontem", acao="2"):
+    """
+    Exporta Created e Solved do Explore ("ontem" ou "ultima_semana") e
+    exporta para Excel (acao "1") ou insere no banco (acao "2").
+    Antes, na inserção no banco, grava os CSVs pendentes de execuções anteriores.
+    Retorna True se a exportação do período e a retomada foram concluídas.
+    """
+    # CSVs mantidos por uma execução interrompida são gravados primeiro, sem substituir a exportação de hoje
+    pendentes = retomar_downloads_pendentes() if acao == "2" else carregar_downloads_pendentes()
+    concluido = False
+
+    if explore_http.modo_http and acao == "2":
+        # Sem navegador: as requisições capturadas são repetidas e cada CSV é conferido antes de ser gravado
+        resultados = exportar_http(opcao_scraping)
+        if all(resultados.values()):
+            concluido = True
+        else:
+            # O MERGE pela chave deixa repetir a carga pelo navegador sem duplicar linhas
+            print("⚠️ Exportação via HTTP indisponível ou incompleta. Voltando à exportação pelo navegador...")
+
+    arquivos = {}
+    guardados = False
+    if not concluido:
+        import explore
+
+        # Created e Solved são exportados ao mesmo tempo, com um único login
+        arquivos = explore.executar_exportacoes(exportacoes_explore(opcao_scraping), dwnld_dir)
+        if not arquivos:
+            print("❌ Falha no login.")
+            return False
+        if acao == "2" and all(arquivos.values()):
+            salvar_downloads_pendentes(pendentes + [arquivos])
+            guardados = True
 
-        if acao == "1":
-            df_created = pd.read_csv(caminho_created, sep=";", encoding="utf-8-sig")
-            df_solved = pd.read_csv(caminho_solved, sep=";", encoding="utf-8-sig")
+    # Cada exportação devolve o caminho exato do seu CSV
+    if not concluido and arquivos.get("created") and arquivos.get("solved"):
 
-            df_created_tratado = tratar_dados_created(df_created)
-            df_solved_tratado = tratar_dados_solved(df_solved)
+        if acao == "1":
+            df_created_tratado = tratar_dados_created(ler_csv_explore(arquivos["created"]))
+            df_solved_tratado = tratar_dados_solved(ler_csv_explore(arquivos["solved"]))
 
             exportar_para_excel(df_created_tratado, df_solved_tratado, "tickets_exportados.xlsx")
+            concluido = True
 
         elif acao == "2":
-            df_created = pd.read_csv(caminho_created, sep=";", encoding="utf-8-sig")
-            df_solved = pd.read_csv(caminho_solved, sep=";", encoding="utf-8-sig")
-
-            df_created_tratado = tratar_dados_created(df_created)
-            df_solved_tratado = tratar_dados_solved(df_solved)
-
-            inserir_dataframe_em_tabela(df_created_tratado, "BD_CreatedTicketsSAC")
-            inserir_dataframe_em_tabela(df_solved_tratado, "BD_SolvedTicketsSAC")
-
-            remover_duplicatas_banco(
-                "BD_CreatedTicketsSAC",
-                [
-                    "id_ticket", "status_ticket", "nome_atribuido", "canal_ticket",
-                    "canal_entrada", "area_retorno", "funcao_solicitante", "funcao_emissor",
-                    "data_criacao", "data_resolucao", "problema", "duvida", "solicitacao",
-                    "outros", "email_solicitante", "email_emissor", "org_ticket",
-                    "org_solicitante", "marca_ticket", "formulario_ticket"
-                ]
-            )
-            remover_duplicatas_banco(
-                "BD_SolvedTicketsSAC",
-                [
-                    "id_ticket", "status_ticket", "nome_atribuido", "data_criacao",
-                    "data_resolucao", "nome_emissor", "nome_solicitante", "funcao_solicitante",
-                    "org_ticket", "org_solicitante", "marca_ticket", "canal_ticket",
-                    "canal_entrada", "formulario_ticket", "funcao_emissor"
-                ]
-            )
+            concluido = inserir_arquivos(arquivos)
+            if concluido:
+                salvar_downloads_pendentes(pendentes)
+            else:
+                print("⚠️ Inserção incompleta. Os CSVs foram mantidos para retomar na próxima execução.")
 
         else:
             print("❌ Opção inválida.")
-        
-        apagar_arquivos_dwnld(dwnld_dir)
-        
-    else:
-        print("⚠️ Não foi possível localizar os dois arquivos (created e solved) na pasta de download.")
\ No newline at end of file
+            concluido = True
+
+    elif not concluido:
+        print("⚠️ Não foi possível obter os dois arquivos (created e solved).")
+
+    # Só os CSVs desta exportação saem da pasta, menos os guardados para a próxima retomada
+    if concluido or not guardados:
+        apagar_arquivos_dwnld(arquivos.values())
+    # Na inserção no banco, a execução só termina com os pendentes também gravados
+    return concluido and not (acao == "2" and pendentes)
+
+if __name__ == "__main__":
+    #acao = input("Escolha o que deseja fazer com os dados:\n1 - Exportar para Excel\n2 - Inserir no banco de dados\n>> ")
+    try:
+        executar(opcao_scraping="ontem", acao="2")
+    finally:
+        banco.fechar()
+        medicao.finalizar()
@@ -1,18 +1,13 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support import expected_conditions as EC
-import time
 import os
-import subprocess
+import json
 import pandas as pd
-import pyodbc
-import concurrent.futures
-from datetime import datetime
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+import banco
+import carga
+import checkpoint
+import explore_http
+import medicao
+import normalizacao
+import tabelas
 
 """Config dotenv"""
 from dotenv import load_dotenv
@@ -31,63 +26,27 @@ load_dotenv(dotenv_path=env_path)
 #               FUNÇÕES DE TRATAMENTO DE DADOS            #
 ############################################################
 
-def converter_data(valor):
-    """
-    Tenta converter o valor (string) no formato 'YYYY-MM-DDTHH:MM:SS' para datetime.
-    Se estiver fora do range permitido pelo DATETIME do SQL (1753-01-01 a 9999-12-31),
-    ou se houver erro de parsing, retorna None (inserido como NULL).
-    """
-    if pd.isnull(valor):
-        return None
-    
-    valor_str = str(valor).strip()
-    if not valor_str:
-        return None
-    
-    try:
-        dt = datetime.strptime(valor_str, "%Y-%m-%dT%H:%M:%S")
-        # Verifica se dt está no range do SQL DATETIME
-        if dt.year < 1753 or dt.year > 9999:
-            return None
-        return dt
-    except ValueError:
-        return None
-
-
+@medicao.medido('tratar_dados_atribuicao', linhas='resultado', linhas_em='linhas_buscadas')
 def tratar_dados(df):
     """
     Faz todos os tratamentos necessários no DataFrame:
       1) Renomeia colunas conforme mapping.
       2) Filtra as colunas essenciais.
       3) Converte Data_Atualizacao (se existir).
-      4) Substitui valores vazios em TODAS as colunas por NULL.
+      4) Substitui valores vazios nas colunas de texto por NULL.
     Retorna o DataFrame já tratado para inserção.
     """
-    # Mapeamento dos nomes do arquivo -> nomes que iremos usar no DF
-    mapping = {
-        "ID do ticket da atualização": "ID",
-        "Atualização - Carimbo de data/hora": "Data_Atualizacao",
-        "Grupo do ticket na atualização": "Grupo",
-        "Nome do atualizador": "Nome_Atualizador",
-        "Atribuído do ticket na atualização": "Atribuicao_Ticket",
-        "Status do ticket na atualização":  "status",
-        "Canal da atualização": "canal",
-        "Assunto do ticket": "assunto",
-        "Tipo de comentário": "tipo_comentario"
-    }
-    df = df.rename(columns=mapping)
+    # Mapeamento dos nomes do arquivo -> nomes que iremos usar no DF (registro de tabelas.py)
+    df = df.rename(columns=tabelas.mapeamento("BD_TicketsAtribuicaoSAC"))
 
     # Filtra somente as colunas que de fato precisamos inserir
-    colunas_desejadas = ["ID", "Data_Atualizacao", "Grupo", "Nome_Atualizador", "Atribuicao_Ticket", "status", "canal", "assunto", "tipo_comentario"]
+    colunas_desejadas = tabelas.colunas("BD_TicketsAtribuicaoSAC")
     colunas_existem = [c for c in colunas_desejadas if c in df.columns]
     df = df[colunas_existem]
 
-    # Converte data/hora se existir
-    if "Data_Atualizacao" in df.columns:
-        df["Data_Atualizacao"] = df["Data_Atualizacao"].apply(converter_data)
-
-    # Substitui valores vazios ("", NaN, pd.NA) por None em TODAS as colunas
-    df = df.map(lambda x: None if pd.isna(x) or str(x).strip() == "" else x)
+    # Converte data/hora se existir (fora do range do DATETIME do SQL ou inválida vira NULL)
+    # e substitui valores vazios ("", espaços) por NULL nas colunas de texto
+    df = normalizacao.normalizar(df, tabelas.formatos_data("BD_TicketsAtribuicaoSAC"))
 
     print("✅ Dados tratados com sucesso! Todas as colunas vazias foram convertidas para NULL.")
 
@@ -98,115 +57,103 @@ def tratar_dados(df):
 #            FUNÇÃO PARA INSERIR UM LOTE (BATCH)           #
 ############################################################
 
-def inserir_chunk(df_chunk, chunk_id, cnxn_str):
+# Nome do processo no checkpoint local
+PROCESSO = 'explore_atribuicao'
+
+# Linhas por chunk e threads gravando em paralelo (cada uma com uma conexão do pool)
+tamanho_chunk = 500
+max_workers_carga = max((os.cpu_count() or 2) - 1, 1)
+
+@medicao.medido('inserir_chunk', linhas='entrada')
+def inserir_chunk(df_chunk, chunk_id):
     """
-    Recebe um DataFrame (df_chunk), o índice do chunk (chunk_id),
-    e a string de conexão (cnxn_str).
-    Faz a conexão com o banco, insere cada linha em dbo.BD_TicketsAtribuicao.
+    Recebe um DataFrame (df_chunk) e o índice do chunk (chunk_id).
+    Pega uma conexão do pool do banco.py e insere as linhas em dbo.BD_TicketsAtribuicao.
     Se uma linha der erro, pula só aquela linha.
     Gera logs de sucesso/erro.
+    Retorna True se o chunk foi confirmado no banco.
     """
     try:
-        conn = pyodbc.connect(cnxn_str)
-        cursor = conn.cursor()
-        cursor.fast_executemany = True
-
-        insert_sql = """
-            INSERT INTO dbo.BD_TicketsAtribuicaoSAC
-            (ID, Data_Atualizacao, Grupo, Nome_Atualizador, Atribuicao_Ticket, status, canal, assunto, tipo_comentario)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-
-        inserted_count = 0
         total_lines = len(df_chunk)
 
-        for idx, row in df_chunk.iterrows():
-            try:
-                cursor.execute(
-                    insert_sql,
-                    row.get("ID"),
-                    row.get("Data_Atualizacao"),
-                    row.get("Grupo"),
-                    row.get("Nome_Atualizador"),
-                    row.get("Atribuicao_Ticket"),
-                    row.get("status"),
-                    row.get("canal"),
-                    row.get("assunto"),
-                    row.get("tipo_comentario")
-                )
-                inserted_count += 1
-            except Exception as e:
-                print(f"[Chunk {chunk_id}] ERRO ao inserir linha: {row.to_dict()}")
-                print("    > Erro:", e)
-                # Apenas pula a linha que deu erro
-
-        conn.commit()
-        cursor.close()
-        conn.close()
-
-        print(f"[Chunk {chunk_id}] Finalizado! Inseridos {inserted_count} de {total_lines} linhas.")
+        # Colunas ausentes no arquivo são gravadas como NULL (como o row.get fazia)
+        df_chunk = df_chunk.reindex(columns=tabelas.colunas("BD_TicketsAtribuicaoSAC"))
+
+        # O lote vai para a staging num único executemany e entra na tabela via MERGE pela chave do registro
+        with banco.conexao() as conn:
+            inserted_count, _ = tabelas.mesclar(
+                conn, "BD_TicketsAtribuicaoSAC", df_chunk, tamanho_lote=total_lines or 1,
+                descrever_linha=lambda linha: f"[Chunk {chunk_id}] {linha}"
+            )
+
+        print(f"[Chunk {chunk_id}] Finalizado! Inseridos/atualizados {inserted_count} de {total_lines} linhas.")
+        return True
 
     except Exception as e:
         print(f"[Chunk {chunk_id}] ERRO FATAL: {e}")
+        return False
+
+# Linhas lidas do CSV por vez; cada leitura é tratada e gravada antes da próxima
+linhas_por_leitura = 20000
+
+# Pasta de download só deste script: a DWNLD também guarda os CSVs do ScrapCriadosResolvidos
+dwnld_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DWNLD", "atribuicao")
+
+def ler_csv_explore(arquivo, chunksize=None, usecols=None):
+    """
+    Lê um CSV exportado pelo Explore (caminho no disco).
+    Todas as colunas são lidas como texto (o tratamento converte a data),
+    sem inferência de tipos. Com chunksize, devolve um leitor que entrega
+    o arquivo em DataFrames de chunksize linhas; com usecols, só aquelas colunas.
+    """
+    # Ajuste o 'sep' e o 'encoding' conforme seu CSV
+    return pd.read_csv(arquivo, sep=';', encoding='utf-8-sig', dtype=str, chunksize=chunksize, usecols=usecols)
+
+def inserir_csv(arquivo, chave=None):
+    """
+    Lê o CSV em blocos de linhas_por_leitura linhas e grava cada bloco tratado
+    enquanto o próximo é lido, sem carregar o arquivo inteiro em memória.
+    Retorna True se todos os chunks foram gravados.
+    """
+    with ler_csv_explore(arquivo, chunksize=linhas_por_leitura) as leitor:
+        return inserir_dataframe(leitor, chave)
+
+def conferir_csv_periodo(arquivo, periodo):
+    """
+    Confere a Data_Atualizacao do CSV inteiro antes de qualquer gravação
+    (só essa coluna é lida, em blocos). Levanta explore_http.PeriodoDivergente
+    se alguma data estiver fora do período e ValueError se a coluna não existir.
+    """
+    origem = tabelas.origem("BD_TicketsAtribuicaoSAC", "Data_Atualizacao")
+    formato = tabelas.formatos_data("BD_TicketsAtribuicaoSAC")["Data_Atualizacao"]
+    with ler_csv_explore(arquivo, chunksize=linhas_por_leitura, usecols=[origem]) as leitor:
+        for df in leitor:
+            datas = normalizacao.converter_datas(df[origem], formato).to_frame("Data_Atualizacao")
+            explore_http.conferir_periodo(datas, "Data_Atualizacao", periodo)
 
 def inserir_dados(filepath):
     """
-    Lê o arquivo (XLSX/XLS/CSV), chama a função de tratamento,
-    divide em batches de 500 linhas e insere em paralelo no banco.
+    Lê o arquivo (XLSX/XLS/CSV) e insere no banco (o CSV em streaming, com inserir_csv).
+    Os chunks já gravados deste mesmo arquivo numa execução anterior
+    (checkpoint local) são pulados, e o arquivo é apagado ao final.
+    Retorna True se todos os chunks foram gravados.
     """
+    chave = checkpoint.chave_arquivo(filepath)
+
+    print(">>> Arquivo sendo processado:", filepath)
+
     # 1) Ler o arquivo com pandas
     if filepath.lower().endswith(".csv"):
-        # Ajuste o 'sep' e o 'encoding' conforme seu CSV
-        df = pd.read_csv(filepath, sep=';', encoding='utf-8-sig')
+        sucesso = inserir_csv(filepath, chave)
     else:
-        df = pd.read_excel(filepath)
-
-    print(">>> Arquivo sendo processado:", filepath)
-    print(">>> Colunas detectadas antes do tratamento:", df.columns.tolist())
-
-    # 2) Tratar os dados
-    df_tratado = tratar_dados(df)
-
-    print(">>> Colunas finais após tratamento:", df_tratado.columns.tolist())
-    print(">>> Registros a inserir:", len(df_tratado))
-
-    # 3) Converte o DataFrame em chunks de 500 linhas
-    batch_size = 500
-    chunks = []
-    for start in range(0, len(df_tratado), batch_size):
-        end = start + batch_size
-        chunk_df = df_tratado.iloc[start:end]
-        chunks.append(chunk_df)
-
-    # 4) String de conexão com SQL Server
-    cnxn_str = (
-        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-        f"SERVER={os.getenv('DB_SERVER_EXCEL')},{os.getenv('DB_PORT_EXCEL')};"
-        f"DATABASE={os.getenv('DB_DATABASE_EXCEL')};"
-        f"UID={os.getenv('DB_USER_EXCEL')};"
-        f"PWD={os.getenv('DB_PASSWORD_EXCEL')};"
-        f"Timeout=60;"
-    )
+        sucesso = inserir_dataframe(pd.read_excel(filepath), chave)
 
-    # 5) Paralelismo: cria um ThreadPoolExecutor com (nucleos - 1) threads
-    max_workers = max(os.cpu_count() - 1, 1)
-    print(f">>> Iniciando inserções em paralelo (max_workers={max_workers})...")
+    if not sucesso:
+        print(f"⚠️ Nem todos os chunks foram gravados. O arquivo será mantido para retomar na próxima execução: {filepath}")
+        return False
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {}
-        for chunk_id, df_chunk in enumerate(chunks):
-            future = executor.submit(inserir_chunk, df_chunk, chunk_id, cnxn_str)
-            futures[future] = chunk_id
-
-        for future in concurrent.futures.as_completed(futures):
-            chunk_id = futures[future]
-            try:
-                future.result()
-                print(f">>> Chunk {chunk_id} concluído sem exceções.")
-            except Exception as e:
-                print(f">>> Chunk {chunk_id} gerou exceção não tratada: {e}")
-    
-    # 6) Após a conclusão da inserção, deletar o arquivo
+    # 2) Após a conclusão da inserção, deletar o arquivo
+    checkpoint.limpar_lotes(PROCESSO, chave)
     if os.path.exists(filepath):
         print(f"🗑️ Deletando arquivo: {filepath}")
         os.remove(filepath)
@@ -214,33 +161,70 @@ def inserir_dados(filepath):
     else:
         print("⚠️ Arquivo não encontrado para deleção.")
 
-    # 7) Remover duplicatas no banco
-    remover_duplicatas_banco()
-
     print(">>> FIM do processamento do arquivo:", filepath)
+    return True
+
+def tratar_blocos(dataframes):
+    # Trata cada bloco lido e registra as colunas e o total de linhas
+    total = 0
+    for indice, df in enumerate(dataframes):
+        if indice == 0:
+            print(">>> Colunas detectadas antes do tratamento:", df.columns.tolist())
+        df_tratado = tratar_dados(df)
+        if indice == 0:
+            print(">>> Colunas finais após tratamento:", df_tratado.columns.tolist())
+        total += len(df_tratado)
+        yield df_tratado
+    print(">>> Registros lidos:", total)
+
+@medicao.medido('inserir_dataframe')
+def inserir_dataframe(dataframes, chave=None):
+    """
+    Chama a função de tratamento, divide em batches de tamanho_chunk linhas
+    e insere em paralelo no banco.
+    dataframes pode ser um DataFrame ou uma sequência deles (ex: o CSV lido
+    em blocos); nesse caso cada bloco é gravado enquanto o próximo é lido,
+    com no máximo 2 * max_workers chunks em memória.
+    Com chave (checkpoint local), os chunks já gravados são pulados.
+    Retorna True se todos os chunks foram gravados.
+    """
+    if isinstance(dataframes, pd.DataFrame):
+        dataframes = [dataframes]
 
+    # 1) Tratar os dados e 2) dividir em chunks de tamanho_chunk linhas, à medida que são lidos
+    chunks = carga.dividir_em_blocos(tratar_blocos(dataframes), tamanho_chunk)
 
+    # 3) Paralelismo: cria um ThreadPoolExecutor com max_workers_carga threads (padrão: núcleos - 1),
+    #    cada uma com uma conexão do pool do banco.py
+    max_workers = max_workers_carga
+    banco.configurar_pool(max_workers)
+    print(f">>> Iniciando inserções em paralelo (max_workers={max_workers})...")
+
+    chunks_gravados = checkpoint.lotes_concluidos(PROCESSO, chave) if chave else set()
+    if chunks_gravados:
+        print(f">>> {len(chunks_gravados)} chunk(s) já gravado(s) em execução anterior serão pulados.")
+
+    def chunk_gravado(chunk_id):
+        if chave:
+            checkpoint.marcar_lote_concluido(PROCESSO, chave, chunk_id)
+        print(f">>> Chunk {chunk_id} concluído sem exceções.")
+
+    return carga.gravar_blocos_em_paralelo(
+        chunks, inserir_chunk, max_workers, pular=chunks_gravados, ao_gravar=chunk_gravado
+    )
+
+
+@medicao.medido('remover_duplicatas_banco', tempo_em='deduplicacao')
 def remover_duplicatas_banco():
     """
     Remove registros duplicados na tabela BD_TicketsAtribuicaoSAC.
     A chave única para remoção é baseada na concatenação de:
     ID + Data_Atualizacao + Nome_Atualizador + Atribuicao_Ticket + status + canal.
     Apenas uma ocorrência de cada combinação será mantida.
+    A carga já faz MERGE por essa chave (registro de tabelas.py); esta varredura
+    completa fica só para limpar duplicatas antigas.
     """
     try:
-        # Configuração da conexão com o SQL Server
-        cnxn_str = (
-            f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-            f"SERVER={os.getenv('DB_SERVER_EXCEL')},{os.getenv('DB_PORT_EXCEL')};"
-            f"DATABASE={os.getenv('DB_DATABASE_EXCEL')};"
-            f"UID={os.getenv('DB_USER_EXCEL')};"
-            f"PWD={os.getenv('DB_PASSWORD_EXCEL')};"
-            f"Timeout=60;"
-        )
-        conn = pyodbc.connect(cnxn_str)
-        cursor = conn.cursor()
-        cursor.fast_executemany = True
-
         print("🔄 Removendo registros duplicados...")
 
         # SQL para remover duplicatas, garantindo que apenas uma ocorrência seja mantida
@@ -271,12 +255,13 @@ def remover_duplicatas_banco():
                 row_num > 1;
         """
 
-        cursor.execute(delete_sql)
-        rows_deleted = cursor.rowcount  # Obtém o número de registros removidos
+        with banco.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute(delete_sql)
+            rows_deleted = cursor.rowcount  # Obtém o número de registros removidos
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
         print(f"✅ Remoção de duplicatas concluída! {rows_deleted} registros duplicados foram excluídos.")
 
@@ -285,85 +270,28 @@ def remover_duplicatas_banco():
 
 
 ###########################################################
-#                   CONFIGURAÇÃO SELENIUM                #
+#                   EXPORTAÇÃO DO EXPLORE                 #
 ###########################################################
 
-def configure_browser():
-    """
-    Configura o navegador Chrome com diretório de download e retorna o driver.
-    Utiliza o ChromeDriverManager para garantir compatibilidade com o navegador instalado.
-    """
-    options = Options()
-    options.add_argument("--start-maximized")
-    options.add_argument("--disable-gpu")
-
-    # Define diretório de download para os arquivos exportados
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    download_dir = os.path.join(script_dir, "DWNLD")
-    os.makedirs(download_dir, exist_ok=True)
-
-    prefs = {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "safebrowsing.enabled": True
-    }
-    options.add_experimental_option("prefs", prefs)
-
-    # Obtem a versão do Chrome instalada
-    try:
-        output = subprocess.check_output(
-            r'reg query "HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon" /v version',
-            shell=True
-        ).decode()
-        chrome_version = "Desconhecida"
-        for line in output.splitlines():
-            if "version" in line.lower():
-                chrome_version = line.split()[-1]
-                break
-    except Exception:
-        chrome_version = "Desconhecida"
-
-    print(f"🌐 Versão do Chrome instalada: {chrome_version}")
-
-    # Instala e utiliza o ChromeDriver compatível
-    driver_path = ChromeDriverManager().install()
-    chromedriver_version = os.path.basename(os.path.dirname(driver_path))
-    print(f"🧩 Versão do ChromeDriver utilizada: {chromedriver_version}")
-
-    driver = webdriver.Chrome(service=Service(driver_path), options=options)
-    return driver, download_dir
+# O login e o navegador da exportação ficam no explore.py. Ele e o selenium só são
+# importados nas funções que usam o navegador: o modo HTTP e o reprocessamento de CSVs não os carregam
+URL_DASHBOARD = "https://bagaggio.zendesk.com/explore/dashboard/58607DCDDC833A13BAC85055929A451A84C1AA411A997070F5CC00974813E3A6/tab/38874001"
 
-###########################################################
-#                     FUNÇÃO LOGIN                        #
-###########################################################
-
-def login(driver):
+def exportacoes_explore(opcao_scraping="ontem"):
     """
-    Acessa a página de login do Zendesk, insere as credenciais e faz login.
+    Exportação deste dashboard (Agent updates), no formato do explore.executar_exportacoes.
+    Retorna [] se a opção de filtro for inválida.
     """
-    url_login = "https://bagaggio.zendesk.com/explore/dashboard/58607DCDDC833A13BAC85055929A451A84C1AA411A997070F5CC00974813E3A6/tab/38874001"
-
-    print("🔄 Acessando o site...")
-    driver.get(url_login)
-    time.sleep(3)
-
-    email_input = driver.find_element(By.ID, "user_email")
-    email_input.send_keys(os.getenv('ZENDESK_EMAIL'))
-
-    senha_input = driver.find_element(By.ID, "user_password")
-    senha_input.send_keys(os.getenv('ZENDESK_PASSWORD'))
-
-    botao_entrar = driver.find_element(By.ID, "sign-in-submit-button")
-    botao_entrar.click()
-
-    time.sleep(5)
-
-    if "dashboard" in driver.current_url:
-        print("✅ Login realizado com sucesso!")
-        return True
+    if opcao_scraping == "ontem":
+        filtrar = filtrar_por_data_ontem
+    elif opcao_scraping == "ultima_semana":
+        filtrar = filtrar_por_data_ultima_semana
     else:
-        print("⚠️ Erro ao fazer login!")
-        return False
+        print("⚠️ Opção de scraping inválida. Nenhum download será realizado.")
+        return []
+
+    return [{"nome": "agent_updates", "url": URL_DASHBOARD, "periodo": opcao_scraping,
+             "filtrar": filtrar, "baixar": baixar_csv}]
 
 ###########################################################
 #                   FILTRAR DATA                          #
@@ -372,82 +300,22 @@ def login(driver):
 def filtrar_por_data_ultima_semana(driver):
     """
     Clica no botão de 'Tempo', depois em 'Simples', e seleciona 'Última semana'.
-    Em seguida, fecha a janela do filtro para permitir outros cliques,
-    utilizando WebDriverWait para garantir que cada elemento esteja clicável.
+    Em seguida, fecha a janela do filtro para permitir outros cliques.
+    Se algum passo falhar, levanta RuntimeError (explore.filtrar_periodo) e a
+    exportação é marcada como falha em vez de baixar outro período.
     """
-    try:
-        print("🔄 Aguardando o botão 'Tempo' estar visível...")
-        botao_tempo = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeTimeFilterWidget-2"))
-        )
-        print("🔄 Clicando no botão 'Tempo'...")
-        botao_tempo.click()
-
-        print("🔄 Aguardando a opção 'Simples' estar visível...")
-        botao_simples = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeSwitch-1"))
-        )
-        print("🔄 Clicando em 'Simples'...")
-        botao_simples.click()
-
-        print("🔄 Aguardando a opção 'Última semana' estar visível...")
-        ultima_semana = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, "//div[contains(text(), 'Última semana')]"))
-        )
-        print("🔄 Selecionando 'Última semana'...")
-        ultima_semana.click()
-
-        print("🔄 Aguardando o botão 'Tempo' (para fechar) estar visível...")
-        botao_tempo_close = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeTimeFilterWidget-2"))
-        )
-        print("🔄 Fechando o menu do filtro...")
-        botao_tempo_close.click()
-
-        print("✅ Filtro de data (última semana) aplicado com sucesso!")
-
-    except Exception as e:
-        print("⚠️ Erro ao aplicar o filtro de data 'Última semana':", e)
+    import explore
+    explore.filtrar_periodo(driver, "Última semana")
 
 def filtrar_por_data_ontem(driver):
     """
     Clica no botão de 'Tempo', depois em 'Simples', e seleciona 'Ontem'.
-    Em seguida, fecha a janela do filtro para permitir outros cliques,
-    utilizando WebDriverWait para garantir que cada elemento esteja clicável.
+    Em seguida, fecha a janela do filtro para permitir outros cliques.
+    Se algum passo falhar, levanta RuntimeError (explore.filtrar_periodo) e a
+    exportação é marcada como falha em vez de baixar outro período.
     """
-    try:
-        print("🔄 Aguardando o botão 'Tempo' estar visível...")
-        botao_tempo = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeTimeFilterWidget-2"))
-        )
-        print("🔄 Clicando no botão 'Tempo'...")
-        botao_tempo.click()
-
-        print("🔄 Aguardando a opção 'Simples' estar visível...")
-        botao_simples = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeSwitch-1"))
-        )
-        print("🔄 Clicando em 'Simples'...")
-        botao_simples.click()
-
-        print("🔄 Aguardando a opção 'Ontem' estar visível...")
-        opcao_ontem = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, "//div[contains(text(), 'Ontem')]"))
-        )
-        print("🔄 Selecionando 'Ontem'...")
-        opcao_ontem.click()
-
-        print("🔄 Aguardando o botão 'Tempo' (para fechar) estar visível...")
-        botao_tempo_close = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.ID, "bimeTimeFilterWidget-2"))
-        )
-        print("🔄 Fechando o menu do filtro...")
-        botao_tempo_close.click()
-
-        print("✅ Filtro de data (ontem) aplicado com sucesso!")
-
-    except Exception as e:
-        print("⚠️ Erro ao aplicar o filtro de data 'Ontem':", e)
+    import explore
+    explore.filtrar_periodo(driver, "Ontem")
 
 ###########################################################
 #               FAZER DOWNLOAD DO CSV                    #
@@ -457,171 +325,158 @@ def baixar_csv(driver):
     """
     Clica especificamente no número 'Agent updates' (kpi-queryid-199487651),
     depois no botão 'Detalhar', seleciona colunas e exporta o CSV.
+    Se a página não responder no tempo de explore.timeouts, levanta RuntimeError.
     """
-    try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        dwnld_dir = os.path.join(script_dir, "DWNLD")
-
-        # Aguarda a página carregar
-        time.sleep(5)
-
-        # **PASSO 1: Localizar o número da métrica "Agent updates" (kpi-queryid-199487651)**
-        print("🔄 Localizando o número da métrica (Agent updates)...")
-        numero_xpath = "//div[contains(@class,'kpi-first-measure-value') and contains(@class,'kpi-queryid-199487651')]"
-        numero_elemento = WebDriverWait(driver, 60).until(
-            EC.presence_of_element_located((By.XPATH, numero_xpath))
-        )
-
-        # Clique mais "realista": move até o elemento, faz pausa e clica
-        ActionChains(driver).move_to_element(numero_elemento).pause(1).click().perform()
-        print("✅ Número 'Agent updates' clicado!")
-
-        time.sleep(3)  # Espera o botão "Detalhar" aparecer
-
-        # **PASSO 2: Clicar no botão "Detalhar"**
-        print("🔄 Procurando botão 'Detalhar'...")
-        botao_detalhar = driver.find_element(
-            By.XPATH,
-            "//div[contains(@class, 'drill-in')]/span[contains(text(), 'Detalhar')]"
-        )
-        botao_detalhar.click()
-        print("✅ Clique em 'Detalhar' realizado!")
-
-        time.sleep(5)  # Aguarda carregamento da tela de detalhamento
-
-        # **PASSO 3: Aguardar a seta para baixo estar visível**
-        print("🔄 Aguardando a seta de seleção de colunas aparecer...")
-        seta_xpath = "//div[contains(@class, 'StyledTextFauxInput')]"
-        botao_seta = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, seta_xpath))
-        )
-
-        # **PASSO 4: Clicar na seta para abrir o menu de colunas**
-        print("🔄 Clicando na seta para abrir o menu de colunas...")
-        botao_seta.click()
-        time.sleep(2)
-        print("✅ Menu de colunas aberto com sucesso!")
-
-        # **PASSO 5: Selecionar colunas desejadas**
-        colunas_xpath = [
-            "//li[@id='downshift-1-item-6']",  # Status do ticket na atualização
-            "//li[@id='downshift-1-item-5']",  # Canal da atualização
-            "//li[@id='downshift-1-item-7']",  # Atribuído do ticket na atualização
-            "//li[@id='downshift-1-item-10']",  # Assunto do ticket
-        ]
-
-        for xpath in colunas_xpath:
-            try:
-                coluna = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, xpath))
-                )
-                coluna.click()
-                print(f"✅ Coluna selecionada: {coluna.text}")
-                time.sleep(1)
-            except Exception as e:
-                print(f"⚠️ Erro ao selecionar coluna {xpath}: {e}")
-
-        print("✅ Todas as colunas foram selecionadas!")
-
-        # **PASSO 6: Aguardar o botão 'Exportar' ficar clicável**
-        print("🔄 Aguardando o botão 'Exportar' aparecer e ficar clicável...")
-        botao_exportar_xpath = "//button[@data-test-id='drill-in-modal-export-button']"
-        botao_exportar = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.XPATH, botao_exportar_xpath))
-        )
-
-        # **PASSO 7 : Clicar no botão 'Exportar' para fechar o menu de colunas e Aguardar 30 segundos antes de clicar no botão (ou ajuste se quiser menos)****
-        print("🔄 Clicando no botão 'Exportar' para fechar o menu de colunas ...")
-        botao_exportar.click() 
-        print("⏳ Esperando 30 segundos depois de clicar no botão 'Exportar' para garantir que a tabela carregou ...")
-        time.sleep(30)
-
-        # **PASSO 8: Clicar no botão "Exportar"**
-        print("🔄 Clicando no botão 'Exportar' para fazer o download ...")
-        botao_exportar.click()
-        print("✅ Exportação iniciada!")
-
-        # **PASSO 9: Aguardar o download ser concluído**
-        aguardar_download(dwnld_dir)
-
-    except Exception as e:
-        print("⚠️ Erro ao abrir o menu de colunas, selecionar colunas ou exportar:", e)
-
-
-def aguardar_download(dwnld_dir, timeout=60):
-    """
-    Aguarda até que um arquivo CSV seja detectado na pasta de downloads.
-    """
-    print("⏳ Aguardando o download do arquivo CSV ser concluído...")
-    tempo_inicial = time.time()
+    import explore
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    # **PASSO 1: Clicar no número da métrica "Agent updates" (kpi-queryid-199487651)**
+    numero_xpath = "//div[contains(@class,'kpi-first-measure-value') and contains(@class,'kpi-queryid-199487651')]"
+    explore.clicar_metrica(driver, (By.XPATH, numero_xpath), "Agent updates")
+
+    # **PASSO 2: Clicar no botão "Detalhar"**
+    explore.abrir_detalhamento(driver)
+
+    # **PASSO 3: Aguardar a seta de seleção de colunas e abrir o menu de colunas**
+    print("🔄 Aguardando a seta de seleção de colunas aparecer...")
+    seta_xpath = "//div[contains(@class, 'StyledTextFauxInput')]"
+    explore.esperar(
+        driver, EC.element_to_be_clickable((By.XPATH, seta_xpath)), "A seta de seleção de colunas"
+    ).click()
+    print("✅ Menu de colunas aberto com sucesso!")
+
+    # **PASSO 4: Selecionar colunas desejadas**
+    colunas_xpath = [
+        "//li[@id='downshift-1-item-6']",  # Status do ticket na atualização
+        "//li[@id='downshift-1-item-5']",  # Canal da atualização
+        "//li[@id='downshift-1-item-7']",  # Atribuído do ticket na atualização
+        "//li[@id='downshift-1-item-10']",  # Assunto do ticket
+    ]
+
+    for xpath in colunas_xpath:
+        try:
+            coluna = WebDriverWait(driver, explore.timeouts['opcao']).until(
+                EC.element_to_be_clickable((By.XPATH, xpath))
+            )
+            coluna.click()
+            print(f"✅ Coluna selecionada: {coluna.text}")
+        except Exception as e:
+            print(f"⚠️ Erro ao selecionar coluna {xpath}: {e}")
+
+    print("✅ Todas as colunas foram selecionadas!")
+
+    # **PASSO 5: Clicar no botão 'Exportar' para fechar o menu de colunas**
+    print("🔄 Clicando no botão 'Exportar' para fechar o menu de colunas ...")
+    explore.esperar(
+        driver, EC.element_to_be_clickable(explore.seletores['exportar']), "O botão 'Exportar'"
+    ).click()
+
+    # **PASSO 6: Aguardar a tabela recarregar com as novas colunas e exportar**
+    botao_exportar = explore.aguardar_tabela(driver)
+    print("🔄 Clicando no botão 'Exportar' para fazer o download ...")
+    botao_exportar.click()
+    print("✅ Exportação iniciada!")
+    # O download é aguardado pelo explore.executar_exportacoes
 
-    while time.time() - tempo_inicial < timeout:
-        arquivos = [f for f in os.listdir(dwnld_dir) if f.endswith(".csv")]
-        if arquivos:
-            print(f"✅ Download concluído! Arquivo encontrado: {arquivos[0]}")
-            return arquivos[0]  # Retorna o nome do arquivo baixado
-        time.sleep(2)  # Aguarda 2 segundos antes de verificar novamente
-
-    print("⚠️ Tempo limite atingido! Nenhum arquivo CSV encontrado.")
-    return None
 
 ###########################################################
 #                     EXECUÇÃO PRINCIPAL                  #
 ###########################################################
 
-if __name__ == "__main__":
-    executar_scraping = True
-    executar_processamento = True
+def exportar_http(opcao_scraping):
+    """
+    Exporta as atualizações de agentes sem navegador (explore_http), gravando
+    o CSV só depois de conferir as datas do arquivo inteiro.
+    Retorna o resultado de inserir_csv, ou None se a exportação falhou.
+    """
+    return explore_http.exportar(
+        "agent_updates", inserir_csv, opcao_scraping,
+        conferir=lambda arquivo: conferir_csv_periodo(arquivo, opcao_scraping),
+    )
 
-    # Escolha entre "ontem" ou "ultima_semana"
-    opcao_scraping = "ontem"
+def carregar_arquivos_pendentes():
+    """
+    CSVs baixados por este script que ainda não foram gravados no banco,
+    guardados no checkpoint local. Os que sumiram da pasta são descartados.
+    """
+    valor = checkpoint.obter_cursor(PROCESSO)
+    pendentes = json.loads(valor) if valor else []
+    existentes = [caminho for caminho in pendentes if os.path.exists(caminho)]
+    if len(existentes) != len(pendentes):
+        salvar_arquivos_pendentes(existentes)
+    return existentes
+
+def salvar_arquivos_pendentes(pendentes):
+    if pendentes:
+        checkpoint.salvar_cursor(PROCESSO, json.dumps(pendentes))
+    else:
+        checkpoint.limpar_cursor(PROCESSO)
 
-    driver, dwnld_dir = configure_browser()
+def executar(opcao_scraping="ontem", executar_scraping=True, executar_processamento=True):
+    """
+    Exporta as atualizações de agentes do Explore ("ontem" ou "ultima_semana")
+    e grava no banco o CSV baixado e os que ficaram pendentes de execuções
+    anteriores (checkpoint local). Sem executar_scraping, só reprocessa os pendentes.
+    Outros CSVs da pasta DWNLD não são lidos nem apagados.
+    Retorna True se tudo foi gravado.
+    """
+    concluido = True
+    os.makedirs(dwnld_dir, exist_ok=True)
+    arquivos = carregar_arquivos_pendentes()
 
     if executar_scraping:
-        if login(driver):
-            if opcao_scraping == "ontem":
-                # Filtrar ontem e baixar
-                filtrar_por_data_ontem(driver)
-                baixar_csv(driver)
-
-                # Fechando navegador
-                driver.quit()
-
+        exportacoes = exportacoes_explore(opcao_scraping)
+
+        # Sem navegador: a requisição capturada é repetida e o CSV é conferido antes de ser gravado
+        if exportacoes and explore_http.modo_http:
+            sucesso = exportar_http(opcao_scraping)
+            if sucesso is not None:
+                if not sucesso:
+                    print("⚠️ Inserção incompleta dos dados exportados via HTTP.")
+                    concluido = False
+                exportacoes = []
+            else:
+                print("⚠️ Exportação via HTTP indisponível. Voltando à exportação pelo navegador...")
 
-            elif opcao_scraping == "ultima_semana":
-                # Filtrar última semana e baixar
-                filtrar_por_data_ultima_semana(driver)
-                baixar_csv(driver)
+        if exportacoes:
+            import explore
 
-                # Fechando navegador
-                driver.quit()
+            baixados = explore.executar_exportacoes(exportacoes, dwnld_dir)
+            if not baixados:
+                print("⚠️ Falha no login. A extração não será realizada.")
+                concluido = False
+            elif not all(baixados.values()):
+                print("⚠️ Nem todas as exportações foram baixadas.")
+                concluido = False
 
-            else:
-                print("⚠️ Opção de scraping inválida. Nenhum download será realizado.")
-        else:
-            print("⚠️ Falha no login. A extração não será realizada.")
+            # O CSV baixado fica no checkpoint até ser gravado, para a próxima execução retomar
+            arquivos += [caminho for caminho in (baixados or {}).values() if caminho]
+            salvar_arquivos_pendentes(arquivos)
 
     if executar_processamento:
-        # Em vez de aguardar 1 download específico, iremos processar TODOS os .csv que já estiverem na pasta
-        csv_encontrados = [f for f in os.listdir(dwnld_dir) if f.lower().endswith(".csv")]
-
-        if not csv_encontrados:
+        if not arquivos:
             print("⚠️ Nenhum arquivo CSV encontrado para processar!")
         else:
-            print(f"📂 Arquivos detectados: {csv_encontrados}. Iniciando processamento...")
-
-            for nome_arquivo_csv in csv_encontrados:
-                caminho_arquivo = os.path.join(dwnld_dir, nome_arquivo_csv)
-                print(f"🔄 Processando arquivo: {caminho_arquivo}")
-
-                # 1) Tratar e inserir no banco
-                inserir_dados(caminho_arquivo)
+            print(f"📂 Arquivos a processar: {[os.path.basename(c) for c in arquivos]}. Iniciando processamento...")
+
+            # inserir_dados apaga cada arquivo gravado por completo
+            pendentes = [caminho for caminho in arquivos if not inserir_dados(caminho)]
+            salvar_arquivos_pendentes(pendentes)
+            if pendentes:
+                print(f"⚠️ Arquivos mantidos para retomar na próxima execução: {[os.path.basename(c) for c in pendentes]}")
+                concluido = False
+            else:
+                print("🗑️ Todos os arquivos .csv processados foram removidos.")
 
-            # 3) Excluir TODOS os .csv após o processamento
-            for f in os.listdir(dwnld_dir):
-                if f.lower().endswith(".csv"):
-                    os.remove(os.path.join(dwnld_dir, f))
-            print("🗑️ Todos os arquivos .csv foram removidos.")
+    return concluido
 
-    print("🏁 Fim da execução.")
\ No newline at end of file
+if __name__ == "__main__":
+    # Escolha entre "ontem" ou "ultima_semana"
+    try:
+        executar(opcao_scraping="ontem", executar_scraping=True, executar_processamento=True)
+    finally:
+        banco.fechar()
+        medicao.finalizar()
+    print("🏁 Fim da execução.")
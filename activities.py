@@ -1,13 +1,15 @@
-import requests
-from requests.auth import HTTPBasicAuth
 import pandas as pd
 from datetime import datetime, timezone
-import time
 import pyodbc
 import json
-import numpy as np
-import re
 import os
+import queue
+import threading
+import banco
+import checkpoint
+import medicao
+import tabelas
+import zendesk_http
 
 """Config dotenv"""
 from dotenv import load_dotenv
@@ -22,55 +24,226 @@ def localizar_env(diretorio_raiz="PRIVATE_BAG.ENV"):
 env_path = localizar_env()
 load_dotenv(dotenv_path=env_path)
 
-# Dados de autenticação
-email_address = os.getenv('ZENDESK_EMAIL')
-api_token = os.getenv('ZENDESK_TOKEN')
-auth = HTTPBasicAuth(f'{email_address}/token', api_token)
-
-# Configuração do banco de dados
-db_config = {
-    'driver': 'ODBC Driver 17 for SQL Server',
-    'server': f"{os.getenv('DB_SERVER_EXCEL')},{os.getenv('DB_PORT_EXCEL')}",
-    'database': os.getenv('DB_DATABASE_EXCEL'),
-    'uid': os.getenv('DB_USER_EXCEL'),
-    'pwd': os.getenv('DB_PASSWORD_EXCEL')
-}
+# A autenticação na API (ZENDESK_EMAIL / ZENDESK_TOKEN) é feita pelo zendesk_http
 
-def buscar_atividades():
+# A conexão com o banco (DB_*_EXCEL) vem do pool do banco.py
+
+# Nome do processo no checkpoint local
+PROCESSO = 'atividades'
+
+# Pipeline de streaming: páginas tratadas e gravadas juntas e páginas aguardando na fila
+paginas_por_lote = 5
+tamanho_fila = 10
+
+# Linhas por executemany na carga do banco
+tamanho_lote = 1000
+
+URL_ATIVIDADES = 'https://bagaggio.zendesk.com/api/v2/activities'  # sem parâmetro 'since'
+
+def carregar_estado_paginacao():
     """
-    Busca todas as atividades dos últimos 30 dias na API do Zendesk
-    (o endpoint /activities só guarda 30 dias).
-    Faz paginação sequencial até não haver next_page.
-    Retorna uma lista de dict (json).
+    Lê do checkpoint o estado da paginação da execução anterior
+    (próxima URL ainda não gravada, número da página e data da execução).
+    Estados de outro dia são descartados, pois a janela de 30 dias já mudou.
     """
-    url = 'https://bagaggio.zendesk.com/api/v2/activities'  # sem parâmetro 'since'
-    atividades_data = []
-    page_count = 1
+    valor = checkpoint.obter_cursor(PROCESSO)
+    if not valor:
+        return None
 
+    estado = json.loads(valor)
+    if estado.get('data') != datetime.now().strftime('%Y-%m-%d'):
+        checkpoint.limpar_cursor(PROCESSO)
+        return None
+    return estado
+
+def paginar_atividades(url=URL_ATIVIDADES, page_count=1):
+    """
+    Percorre o endpoint /activities seguindo o next_page.
+    Para cada página devolve (atividades, próxima URL, número da página).
+    Se uma página falhar (depois das repetições do zendesk_http), levanta
+    RuntimeError para que quem consome não trate a janela como completa.
+    """
     while url:
         print(f"Buscando página {page_count} -> {url}")
-        response = requests.get(url, auth=auth)
-        if response.status_code != 200:
-            print(f'Erro ao buscar atividades: {response.status_code}')
-            print(f'Mensagem da API: {response.text}')
-            break
-
-        data = response.json()
-        atividades = data.get('activities', [])
+        with medicao.etapa('buscar_pagina_atividades', linhas_em='linhas_buscadas', pagina=page_count) as registro:
+            response = zendesk_http.get(url)
+            if response.status_code != 200:
+                print(f'Erro ao buscar atividades: {response.status_code}')
+                print(f'Mensagem da API: {response.text}')
+                raise RuntimeError(f'Página {page_count} de atividades não pôde ser buscada (HTTP {response.status_code})')
+
+            data = response.json()
+            atividades = data.get('activities', [])
+            registro['linhas'] = len(atividades)
         print(f'Atividades nesta página: {len(atividades)}')
 
-        atividades_data.extend(atividades)
         url = data.get('next_page')  # Será None/null quando acabar
+        yield atividades, url, page_count
         page_count += 1
-        time.sleep(1)  # Pausa para evitar sobrecarga
+
+@medicao.medido('buscar_atividades', linhas='resultado')
+def buscar_atividades():
+    """
+    Busca todas as atividades dos últimos 30 dias na API do Zendesk
+    (o endpoint /activities só guarda 30 dias).
+    Faz paginação sequencial até não haver next_page.
+    Retorna uma lista de dict (json).
+    Usada na exportação para Excel; a carga no banco usa executar_pipeline.
+    """
+    atividades_data = []
+    try:
+        for atividades, _, _ in paginar_atividades():
+            atividades_data.extend(atividades)
+    except RuntimeError as e:
+        print(f'Paginação interrompida: {e}')
 
     print(f"Total de atividades coletadas: {len(atividades_data)}")
     return atividades_data
 
+def executar_pipeline():
+    """
+    Busca e grava as atividades em streaming: uma thread pagina a API e
+    coloca as páginas numa fila limitada (tamanho_fila) enquanto esta thread
+    trata e grava cada grupo de paginas_por_lote páginas. A memória fica
+    limitada à fila e a rede e o banco trabalham ao mesmo tempo.
+    Depois de cada grupo tratado e gravado, a próxima URL vai para o checkpoint,
+    e uma execução interrompida retoma dali (o MERGE torna a regravação
+    inofensiva). Se o tratamento ou a gravação falhar, levanta RuntimeError
+    sem avançar o cursor.
+    Retorna o total de atividades gravadas, ou None se a paginação foi interrompida.
+    """
+    hoje = datetime.now().strftime('%Y-%m-%d')
+    url, page_count = URL_ATIVIDADES, 1
+    estado = carregar_estado_paginacao()
+    if estado:
+        url, page_count = estado['url'], estado.get('pagina', 1)
+        print(f"Retomando a partir da página {page_count} -> {url}")
+
+    fila = queue.Queue(maxsize=tamanho_fila)
+    parar = threading.Event()
+    erros = []
+    FIM = object()
+
+    def colocar_na_fila(item):
+        # Com a fila cheia, desiste se o consumidor já parou (ex: erro no banco)
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produtor():
+        try:
+            for pagina in paginar_atividades(url, page_count):
+                if not colocar_na_fila(pagina):
+                    return
+        except Exception as e:
+            erros.append(e)
+        finally:
+            colocar_na_fila(FIM)
+
+    thread_busca = threading.Thread(target=produtor, name='busca-atividades', daemon=True)
+    thread_busca.start()
+
+    total = 0
+    grupo = []
+    try:
+        while True:
+            item = fila.get()
+            if item is not FIM:
+                grupo.append(item)
+            if grupo and (item is FIM or len(grupo) >= paginas_por_lote):
+                atividades_grupo = [atividade for atividades, _, _ in grupo for atividade in atividades]
+                if atividades_grupo:
+                    df = tratar_dados(atividades_grupo)
+                    # tratar_dados devolve um DataFrame vazio quando falha: o cursor não pode passar destas páginas
+                    if df.empty:
+                        raise RuntimeError('Falha ao tratar o lote de atividades')
+                    if not inserir_dados_no_banco(df):
+                        raise RuntimeError('Falha ao gravar o lote de atividades no banco')
+                    total += len(atividades_grupo)
+
+                _, proxima_url, ultima_pagina = grupo[-1]
+                checkpoint.salvar_cursor(
+                    PROCESSO, json.dumps({'url': proxima_url, 'pagina': ultima_pagina + 1, 'data': hoje})
+                )
+                print(f"Páginas até {ultima_pagina} gravadas ({total} atividades). Fila: {fila.qsize()}/{tamanho_fila}")
+                grupo = []
+            if item is FIM:
+                break
+    finally:
+        parar.set()
+        thread_busca.join()
+
+    if erros:
+        print(f"⚠️ Paginação interrompida ({erros[0]}). A próxima execução retoma da última página gravada.")
+        return None
+    # Paginação completa e tudo gravado: a próxima execução começa do zero
+    checkpoint.limpar_cursor(PROCESSO)
+    return total
+
+# Campos aninhados das atividades (actor, target, object, user) extraídos para colunas próprias
+campos_aninhados = {
+    'actor_id': 'actor',
+    'actor_name': 'actor',
+    'ticket_type': 'target',
+    'comment': 'object',
+    'subject': 'object',
+    'público': 'object',
+    'user_id': 'user',
+}
+
+def extrair_campos_aninhados(atividades_data):
+    """
+    Percorre as atividades uma única vez e devolve um dict coluna -> lista
+    com os campos de campos_aninhados e o ticket_id do target (como texto).
+    Campos ausentes viram None.
+    """
+    vazio = {}
+    colunas = {destino: [] for destino in campos_aninhados}
+    colunas['ticket_id'] = []
+    for atividade in atividades_data:
+        actor = atividade.get('actor')
+        actor = actor if isinstance(actor, dict) else vazio
+        target = atividade.get('target')
+        target = target if isinstance(target, dict) else vazio
+        objeto = atividade.get('object')
+        objeto = objeto if isinstance(objeto, dict) else vazio
+        comentario = objeto.get('comment') or vazio
+        user = atividade.get('user')
+        user = user if isinstance(user, dict) else vazio
+
+        colunas['actor_id'].append(actor.get('id'))
+        colunas['actor_name'].append(actor.get('name'))
+        colunas['ticket_type'].append(target.get('type'))
+        colunas['ticket_id'].append(str(target['id']) if 'id' in target else None)
+        colunas['comment'].append(comentario.get('value'))
+        colunas['subject'].append((objeto.get('ticket') or vazio).get('subject'))
+        colunas['público'].append(comentario.get('public'))
+        colunas['user_id'].append(user.get('id'))
+    return colunas
+
+def para_none(serie):
+    # NaN/NaT viram None, como os .get(...) por linha devolviam
+    return serie.astype(object).where(serie.notna(), None)
+
+def separar_data_hora(serie):
+    """
+    Formata a coluna de datas uma única vez e separa em (data, hora) como texto.
+    """
+    texto = serie.dt.strftime("%Y-%m-%d %H:%M:%S")
+    return para_none(texto.str[:10]), para_none(texto.str[11:])
+
+@medicao.medido('tratar_dados_atividades', linhas='resultado')
 def tratar_dados(atividades_data):
     """
     Converte lista de dict em DataFrame e ajusta colunas,
     datas e estrutura para inserir no banco ou exportar.
+    Os campos aninhados (actor, target, object, user) saem de uma única
+    passada sobre as atividades, o ticket_id do título sai de um
+    Series.str.extract e as colunas de data/hora de dt.strftime.
     """
     try:
         df = pd.DataFrame(atividades_data)
@@ -79,39 +252,23 @@ def tratar_dados(atividades_data):
             return df
 
         # ----------------------- TRATAR DATAS ---------------------------------
-        if 'created_at' in df.columns:
-            df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce').dt.tz_localize(None)
-        if 'updated_at' in df.columns:
-            df['updated_at'] = pd.to_datetime(df['updated_at'], errors='coerce').dt.tz_localize(None)
-
         min_dt = pd.Timestamp('1753-01-01')
         max_dt = pd.Timestamp('9999-12-31')
 
-        if 'created_at' in df.columns:
-            df.loc[
-                (df['created_at'].isna()) | (df['created_at'] < min_dt) | (df['created_at'] > max_dt),
-                'created_at'
-            ] = None
-
-        if 'updated_at' in df.columns:
-            df.loc[
-                (df['updated_at'].isna()) | (df['updated_at'] < min_dt) | (df['updated_at'] > max_dt),
-                'updated_at'
-            ] = None
+        for col in ['created_at', 'updated_at']:
+            if col in df.columns:
+                datas = pd.to_datetime(df[col], errors='coerce').dt.tz_localize(None)
+                df[col] = datas.where((datas >= min_dt) & (datas <= max_dt))
 
-        # Extraindo dados do ator
-        if 'actor' in df.columns:
-            df['actor_id'] = df['actor'].apply(lambda x: x.get('id') if isinstance(x, dict) else None)
-            df['actor_name'] = df['actor'].apply(lambda x: x.get('name') if isinstance(x, dict) else None)
+        # ----------------- CAMPOS ANINHADOS (uma única passada) ---------------
+        aninhados = extrair_campos_aninhados(atividades_data)
+        for destino, origem in campos_aninhados.items():
+            if origem in df.columns:
+                df[destino] = pd.Series(aninhados[destino], index=df.index)
 
         # Informações do ticket (target)
         if 'target' in df.columns:
-            df['ticket_id'] = df['target'].apply(
-                lambda x: str(x.get('id')) if isinstance(x, dict) and 'id' in x else None
-            )
-            df['ticket_type'] = df['target'].apply(
-                lambda x: x.get('type') if isinstance(x, dict) else None
-            )
+            df['ticket_id'] = pd.Series(aninhados['ticket_id'], index=df.index)
 
         # verb -> action
         if 'verb' in df.columns:
@@ -119,62 +276,26 @@ def tratar_dados(atividades_data):
         if 'url' in df.columns:
             df['activity_url'] = df['url']
 
-        # object -> comment, subject, público
         if 'object' in df.columns:
-            df['comment'] = df['object'].apply(
-                lambda x: x.get('comment', {}).get('value') if isinstance(x, dict) else None
-            )
-            df['subject'] = df['object'].apply(
-                lambda x: x.get('ticket', {}).get('subject') if isinstance(x, dict) else None
-            )
-            df['público'] = df['object'].apply(
-                lambda x: x.get('comment', {}).get('public') if isinstance(x, dict) else None
-            )
             df['público'] = df['público'].astype(str)
 
         # Extrair ticket_id da coluna 'title' se não existir
-        if 'title' in df.columns:
-            df['ticket_id'] = df.apply(
-                lambda row: row['ticket_id'] if pd.notna(row['ticket_id']) else (
-                    re.search(r'#(\d+)', row['title']).group(1)
-                    if isinstance(row['title'], str) and re.search(r'#(\d+)', row['title'])
-                    else None
-                ),
-                axis=1
-            )
-
-        # user -> user_id
-        if 'user' in df.columns:
-            df['user_id'] = df['user'].apply(lambda x: x.get('id') if isinstance(x, dict) else None)
+        if 'title' in df.columns and 'ticket_id' in df.columns:
+            do_titulo = df['title'].where(df['title'].map(type) == str).str.extract(r'#(\d+)', expand=False)
+            df['ticket_id'] = para_none(df['ticket_id'].where(df['ticket_id'].notna(), do_titulo))
 
         # converter metadata e object para JSON
         if 'metadata' in df.columns:
-            df['metadata'] = df['metadata'].apply(lambda x: json.dumps(x) if isinstance(x, dict) else None)
+            df['metadata'] = [json.dumps(x) if isinstance(x, dict) else None for x in df['metadata']]
         if 'object' in df.columns:
-            df['object'] = df['object'].apply(lambda x: json.dumps(x) if isinstance(x, dict) else None)
+            df['object'] = [json.dumps(x) if isinstance(x, dict) else None for x in df['object']]
 
         # --- Criando colunas extras de data/hora (se houver) ---
-        df['created_at_data'] = df['created_at'].apply(
-            lambda x: x.strftime("%Y-%m-%d") if pd.notnull(x) else None
-        )
-        df['created_at_hora'] = df['created_at'].apply(
-            lambda x: x.strftime("%H:%M:%S") if pd.notnull(x) else None
-        )
-        df['updated_at_data'] = df['updated_at'].apply(
-            lambda x: x.strftime("%Y-%m-%d") if pd.notnull(x) else None
-        )
-        df['updated_at_hora'] = df['updated_at'].apply(
-            lambda x: x.strftime("%H:%M:%S") if pd.notnull(x) else None
-        )
+        df['created_at_data'], df['created_at_hora'] = separar_data_hora(df['created_at'])
+        df['updated_at_data'], df['updated_at_hora'] = separar_data_hora(df['updated_at'])
 
-        # Ordenar colunas (incluir as novas colunas de data/hora)
-        colunas_banco = [
-            "id", "title", "verb", "user_id", "actor_id", "actor_name",
-            "created_at", "updated_at", "created_at_data", "created_at_hora",
-            "updated_at_data", "updated_at_hora",
-            "object", "user", "ticket_id", "ticket_type", "action", 
-            "activity_url", "comment", "subject", "público"
-        ]
+        # Ordenar colunas (incluir as novas colunas de data/hora), na ordem do registro de tabelas.py
+        colunas_banco = tabelas.colunas('BD_AtividadesSAC')
         for col in colunas_banco:
             if col not in df.columns:
                 df[col] = None
@@ -186,77 +307,39 @@ def tratar_dados(atividades_data):
         print(f'Erro ao tratar dados: {e}')
         return pd.DataFrame()
 
-def inserir_dados_no_banco(df, batch_size=1000):
+@medicao.medido('inserir_atividades', linhas='entrada')
+def inserir_dados_no_banco(df, batch_size=None):
     """
-    Insere o DataFrame (df) na tabela BD_AtividadesSAC (em batches de 1000).
+    Insere o DataFrame (df) na tabela BD_AtividadesSAC (em batches de tamanho_lote),
+    numa conexão do pool do banco.py. As colunas e a conversão de cada uma
+    (texto, JSON, 'nan'/'None'/'' como NULL) vêm do registro de tabelas.py.
+    Retorna True se a inserção terminou sem erro de conexão.
     """
     try:
-        conn = pyodbc.connect(
-            f"DRIVER={db_config['driver']};SERVER={db_config['server']};"
-            f"DATABASE={db_config['database']};UID={db_config['uid']};PWD={db_config['pwd']}"
-        )
-        cursor = conn.cursor()
-
-        # Adicionamos as 4 novas colunas aqui também
-        colunas_validas = [
-            "id", "actor_id", "actor_name", "created_at", "updated_at",
-            "created_at_data", "created_at_hora", "updated_at_data", "updated_at_hora",
-            "title", "verb", "user_id", "ticket_id", "ticket_type",
-            "action", "activity_url", "comment", "subject", "público",
-            "object", "user"
-        ]
-
-        df = df[[c for c in colunas_validas if c in df.columns]]
-        for col in colunas_validas:
-            if col not in df.columns:
-                df[col] = None
-
-        df = df[colunas_validas]
-
-        colunas = ', '.join([f'[{col}]' for col in df.columns])
-        placeholders = ', '.join(['?'] * len(df.columns))
-        sql = f"INSERT INTO BD_AtividadesSAC ({colunas}) VALUES ({placeholders})"
-
-        # Pegar índice da coluna "created_at" para exibir em caso de erro
-        # (em vez de df.columns.index(...) usamos .get_loc(...))
-        index_created_at = df.columns.get_loc("created_at")
+        df = df.reindex(columns=tabelas.colunas('BD_AtividadesSAC'))
+
+        print(f"Inserindo {len(df)} registros no banco...")
+        with banco.conexao() as conn:
+            # Staging + MERGE pelo id da atividade (substitui a deduplicação da tabela inteira)
+            # Em caso de erro numa linha, exibe o valor do created_at
+            tabelas.mesclar(
+                conn, 'BD_AtividadesSAC', df, tamanho_lote=batch_size or tamanho_lote,
+                descrever_linha=lambda linha: f"Data: {linha['created_at']}"
+            )
 
-        for start in range(0, len(df), batch_size):
-            batch = df.iloc[start:start + batch_size]
-            valores = [
-                tuple(
-                    json.dumps(valor) if isinstance(valor, (dict, list)) else
-                    (None if pd.isna(valor) or valor in [np.nan, "nan", "None", ""] else str(valor))
-                    for valor in row
-                )
-                for _, row in batch.iterrows()
-            ]
-
-            for valor in valores:
-                try:
-                    cursor.execute(sql, valor)
-                except pyodbc.Error as e:
-                    # Em caso de erro, exibe o valor do created_at
-                    print(f'Erro ao inserir linha no banco: {e} - Data: {valor[index_created_at]}')
-                    continue
-
-            print(f"Inserindo {len(batch)} registros no banco...")
-
-        conn.commit()
-        cursor.close()
-        conn.close()
         print("Inserção concluída com sucesso!")
+        return True
     except pyodbc.Error as e:
         print(f'Erro ao inserir dados no banco: {e}')
+        return False
 
+@medicao.medido('excluir_duplicados_atividades', tempo_em='deduplicacao')
 def excluir_registros_duplicados():
+    """
+    Varredura completa de BD_AtividadesSAC para limpar duplicatas antigas.
+    A carga normal já faz MERGE pelo id; use só pontualmente (opção 3 do menu).
+    """
     try:
-        conn = pyodbc.connect(
-            f"DRIVER={db_config['driver']};SERVER={db_config['server']};"
-            f"DATABASE={db_config['database']};UID={db_config['uid']};PWD={db_config['pwd']}"
-        )
-        cursor = conn.cursor()
-
         sql = """
         WITH CTE AS (
             SELECT 
@@ -267,10 +350,11 @@ def excluir_registros_duplicados():
         )
         DELETE FROM CTE WHERE row_num > 1;
         """
-        cursor.execute(sql)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with banco.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            conn.commit()
+            cursor.close()
         print("Registros duplicados excluídos com sucesso!")
     except pyodbc.Error as e:
         print(f'Erro ao excluir registros duplicados: {e}')
@@ -278,45 +362,55 @@ def excluir_registros_duplicados():
 def exportar_para_excel(df):
     """
     Exporta o DataFrame para Excel. Usamos data/hora atual para nome do arquivo.
+    Retorna True se o arquivo foi gravado.
     """
     try:
         now_str = datetime.now().strftime("%Y%m%d_%H%M%S")
         file_name = f"atividades_{now_str}.xlsx"
         df.to_excel(file_name, index=False)
         print(f"Dados exportados para o arquivo {file_name} com sucesso!")
+        return True
     except Exception as e:
         print(f'Erro ao exportar dados para Excel: {e}')
+        return False
 
 def executar_extracao(exportar_para_banco=True):
     """
     Puxa TODAS as atividades (máximo 30 dias, pois é a limitação do endpoint),
     trata e insere no banco OU exporta para Excel.
+    Retorna True se a extração foi concluída.
     """
     try:
+        # Inserir em streaming (página a página) ou exportar tudo de uma vez
+        if exportar_para_banco:
+            total = executar_pipeline()
+            if total is None:
+                return False
+            print(f"Processo concluído com sucesso! {total} atividades gravadas. 🚀")
+            return True
+
         # Buscar atividades (todas as páginas)
         atividades_data = buscar_atividades()
         if not atividades_data:
             print("Nenhuma atividade retornada.")
-            return
+            return True
 
         # Tratar dados
         df = tratar_dados(atividades_data)
-
-        # Inserir ou exportar
-        if exportar_para_banco:
-            inserir_dados_no_banco(df)
-            print("Processo concluído com sucesso! 🚀")
-        else:
-            exportar_para_excel(df)
-            print("Exportação concluída com sucesso! 🚀")
+        if df.empty or not exportar_para_excel(df):
+            return False
+        print("Exportação concluída com sucesso! 🚀")
+        return True
 
     except Exception as e:
         print(f'Erro ao executar a extração: {e}')
+        return False
 
 def menu():
     try:
         print("1. Inserir (dos últimos 30 dias) no banco")
         print("2. Exportar (dos últimos 30 dias) para Excel")
+        print("3. Remover duplicados antigos da tabela (varredura completa)")
         opcao = '1'
         #opcao = input("Digite a opção desejada: ").strip()
 
@@ -324,14 +418,19 @@ def menu():
             executar_extracao(exportar_para_banco=True)
         elif opcao == '2':
             executar_extracao(exportar_para_banco=False)
+        elif opcao == '3':
+            excluir_registros_duplicados()
         else:
             print("Opção inválida, encerrando.")
             return
 
-        excluir_registros_duplicados()
-
     except Exception as e:
         print(f'Erro no menu: {e}')
 
 if __name__ == "__main__":
-    menu()
+    try:
+        menu()
+    finally:
+        zendesk_http.fechar()
+        banco.fechar()
+        medicao.finalizar()
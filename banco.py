@@ -0,0 +1,142 @@
+import os
+import time
+import queue
+import threading
+from contextlib import contextmanager
+import pyodbc
+import medicao
+
+"""
+Conexões com o SQL Server compartilhadas pelos scripts de carga.
+Monta a string de conexão a partir das variáveis DB_*_EXCEL do .env e
+mantém um pool de conexões abertas, do tamanho da concorrência de
+gravação, para que cada lote/dia/chunk não pague um novo login no banco.
+
+Uso:
+    with banco.conexao() as conn:
+        ...
+
+Conexões paradas há mais de verificar_apos segundos passam por um SELECT 1
+antes de serem entregues; se a conexão caiu, ela é descartada e outra é
+aberta no lugar. Uma conexão que falhou durante o uso também é descartada.
+"""
+
+driver = 'ODBC Driver 17 for SQL Server'
+
+# Segundos para o login no banco
+timeout_login = 60
+
+# Conexões abertas ao mesmo tempo (ajustado pelos scripts com configurar_pool)
+tamanho_pool = 4
+
+# Conexões paradas há mais tempo que isso (segundos) são testadas antes do uso
+verificar_apos = 30
+
+_livres = queue.LifoQueue()
+_abertas = 0
+_lock = threading.Lock()
+
+def string_conexao():
+    # Lida na hora da conexão, depois que os scripts carregaram o .env
+    return (
+        f"DRIVER={{{driver}}};"
+        f"SERVER={os.getenv('DB_SERVER_EXCEL')},{os.getenv('DB_PORT_EXCEL')};"
+        f"DATABASE={os.getenv('DB_DATABASE_EXCEL')};"
+        f"UID={os.getenv('DB_USER_EXCEL')};"
+        f"PWD={os.getenv('DB_PASSWORD_EXCEL')};"
+    )
+
+def configurar_pool(tamanho):
+    """
+    Define quantas conexões o pool pode manter abertas
+    (normalmente o número de threads que gravam no banco).
+    """
+    global tamanho_pool
+    with _lock:
+        tamanho_pool = max(1, int(tamanho))
+
+def _conexao_saudavel(conn):
+    try:
+        cursor = conn.cursor()
+        medicao.contar('idas_banco')
+        cursor.execute("SELECT 1").fetchone()
+        cursor.close()
+        return True
+    except pyodbc.Error:
+        return False
+
+def _descartar(conn):
+    global _abertas
+    try:
+        conn.close()
+    except pyodbc.Error:
+        pass
+    with _lock:
+        _abertas -= 1
+
+def _obter():
+    global _abertas
+    while True:
+        try:
+            conn, devolvida_em = _livres.get_nowait()
+        except queue.Empty:
+            with _lock:
+                pode_abrir = _abertas < tamanho_pool
+                if pode_abrir:
+                    _abertas += 1
+            if pode_abrir:
+                try:
+                    medicao.contar('idas_banco')
+                    return pyodbc.connect(string_conexao(), timeout=timeout_login)
+                except pyodbc.Error:
+                    with _lock:
+                        _abertas -= 1
+                    raise
+            # Pool cheio: espera outra thread devolver uma conexão
+            conn, devolvida_em = _livres.get()
+
+        if time.monotonic() - devolvida_em < verificar_apos or _conexao_saudavel(conn):
+            return conn
+        print("⚠️ Conexão com o banco caiu. Reconectando...")
+        _descartar(conn)
+
+def _devolver(conn):
+    if tamanho_pool < _abertas:
+        # O pool foi reduzido enquanto a conexão estava em uso
+        _descartar(conn)
+        return
+    _livres.put((conn, time.monotonic()))
+
+@contextmanager
+def conexao():
+    """
+    Empresta uma conexão do pool (sem autocommit) e a devolve no fim do bloco.
+    Se o bloco falhar, a transação aberta é desfeita; se nem o rollback
+    funcionar, a conexão é descartada e a próxima será aberta de novo.
+    """
+    conn = _obter()
+    try:
+        yield conn
+    except Exception:
+        try:
+            conn.rollback()
+            saudavel = True
+        except pyodbc.Error:
+            saudavel = False
+        if saudavel:
+            _devolver(conn)
+        else:
+            _descartar(conn)
+        raise
+    _devolver(conn)
+
+def fechar():
+    """
+    Fecha as conexões livres do pool (chamar no fim da execução).
+    """
+    while True:
+        try:
+            conn, _ = _livres.get_nowait()
+        except queue.Empty:
+            return
+        _descartar(conn)
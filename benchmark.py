@@ -0,0 +1,545 @@
+import io
+import os
+import re
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+import importlib.util
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+"""
+Benchmark offline dos fluxos de tickets.py, activities.py e da Atribuição
+(ScrapTicketAtribuicao_D-1.py), sem acessar o Zendesk nem o SQL Server de produção.
+
+- Um servidor HTTP local (em outro processo, para não disputar o GIL com o
+  que está sendo medido) responde search.json, /activities e o CSV do
+  Explore com dados sintéticos ou gravados (--fixtures).
+- As requisições da API vão para ele pelo zendesk_http.url_base; a do
+  Explore, por uma captura temporária do explore_http.
+- O banco é um substituto em memória (--banco memoria) que aceita os
+  comandos da carga (staging + MERGE) e mantém as linhas por chave, com
+  latência opcional por ida ao banco (--latencia-ms). Com --banco odbc, usa
+  o SQL Server das variáveis DB_*_EXCEL (ex: uma instância local com as
+  mesmas tabelas).
+
+Cada fluxo é medido por etapa (busca, tratar_dados, carga, dedup) em cada
+tamanho de --linhas. Os scripts são importados normalmente, então o .env
+(PRIVATE_BAG.ENV) e as dependências precisam estar disponíveis, como numa
+execução comum.
+
+Uso:
+    python benchmark.py
+    python benchmark.py --linhas 1000 10000 --fluxos tickets atividades
+    python benchmark.py --saida base.json
+    python benchmark.py --comparar base.json --tolerancia 0.2
+
+Com --comparar, etapas mais lentas que a referência além da tolerância são
+listadas e o script sai com código 1.
+"""
+
+DIA = datetime(2024, 1, 1)
+# Mesmo fuso do tickets.fuso_conta: DIA é um dia local, buscado de 03:00 a 03:00 em UTC
+FUSO_CONTA = timezone(timedelta(hours=-3))
+POR_PAGINA = 100
+FLUXOS = ['tickets', 'atividades', 'atribuicao']
+ETAPAS = ['busca', 'tratar_dados', 'carga', 'dedup']
+
+############################################################
+#                   DADOS SINTÉTICOS                       #
+############################################################
+
+def modelo_ticket():
+    import tabelas
+    campos = [
+        {'id': campo, 'value': f'valor_{indice}'}
+        for indice, campo in enumerate(tabelas.campos_personalizados('BD_TicketsSAC'))
+    ]
+    # Campos que não estão no registro também vêm da API e precisam ser ignorados
+    campos += [{'id': 900000000000 + indice, 'value': None} for indice in range(10)]
+    return {
+        'url': 'https://bagaggio.zendesk.com/api/v2/tickets/0.json',
+        'id': 0,
+        'external_id': None,
+        'via': {
+            'channel': 'email',
+            'source': {
+                'from': {'name': 'Cliente', 'address': 'cliente@exemplo.com'},
+                'to': {'name': 'SAC', 'address': 'sac@exemplo.com'},
+                'rel': None,
+            },
+        },
+        'created_at': '', 'updated_at': '',
+        'generated_timestamp': 0,
+        'type': 'question',
+        'subject': 'Pedido [123] atrasado',
+        'raw_subject': 'Pedido [123] atrasado',
+        'description': 'Olá, meu pedido ainda não chegou. ' * 10,
+        'priority': 'normal',
+        'status': 'open',
+        'recipient': 'sac@exemplo.com',
+        'requester_id': 1, 'submitter_id': 1, 'assignee_id': 2,
+        'organization_id': None, 'group_id': 3,
+        'collaborator_ids': [], 'follower_ids': [], 'email_cc_ids': [],
+        'forum_topic_id': None, 'problem_id': None,
+        'has_incidents': False, 'is_public': True, 'due_at': None,
+        'tags': ['pedido', 'atraso'],
+        'custom_fields': campos, 'fields': campos,
+        'satisfaction_rating': {'score': 'unoffered'},
+        'sharing_agreement_ids': [], 'followup_ids': [],
+        'custom_status_id': 4, 'encoded_id': 'ABC-123',
+        'ticket_form_id': 5, 'brand_id': 6,
+        'allow_channelback': False, 'allow_attachments': True,
+        'from_messaging_channel': False, 'result_type': 'ticket',
+    }
+
+def modelo_atividade():
+    return {
+        'id': 0,
+        'url': 'https://bagaggio.zendesk.com/api/v2/activities/0.json',
+        'verb': 'tickets.assignment',
+        'title': 'Fulano atribuiu o ticket #123 a você.',
+        'created_at': '', 'updated_at': '',
+        'user_id': 1, 'actor_id': 2,
+        'user': {'id': 1, 'name': 'Agente'},
+        'actor': {'id': 2, 'name': 'Fulano'},
+        'target': {'type': 'ticket', 'id': 123},
+        'object': {'ticket': {'subject': 'Pedido atrasado'}, 'comment': {'value': 'Comentário', 'public': True}},
+        'metadata': {'origem': 'benchmark'},
+    }
+
+def linhas_atribuicao():
+    import tabelas
+    cabecalho = ';'.join(tabelas.mapeamento('BD_TicketsAtribuicaoSAC'))
+    linha = '{id};{data};Grupo SAC;Fulano;Agente {agente};Aberto;Web;Pedido atrasado;Público'
+    return cabecalho, [linha]
+
+def carregar_fixtures(pasta):
+    """
+    Modelos gravados: ticket.json (um item de search.json), atividade.json
+    (um item de /activities) e atribuicao.csv (exportação do Explore; as
+    linhas são repetidas até o tamanho pedido).
+    """
+    modelos = {'ticket': modelo_ticket(), 'atividade': modelo_atividade(), 'csv': linhas_atribuicao()}
+    if not pasta:
+        return modelos
+    for nome, arquivo in [('ticket', 'ticket.json'), ('atividade', 'atividade.json')]:
+        caminho = os.path.join(pasta, arquivo)
+        if os.path.exists(caminho):
+            with open(caminho, encoding='utf-8') as f:
+                modelos[nome] = json.load(f)
+    caminho = os.path.join(pasta, 'atribuicao.csv')
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8-sig') as f:
+            linhas = f.read().splitlines()
+        modelos['csv'] = (linhas[0], [linha for linha in linhas[1:] if linha] or linhas_atribuicao()[1])
+    return modelos
+
+def _instante(indice, total):
+    # Espalha os registros ao longo de DIA
+    return DIA + timedelta(seconds=indice * 86400 // total)
+
+def _ticket(modelos, indice, total):
+    ticket = dict(modelos['ticket'])
+    momento = _instante(indice, total).strftime('%Y-%m-%dT%H:%M:%SZ')
+    ticket.update(id=indice + 1, created_at=momento, updated_at=momento, generated_timestamp=indice,
+                  url=f'https://bagaggio.zendesk.com/api/v2/tickets/{indice + 1}.json')
+    return ticket
+
+def _atividade(modelos, indice, total):
+    atividade = dict(modelos['atividade'])
+    momento = _instante(indice, total).strftime('%Y-%m-%dT%H:%M:%SZ')
+    atividade.update(id=indice + 1, created_at=momento, updated_at=momento)
+    return atividade
+
+def _linha_csv(modelos, indice, total):
+    linhas = modelos['csv'][1]
+    return linhas[indice % len(linhas)].format(
+        id=indice + 1, data=_instante(indice, total).strftime('%Y-%m-%dT%H:%M:%S'), agente=indice % 50
+    )
+
+############################################################
+#                   SERVIDOR HTTP LOCAL                    #
+############################################################
+
+def _segundos(valor):
+    # Mesmo formato do tickets._filtro_data (data/hora em UTC); uma data simples falha a busca.
+    # Segundos desde a meia-noite local de DIA
+    instante = datetime.strptime(valor, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+    return (instante - DIA.replace(tzinfo=FUSO_CONTA)).total_seconds()
+
+def _indice_a_partir(segundos, total):
+    # Primeiro índice cujo instante (indice * 86400 // total) é >= segundos
+    return min(max(math.ceil(segundos * total / 86400), 0), total)
+
+class _Servidor(BaseHTTPRequestHandler):
+    # Adaptador do http.server: o estado fica em atributos da classe (ajustados por _servir e pela rota /_benchmark)
+    modelos = None
+    total = 0
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalho e corpo saem em escritas separadas; sem isso o Nagle soma ~40 ms a cada resposta
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, dados):
+        corpo = json.dumps(dados).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+        base = f'http://{self.headers["Host"]}'
+        total = type(self).total
+
+        if url.path == '/_benchmark':
+            type(self).total = int(params['linhas'])
+            return self._json({'linhas': type(self).total})
+
+        if url.path.endswith('/search.json'):
+            consulta = params['query']
+            inicio = _indice_a_partir(_segundos(re.search(r'created_at>="([^"]+)"', consulta).group(1)), total)
+            fim = _indice_a_partir(_segundos(re.search(r'created_at<"([^"]+)"', consulta).group(1)), total)
+            pagina = int(params.get('page', 1))
+            primeiro = inicio + (pagina - 1) * POR_PAGINA
+            # A Search API só devolve os primeiros 1000 resultados de cada consulta
+            ultimo = min(fim, inicio + 1000, primeiro + POR_PAGINA)
+            proxima = None
+            if ultimo < min(fim, inicio + 1000):
+                proxima = f'{base}{url.path}?{urlencode({"query": consulta, "page": pagina + 1})}'
+            return self._json({
+                'results': [_ticket(self.modelos, i, total) for i in range(primeiro, ultimo)],
+                'count': fim - inicio,
+                'next_page': proxima,
+            })
+
+        if url.path.startswith('/api/v2/activities'):
+            pagina = int(params.get('page', 1))
+            primeiro = (pagina - 1) * POR_PAGINA
+            ultimo = min(total, primeiro + POR_PAGINA)
+            proxima = f'{base}/api/v2/activities?page={pagina + 1}' if ultimo < total else None
+            return self._json({
+                'activities': [_atividade(self.modelos, i, total) for i in range(primeiro, ultimo)],
+                'next_page': proxima,
+            })
+
+        if url.path == '/explore/export.csv':
+            # Enviado em partes, como a exportação real
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv; charset=utf-8')
+            self.send_header('Content-Disposition', 'attachment; filename="export.csv"')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(('\ufeff' + self.modelos['csv'][0] + '\n').encode())
+            for inicio in range(0, total, 1000):
+                bloco = '\n'.join(_linha_csv(self.modelos, i, total) for i in range(inicio, min(total, inicio + 1000)))
+                self.wfile.write((bloco + '\n').encode())
+            return
+
+        self.send_error(404)
+
+def _servir(modelos, porta):
+    _Servidor.modelos = modelos
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), _Servidor)
+    porta.put(servidor.server_address[1])
+    servidor.serve_forever()
+
+def iniciar_servidor(modelos):
+    porta = multiprocessing.Queue()
+    processo = multiprocessing.Process(target=_servir, args=(modelos, porta), daemon=True)
+    processo.start()
+    return processo, f'http://127.0.0.1:{porta.get(timeout=30)}'
+
+############################################################
+#                BANCO SUBSTITUTO (MEMÓRIA)                #
+############################################################
+
+class _BancoMemoria:
+    """
+    Substituto do SQL Server para a carga: guarda as tabelas #staging de
+    cada conexão e aplica o MERGE num dict por chave. Comandos que não
+    fazem parte da carga (deduplicação, SELECT 1) só contam como ida ao banco.
+    """
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.tabelas = {}
+        self.idas = 0
+        self.lock = threading.Lock()
+
+    def conectar(self, *args, **kwargs):
+        return _ConexaoMemoria(self)
+
+    def ida(self):
+        with self.lock:
+            self.idas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+class _ConexaoMemoria:
+    def __init__(self, banco):
+        self.banco = banco
+        self.staging = {}
+
+    def cursor(self):
+        return _CursorMemoria(self)
+
+    def commit(self):
+        self.banco.ida()
+
+    def rollback(self):
+        self.banco.ida()
+
+    def close(self):
+        pass
+
+def _colunas_sql(trecho):
+    return [coluna.strip().strip('[]') for coluna in trecho.split(',')]
+
+class _CursorMemoria:
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.fast_executemany = False
+        self.rowcount = -1
+        self.resultado = []
+
+    def execute(self, sql, *params):
+        self.conexao.banco.ida()
+        texto = sql.strip()
+        self.rowcount = 0
+        if texto.startswith('SELECT 1'):
+            self.resultado = [(1,)]
+        elif 'SELECT TOP 0' in texto:
+            self.conexao.staging[re.search(r'INTO (#\w+)', texto).group(1)] = []
+        elif texto.startswith('INSERT INTO #'):
+            self.conexao.staging[re.search(r'INTO (#\w+)', texto).group(1)].append(tuple(params))
+        elif 'MERGE' in texto:
+            self.rowcount = self._merge(texto)
+        elif texto.startswith('DROP TABLE #'):
+            self.conexao.staging.pop(texto.split()[-1], None)
+        return self
+
+    def executemany(self, sql, linhas):
+        self.conexao.banco.ida()
+        self.conexao.staging[re.search(r'INTO (#\w+)', sql).group(1)].extend(linhas)
+
+    def _merge(self, sql):
+        staging = self.conexao.staging[re.search(r'FROM (#\w+)', sql).group(1)]
+        tabela = re.search(r'MERGE ([\w.]+)', sql).group(1)
+        colunas = _colunas_sql(re.search(r'SELECT (.*?),\s*ROW_NUMBER', sql, re.S).group(1))
+        chave = [colunas.index(coluna) for coluna in _colunas_sql(re.search(r'PARTITION BY (.*?) ORDER BY', sql).group(1))]
+        banco = self.conexao.banco
+        with banco.lock:
+            destino = banco.tabelas.setdefault(tabela, {})
+            for linha in staging:
+                destino[tuple(linha[i] for i in chave)] = linha
+        return len(staging)
+
+    def fetchone(self):
+        return self.resultado.pop(0) if self.resultado else None
+
+    def close(self):
+        pass
+
+############################################################
+#                        MEDIÇÃO                           #
+############################################################
+
+@contextlib.contextmanager
+def silencio(ativo):
+    # Os scripts imprimem o progresso de cada página/chunk; fora do --verboso isso vai para o devnull
+    if not ativo:
+        yield
+        return
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        yield
+
+def medir(resultados, fluxo, linhas, etapa, quieto, funcao, *args):
+    inicio = time.perf_counter()
+    with silencio(quieto):
+        valor = funcao(*args)
+    segundos = time.perf_counter() - inicio
+    resultados.append({'fluxo': fluxo, 'linhas': linhas, 'etapa': etapa, 'segundos': round(segundos, 4)})
+    print(f'⏱️ {fluxo:<11} {linhas:>7} linhas  {etapa:<13} {segundos:8.3f}s')
+    return valor
+
+def importar_script(nome, arquivo):
+    # Os scripts do Explore têm hífen no nome e não podem ser importados com import
+    spec = importlib.util.spec_from_file_location(nome, os.path.join(os.path.dirname(os.path.abspath(__file__)), arquivo))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+def bench_tickets(resultados, linhas, quieto):
+    import tickets
+    fim = (DIA + timedelta(days=1)).strftime('%Y-%m-%d')
+    dados = medir(resultados, 'tickets', linhas, 'busca', quieto,
+                  tickets.buscar_tickets_por_dia, DIA.strftime('%Y-%m-%d'), fim)
+    df = medir(resultados, 'tickets', linhas, 'tratar_dados', quieto, tickets.tratar_dados, dados)
+    medir(resultados, 'tickets', linhas, 'carga', quieto, tickets.inserir_dados_no_banco, df)
+    medir(resultados, 'tickets', linhas, 'dedup', quieto, tickets.remover_duplicados)
+
+def bench_atividades(resultados, linhas, quieto):
+    import activities
+
+    def buscar():
+        return [atividade for pagina, _, _ in activities.paginar_atividades() for atividade in pagina]
+
+    dados = medir(resultados, 'atividades', linhas, 'busca', quieto, buscar)
+    df = medir(resultados, 'atividades', linhas, 'tratar_dados', quieto, activities.tratar_dados, dados)
+    medir(resultados, 'atividades', linhas, 'carga', quieto, activities.inserir_dados_no_banco, df)
+    medir(resultados, 'atividades', linhas, 'dedup', quieto, activities.excluir_registros_duplicados)
+
+def bench_atribuicao(resultados, linhas, quieto, base):
+    import banco
+    import carga
+    import explore_http
+    atribuicao = importar_script('atribuicao', 'ScrapTicketAtribuicao_D-1.py')
+
+    # Captura temporária apontando para o servidor local
+    capturas = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+    json.dump({'cookies': [], 'requisicoes': {'agent_updates': {'url': f'{base}/explore/export.csv', 'method': 'GET', 'headers': {}}}}, capturas)
+    capturas.close()
+    explore_http.capturas_path = Path(capturas.name)
+
+    try:
+        conteudo = medir(resultados, 'atribuicao', linhas, 'busca', quieto,
+                         explore_http.exportar, 'agent_updates', lambda caminho: Path(caminho).read_bytes())
+
+        def tratar():
+            leitor = atribuicao.ler_csv_explore(io.BytesIO(conteudo), chunksize=atribuicao.linhas_por_leitura)
+            return list(atribuicao.tratar_blocos(leitor))
+
+        def gravar(tratados):
+            # Mesmo caminho do inserir_dataframe, sem tratar de novo
+            max_workers = max((os.cpu_count() or 2) - 1, 1)
+            banco.configurar_pool(max_workers)
+            return carga.gravar_blocos_em_paralelo(
+                carga.dividir_em_blocos(tratados, 500), atribuicao.inserir_chunk, max_workers
+            )
+
+        tratados = medir(resultados, 'atribuicao', linhas, 'tratar_dados', quieto, tratar)
+        medir(resultados, 'atribuicao', linhas, 'carga', quieto, gravar, tratados)
+        medir(resultados, 'atribuicao', linhas, 'dedup', quieto, atribuicao.remover_duplicatas_banco)
+    finally:
+        os.remove(capturas.name)
+
+############################################################
+#                       RELATÓRIO                          #
+############################################################
+
+def imprimir_resumo(resultados):
+    tempos = {(r['fluxo'], r['linhas'], r['etapa']): r['segundos'] for r in resultados}
+    grupos = sorted({(r['fluxo'], r['linhas']) for r in resultados}, key=lambda g: (FLUXOS.index(g[0]), g[1]))
+    print()
+    print(f"{'fluxo':<11} {'linhas':>7} " + ' '.join(f'{etapa:>13}' for etapa in ETAPAS) + f" {'linhas/s':>10}")
+    for fluxo, linhas in grupos:
+        valores = [tempos.get((fluxo, linhas, etapa)) for etapa in ETAPAS]
+        total = sum(v for v in valores if v)
+        colunas = ' '.join(f'{v:13.3f}' if v is not None else f"{'-':>13}" for v in valores)
+        print(f'{fluxo:<11} {linhas:>7} {colunas} {linhas / total if total else 0:10.0f}')
+
+def comparar(resultados, arquivo, tolerancia):
+    """
+    Compara com uma execução salva por --saida. Só conta como regressão a
+    etapa que ficou mais lenta que a referência além da tolerância e por
+    mais de 50 ms (abaixo disso o ruído domina).
+    """
+    with open(arquivo, encoding='utf-8') as f:
+        referencia = {(r['fluxo'], r['linhas'], r['etapa']): r['segundos'] for r in json.load(f)['resultados']}
+
+    regressoes = []
+    for r in resultados:
+        anterior = referencia.get((r['fluxo'], r['linhas'], r['etapa']))
+        if anterior is None:
+            continue
+        if r['segundos'] > anterior * (1 + tolerancia) and r['segundos'] - anterior > 0.05:
+            regressoes.append((r, anterior))
+
+    print()
+    if not regressoes:
+        print(f'✅ Nenhuma etapa mais lenta que {arquivo} (tolerância {tolerancia:.0%}).')
+        return True
+    for r, anterior in regressoes:
+        print(f"❌ Regressão: {r['fluxo']} {r['linhas']} linhas, {r['etapa']}: "
+              f"{anterior:.3f}s -> {r['segundos']:.3f}s ({r['segundos'] / anterior - 1:+.0%})")
+    return False
+
+############################################################
+#                     EXECUÇÃO PRINCIPAL                   #
+############################################################
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark offline dos fluxos de extração e carga.')
+    parser.add_argument('--linhas', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--fluxos', nargs='+', choices=FLUXOS, default=FLUXOS)
+    parser.add_argument('--banco', choices=['memoria', 'odbc'], default='memoria')
+    parser.add_argument('--latencia-ms', type=float, default=0.0,
+                        help='Latência simulada por ida ao banco em memória')
+    parser.add_argument('--fixtures', help='Pasta com ticket.json, atividade.json e/ou atribuicao.csv gravados')
+    parser.add_argument('--saida', help='Salva os tempos em JSON (referência para --comparar)')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior (--saida)')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    parser.add_argument('--verboso', action='store_true', help='Mostra os prints dos scripts')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import zendesk_http
+    import banco
+
+    processo, base = iniciar_servidor(carregar_fixtures(args.fixtures))
+    print(f'🌐 Servidor local em {base}')
+
+    # Toda a API vai para o servidor local, sem o ritmo do limite real
+    zendesk_http.url_base = base
+    zendesk_http.limites_por_minuto = {nome: 10 ** 9 for nome in zendesk_http.limites_por_minuto}
+
+    substituto = None
+    if args.banco == 'memoria':
+        substituto = _BancoMemoria(args.latencia_ms / 1000)
+        banco.pyodbc.connect = substituto.conectar
+
+    resultados = []
+    try:
+        for linhas in args.linhas:
+            zendesk_http.get(f'{base}/_benchmark?linhas={linhas}')
+            for fluxo in args.fluxos:
+                if fluxo == 'tickets':
+                    bench_tickets(resultados, linhas, not args.verboso)
+                elif fluxo == 'atividades':
+                    bench_atividades(resultados, linhas, not args.verboso)
+                else:
+                    bench_atribuicao(resultados, linhas, not args.verboso, base)
+    finally:
+        zendesk_http.fechar()
+        banco.fechar()
+        processo.terminate()
+
+    imprimir_resumo(resultados)
+    if substituto:
+        print(f'\n🗄️ Idas ao banco (memória): {substituto.idas}; '
+              + ', '.join(f'{tabela}: {len(linhas)} linhas' for tabela, linhas in substituto.tabelas.items()))
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({'data': datetime.now().isoformat(timespec='seconds'), 'banco': args.banco,
+                       'resultados': resultados}, f, ensure_ascii=False, indent=2)
+        print(f'💾 Tempos salvos em {args.saida}')
+
+    if args.comparar and not comparar(resultados, args.comparar, args.tolerancia):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
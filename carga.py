@@ -0,0 +1,257 @@
+import concurrent.futures
+import pyodbc
+import pandas as pd
+import medicao
+
+"""
+Carga em lote compartilhada pelos scripts que gravam no SQL Server.
+Cada lote vai inteiro num único executemany (fast_executemany) e é
+confirmado de uma vez; só quando um lote falha ele é refeito linha a
+linha, para isolar e pular apenas as linhas com erro.
+
+mesclar_em_tabela carrega as linhas numa tabela temporária da sessão e faz
+MERGE no destino pela chave natural, de modo que a deduplicação lê apenas
+as linhas tocadas pela carga, e não o histórico inteiro da tabela.
+
+dividir_em_blocos e gravar_blocos_em_paralelo fazem a carga em streaming
+de arquivos grandes: os blocos são lidos, tratados e gravados à medida
+que o arquivo é lido, com poucos blocos em memória ao mesmo tempo.
+"""
+
+# Tentativas do MERGE quando o SQL Server escolhe a sessão como vítima de deadlock
+tentativas_merge = 3
+
+def linhas_do_dataframe(df, colunas=None):
+    """
+    Converte o DataFrame em lista de tuplas na ordem das colunas,
+    trocando NaN/NaT/NA por None (NULL no banco).
+    """
+    if colunas is not None:
+        df = df[colunas]
+    dados = df.astype(object)
+    dados = dados.where(pd.notna(dados), None)
+    return list(dados.itertuples(index=False, name=None))
+
+def _inserir_linha_a_linha(conn, sql, lote, descrever_linha):
+    cursor = conn.cursor()
+    inseridas = 0
+    for linha in lote:
+        try:
+            medicao.contar('idas_banco')
+            cursor.execute(sql, linha)
+            inseridas += 1
+        except pyodbc.Error as e:
+            descricao = descrever_linha(linha) if descrever_linha else linha
+            print(f"⚠️ Erro ao inserir linha: {descricao}")
+            print("    > Erro:", e)
+    medicao.contar('idas_banco')
+    conn.commit()
+    cursor.close()
+    return inseridas
+
+def inserir_em_lote(conn, sql, linhas, tamanho_lote=1000, descrever_linha=None):
+    """
+    Insere as linhas (lista de tuplas) com executemany em lotes de tamanho_lote,
+    confirmando cada lote. Se um lote falhar, ele é desfeito e reinserido linha
+    a linha, pulando só as linhas com erro.
+
+    Parâmetros:
+    - conn: conexão pyodbc (sem autocommit)
+    - sql: INSERT parametrizado com '?'
+    - linhas: lista de tuplas na ordem dos parâmetros
+    - descrever_linha: função opcional que formata a linha nos logs de erro
+
+    Retorna:
+    - (inseridas, rejeitadas)
+    """
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+    inseridas = 0
+    rejeitadas = 0
+
+    for inicio in range(0, len(linhas), tamanho_lote):
+        lote = linhas[inicio:inicio + tamanho_lote]
+        try:
+            medicao.contar('idas_banco', 2)
+            cursor.executemany(sql, lote)
+            conn.commit()
+            inseridas += len(lote)
+        except pyodbc.Error as e:
+            medicao.contar('idas_banco')
+            conn.rollback()
+            print(f"⚠️ Lote de {len(lote)} linhas falhou ({e}). Reinserindo linha a linha...")
+            ok = _inserir_linha_a_linha(conn, sql, lote, descrever_linha)
+            inseridas += ok
+            rejeitadas += len(lote) - ok
+
+    cursor.close()
+    return inseridas, rejeitadas
+
+def _condicao_chave(chave):
+    # A primeira coluna da chave é o id (nunca nulo) e usa igualdade simples para aproveitar o índice;
+    # as demais tratam NULL = NULL como igual, como o PARTITION BY da deduplicação antiga
+    condicoes = [f"destino.[{chave[0]}] = origem.[{chave[0]}]"]
+    condicoes += [
+        f"(destino.[{col}] = origem.[{col}] OR (destino.[{col}] IS NULL AND origem.[{col}] IS NULL))"
+        for col in chave[1:]
+    ]
+    return " AND ".join(condicoes)
+
+def montar_sql_merge(tabela, colunas, chave, ordenar_por=None):
+    """
+    Monta os comandos usados por mesclar_em_tabela (criar a #staging, inserir
+    nela, fazer o MERGE e apagá-la). Quem grava sempre as mesmas colunas pode
+    montá-los uma vez e repassá-los em mesclar_em_tabela(sql=...).
+    """
+    staging = "#staging_" + tabela.split(".")[-1]
+    colunas_sql = ", ".join(f"[{col}]" for col in colunas)
+    placeholders = ", ".join(["?"] * len(colunas))
+    particao = ", ".join(f"[{col}]" for col in chave)
+    ordem = f"[{ordenar_por}] DESC" if ordenar_por else "(SELECT NULL)"
+    atualizaveis = [col for col in colunas if col not in chave]
+
+    quando_existe = ""
+    if atualizaveis:
+        quando_existe = "WHEN MATCHED THEN UPDATE SET " + ", ".join(
+            f"destino.[{col}] = origem.[{col}]" for col in atualizaveis
+        )
+
+    return {
+        "criar": (
+            f"IF OBJECT_ID('tempdb..{staging}') IS NOT NULL DROP TABLE {staging}; "
+            f"SELECT TOP 0 {colunas_sql} INTO {staging} FROM {tabela};"
+        ),
+        "inserir": f"INSERT INTO {staging} ({colunas_sql}) VALUES ({placeholders})",
+        "merge": f"""
+        WITH origem_ordenada AS (
+            SELECT {colunas_sql},
+                   ROW_NUMBER() OVER (PARTITION BY {particao} ORDER BY {ordem}) AS rn
+            FROM {staging}
+        )
+        MERGE {tabela} WITH (HOLDLOCK) AS destino
+        USING (SELECT {colunas_sql} FROM origem_ordenada WHERE rn = 1) AS origem
+        ON {_condicao_chave(chave)}
+        {quando_existe}
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT ({colunas_sql}) VALUES ({", ".join(f"origem.[{col}]" for col in colunas)});
+    """,
+        "apagar": f"DROP TABLE {staging}",
+    }
+
+def mesclar_em_tabela(conn, tabela, colunas, chave, linhas, tamanho_lote=1000,
+                      ordenar_por=None, descrever_linha=None, sql=None):
+    """
+    Grava as linhas em tabela via staging + MERGE:
+      1) cria #staging com a mesma estrutura das colunas do destino;
+      2) carrega as linhas com inserir_em_lote;
+      3) faz MERGE pela chave: atualiza as linhas existentes e insere as novas.
+    Se a mesma chave vier repetida na carga, vale a linha com o maior ordenar_por.
+
+    Parâmetros:
+    - conn: conexão pyodbc (a #staging só existe nesta sessão)
+    - tabela: tabela de destino (ex: "BD_TicketsSAC")
+    - colunas: colunas do destino, na ordem das tuplas em linhas
+    - chave: colunas que identificam o registro (ex: ["id"])
+    - ordenar_por: coluna usada para escolher a versão mais recente de uma chave repetida
+    - sql: comandos já montados por montar_sql_merge (senão são montados aqui)
+
+    Retorna:
+    - (linhas afetadas pelo MERGE, linhas rejeitadas na carga da staging)
+    """
+    if sql is None:
+        sql = montar_sql_merge(tabela, colunas, chave, ordenar_por)
+
+    cursor = conn.cursor()
+    medicao.contar('idas_banco', 2)
+    cursor.execute(sql["criar"])
+    conn.commit()
+
+    _, rejeitadas = inserir_em_lote(
+        conn, sql["inserir"], linhas, tamanho_lote=tamanho_lote, descrever_linha=descrever_linha
+    )
+
+    for tentativa in range(1, tentativas_merge + 1):
+        try:
+            medicao.contar('idas_banco', 2)
+            cursor.execute(sql["merge"])
+            afetadas = cursor.rowcount
+            conn.commit()
+            break
+        except pyodbc.Error as e:
+            medicao.contar('idas_banco')
+            conn.rollback()
+            # 40001 = deadlock; as cargas paralelas podem disputar as mesmas faixas de chave
+            if e.args and e.args[0] == "40001" and tentativa < tentativas_merge:
+                print(f"⚠️ Deadlock no MERGE em {tabela}. Tentando novamente ({tentativa}/{tentativas_merge})...")
+                continue
+            raise
+
+    medicao.contar('linhas_gravadas', max(afetadas, 0))
+    medicao.contar('linhas_rejeitadas', rejeitadas)
+    medicao.contar('idas_banco', 2)
+    cursor.execute(sql["apagar"])
+    conn.commit()
+    cursor.close()
+    return afetadas, rejeitadas
+
+############################################################
+#                   CARGA EM STREAMING                     #
+############################################################
+
+def dividir_em_blocos(dataframes, tamanho_bloco=500):
+    """
+    Recebe DataFrames em sequência (ex: os chunks de um pd.read_csv com
+    chunksize) e entrega (indice, bloco) com blocos de tamanho_bloco linhas.
+    O índice conta os blocos desde o início do arquivo, então é o mesmo em
+    qualquer execução sobre o mesmo arquivo (serve de id no checkpoint).
+    """
+    indice = 0
+    for df in dataframes:
+        for inicio in range(0, len(df), tamanho_bloco):
+            yield indice, df.iloc[inicio:inicio + tamanho_bloco]
+            indice += 1
+
+def gravar_blocos_em_paralelo(blocos, gravar_bloco, max_workers, pular=(), ao_gravar=None):
+    """
+    Grava os blocos com gravar_bloco(bloco, indice) em max_workers threads,
+    consumindo o iterável aos poucos: no máximo 2 * max_workers blocos ficam
+    lidos e ainda não gravados, seja qual for o tamanho do arquivo.
+
+    Parâmetros:
+    - blocos: iterável de (indice, DataFrame), ex: dividir_em_blocos(...)
+    - gravar_bloco: função que grava um bloco e retorna True se deu certo
+    - pular: índices já gravados numa execução anterior
+    - ao_gravar: função opcional chamada com o índice de cada bloco gravado
+
+    Retorna:
+    - True se todos os blocos foram gravados
+    """
+    sucesso = True
+    pendentes = {}
+
+    def concluir(futures):
+        nonlocal sucesso
+        for future in futures:
+            indice = pendentes.pop(future)
+            try:
+                gravado = future.result()
+            except Exception as e:
+                print(f"❌ Erro não tratado no bloco {indice}: {e}")
+                gravado = False
+            if gravado and ao_gravar:
+                ao_gravar(indice)
+            sucesso = sucesso and gravado
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for indice, bloco in blocos:
+            if indice in pular:
+                continue
+            if len(pendentes) >= 2 * max_workers:
+                prontos, _ = concurrent.futures.wait(
+                    pendentes, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                concluir(prontos)
+            pendentes[executor.submit(gravar_bloco, bloco, indice)] = indice
+        concluir(list(pendentes))
+
+    return sucesso
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+
+"""
+Checkpoint local (SQLite) compartilhado pelos scripts de extração.
+Guarda as janelas de data já concluídas, o último cursor/URL de paginação
+e os lotes já gravados no banco, para que uma nova execução retome
+exatamente de onde a anterior parou.
+"""
+
+# Caminho do arquivo SQLite (pode ser sobrescrito pela variável de ambiente)
+checkpoint_path = Path(
+    os.getenv('ZENDESK_CHECKPOINT_DB', Path(__file__).resolve().parent / 'checkpoint.sqlite')
+)
+
+# Cada thread reaproveita a sua conexão (as threads de inserção compartilham o mesmo arquivo;
+# a concorrência entre elas fica com o timeout do SQLite)
+_local = threading.local()
+
+# O esquema é criado uma vez por processo e arquivo, não a cada leitura/gravação
+_esquema_criado = set()
+_lock = threading.Lock()
+
+_schema = """
+CREATE TABLE IF NOT EXISTS janelas (
+    processo TEXT NOT NULL,
+    inicio TEXT NOT NULL,
+    fim TEXT NOT NULL,
+    concluido_em TEXT NOT NULL,
+    PRIMARY KEY (processo, inicio, fim)
+);
+CREATE TABLE IF NOT EXISTS cursores (
+    processo TEXT PRIMARY KEY,
+    valor TEXT,
+    atualizado_em TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lotes (
+    processo TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    lote INTEGER NOT NULL,
+    concluido_em TEXT NOT NULL,
+    PRIMARY KEY (processo, chave, lote)
+);
+"""
+
+def _conexao():
+    conn = getattr(_local, 'conn', None)
+    # Processos filhos (fork) não usam a conexão herdada do pai
+    if conn is None or _local.chave != (os.getpid(), checkpoint_path):
+        conn = sqlite3.connect(checkpoint_path, timeout=30)
+        _local.conn, _local.chave = conn, (os.getpid(), checkpoint_path)
+
+    if _local.chave not in _esquema_criado:
+        with _lock:
+            if _local.chave not in _esquema_criado:
+                conn.executescript(_schema)
+                _esquema_criado.add(_local.chave)
+    return conn
+
+def _executar(sql, parametros=(), buscar=False):
+    conn = _conexao()
+    try:
+        cursor = conn.execute(sql, parametros)
+        resultado = cursor.fetchall() if buscar else None
+        conn.commit()
+        return resultado
+    except Exception:
+        conn.rollback()
+        raise
+
+def _agora():
+    return datetime.now().isoformat(timespec='seconds')
+
+############################################################
+#                    JANELAS DE DATA                       #
+############################################################
+
+def janela_concluida(processo, inicio, fim):
+    linhas = _executar(
+        "SELECT 1 FROM janelas WHERE processo = ? AND inicio = ? AND fim = ?",
+        (processo, str(inicio), str(fim)), buscar=True
+    )
+    return bool(linhas)
+
+def marcar_janela_concluida(processo, inicio, fim):
+    _executar(
+        "INSERT OR REPLACE INTO janelas (processo, inicio, fim, concluido_em) VALUES (?, ?, ?, ?)",
+        (processo, str(inicio), str(fim), _agora())
+    )
+
+def limpar_janelas(processo):
+    _executar("DELETE FROM janelas WHERE processo = ?", (processo,))
+
+############################################################
+#                  CURSOR / URL DE PAGINAÇÃO               #
+############################################################
+
+def obter_cursor(processo):
+    linhas = _executar("SELECT valor FROM cursores WHERE processo = ?", (processo,), buscar=True)
+    return linhas[0][0] if linhas else None
+
+def salvar_cursor(processo, valor):
+    _executar(
+        "INSERT OR REPLACE INTO cursores (processo, valor, atualizado_em) VALUES (?, ?, ?)",
+        (processo, valor, _agora())
+    )
+
+def limpar_cursor(processo):
+    _executar("DELETE FROM cursores WHERE processo = ?", (processo,))
+
+############################################################
+#                 LOTES GRAVADOS NO BANCO                  #
+############################################################
+
+def lotes_concluidos(processo, chave):
+    linhas = _executar(
+        "SELECT lote FROM lotes WHERE processo = ? AND chave = ?", (processo, chave), buscar=True
+    )
+    return {linha[0] for linha in linhas}
+
+def marcar_lote_concluido(processo, chave, lote):
+    _executar(
+        "INSERT OR REPLACE INTO lotes (processo, chave, lote, concluido_em) VALUES (?, ?, ?, ?)",
+        (processo, chave, int(lote), _agora())
+    )
+
+def limpar_lotes(processo, chave):
+    _executar("DELETE FROM lotes WHERE processo = ? AND chave = ?", (processo, chave))
+
+def chave_arquivo(caminho):
+    """
+    Identifica um arquivo exportado pelo conteúdo (sha1), para que o mesmo
+    CSV reprocessado reaproveite os lotes já gravados.
+    """
+    sha1 = hashlib.sha1()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            sha1.update(bloco)
+    return f"{os.path.basename(caminho)}:{sha1.hexdigest()}"
@@ -0,0 +1,486 @@
+import os
+import re
+import json
+import time
+import shutil
+import platform
+import threading
+import subprocess
+import concurrent.futures
+from pathlib import Path
+import medicao
+import checkpoint
+import explore_http
+
+"""
+Execução das exportações do Zendesk Explore compartilhada pelos scripts Scrap*_D-1.
+O login é feito uma única vez; os cookies da sessão autenticada são copiados
+para um navegador por exportação (KPI), e todas as exportações rodam em
+paralelo, cada uma baixando o CSV na sua própria pasta temporária.
+
+Cada exportação é um dict:
+    {"nome": "created", "url": URL do dashboard,
+     "filtrar": função(driver) ou None, "baixar": função(driver)}
+
+O selenium e o watchdog só são importados dentro das funções que abrem ou
+controlam o navegador: importar este módulo não os carrega.
+"""
+
+# Sem janela por padrão (servidores Linux); ZENDESK_EXPLORE_HEADLESS=0 abre o navegador visível
+headless_padrao = os.getenv('ZENDESK_EXPLORE_HEADLESS', '1') != '0'
+
+# Segundos aguardando o CSV de cada exportação aparecer na pasta
+timeout_download = 300
+
+# Sem watchdog, intervalo (segundos) entre as consultas à pasta de download
+intervalo_consulta = 1.0
+
+# Tempo máximo (segundos) de cada espera na página; as esperas terminam assim que a condição é atendida
+timeouts = {
+    'login': 30,     # formulário de login e redirecionamento para o dashboard
+    'pagina': 60,    # widgets do dashboard (filtros, métricas, 'Detalhar')
+    'tabela': 180,   # tabela do detalhamento terminar de carregar
+    'opcao': 5,      # itens de menus já abertos (colunas do detalhamento)
+}
+
+# Elementos do Explore usados nas esperas (ajustar aqui se a página mudar). A estratégia
+# é o valor de By.XPATH/By.CSS_SELECTOR/By.ID, para não importar o selenium aqui
+seletores = {
+    'detalhar': ("xpath", "//div[contains(@class, 'drill-in')]/span[contains(text(), 'Detalhar')]"),
+    'exportar': ("xpath", "//button[@data-test-id='drill-in-modal-export-button']"),
+    # Indicadores de carregamento (Zendesk Garden) e regiões ainda ocupadas
+    'carregando': ("css selector", "[data-garden-id^='loaders.'], [aria-busy='true']"),
+    # Filtro de data do dashboard: botão 'Tempo' e a aba 'Simples'
+    'filtro_tempo': ("id", "bimeTimeFilterWidget-2"),
+    'filtro_simples': ("id", "bimeSwitch-1"),
+}
+
+# ChromeDriver instalado e versão do Chrome para a qual ele foi baixado, ao lado do
+# checkpoint local (fica fora do git, como ele)
+driver_cache_path = Path(
+    os.getenv('ZENDESK_CHROMEDRIVER_CACHE', checkpoint.checkpoint_path.parent / 'chromedriver.json')
+)
+
+_driver_path = None
+
+############################################################
+#                      NAVEGADOR                           #
+############################################################
+
+def versao_chrome():
+    """
+    Versão do Chrome instalado: registro no Windows, binário no Linux/macOS.
+    """
+    if platform.system() == 'Windows':
+        comandos = [r'reg query "HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon" /v version']
+    else:
+        comandos = [
+            'google-chrome --version', 'google-chrome-stable --version',
+            'chromium --version', 'chromium-browser --version',
+            '"/Applications/Google Chrome.app/Contents/MacOS/Google Chrome" --version',
+        ]
+
+    for comando in comandos:
+        try:
+            saida = subprocess.check_output(comando, shell=True, stderr=subprocess.DEVNULL).decode()
+        except Exception:
+            continue
+        versao = re.search(r'\d+(\.\d+)+', saida)
+        if versao:
+            return versao.group(0)
+    return "Desconhecida"
+
+def _versao_principal(versao):
+    return versao.split('.')[0] if versao[:1].isdigit() else None
+
+def _ler_cache_driver():
+    try:
+        with open(driver_cache_path, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+def _salvar_cache_driver(versao_principal, caminho):
+    temporario = driver_cache_path.with_suffix('.tmp')
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump({'chrome': versao_principal, 'caminho': caminho}, arquivo)
+    os.replace(temporario, driver_cache_path)
+
+def _driver_salvo(versao_principal):
+    # Driver de uma execução anterior, se o Chrome ainda tem a mesma versão principal e o arquivo existe
+    if versao_principal is None:
+        return None
+    salvo = _ler_cache_driver()
+    if salvo.get('chrome') == versao_principal and os.path.isfile(salvo.get('caminho') or ''):
+        return salvo['caminho']
+    return None
+
+def caminho_chromedriver():
+    """
+    Retorna o ChromeDriver compatível (resolvido uma vez por execução, para
+    que os navegadores paralelos não disputem o mesmo download).
+    O caminho fica em driver_cache_path com a versão principal do Chrome; o
+    webdriver_manager, que consulta a rede, só roda quando não há driver
+    salvo, o arquivo sumiu ou o Chrome mudou de versão.
+    """
+    global _driver_path
+    if _driver_path is None:
+        versao = versao_chrome()
+        print(f"🌐 Versão do Chrome instalada: {versao}")
+        _driver_path = _driver_salvo(_versao_principal(versao))
+        if _driver_path is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+            _driver_path = ChromeDriverManager().install()
+            if _versao_principal(versao):
+                _salvar_cache_driver(_versao_principal(versao), _driver_path)
+        print(f"🧩 Versão do ChromeDriver utilizada: {os.path.basename(os.path.dirname(_driver_path))}")
+    return _driver_path
+
+def configure_browser(download_dir, headless=None):
+    """
+    Abre um Chrome que baixa os arquivos em download_dir.
+    Em modo headless a janela tem tamanho fixo, para os cliques por
+    posição (ActionChains) funcionarem como no navegador maximizado.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
+    if headless is None:
+        headless = headless_padrao
+
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    else:
+        options.add_argument("--start-maximized")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+
+    os.makedirs(download_dir, exist_ok=True)
+    prefs = {
+        "download.default_directory": download_dir,
+        "download.prompt_for_download": False,
+        "safebrowsing.enabled": True
+    }
+    options.add_experimental_option("prefs", prefs)
+    # Log de rede, para capturar a requisição da exportação (modo HTTP do explore_http)
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    driver = webdriver.Chrome(service=Service(caminho_chromedriver()), options=options)
+    # O Chrome headless só grava downloads com o comportamento liberado explicitamente
+    driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+    return driver
+
+############################################################
+#                   LOGIN E SESSÃO                         #
+############################################################
+
+@medicao.medido('login_explore')
+def login(driver, url):
+    """
+    Abre o dashboard (url), preenche as credenciais do .env e faz login.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    print("🔄 Acessando o site...")
+    driver.get(url)
+
+    try:
+        esperar(driver, EC.presence_of_element_located((By.ID, "user_email")), "O formulário de login", 'login').send_keys(
+            os.getenv('ZENDESK_EMAIL')
+        )
+        driver.find_element(By.ID, "user_password").send_keys(os.getenv('ZENDESK_PASSWORD'))
+        driver.find_element(By.ID, "sign-in-submit-button").click()
+
+        esperar(driver, EC.url_contains("dashboard"), "O redirecionamento para o dashboard (credenciais corretas?)", 'login')
+        print("✅ Login realizado com sucesso!")
+        return True
+
+    except Exception as e:
+        print("⚠️ Erro no processo de login:", e)
+        return False
+
+def obter_cookies(driver):
+    # Todos os cookies do navegador (inclusive de outros subdomínios do Zendesk)
+    return driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+
+def aplicar_cookies(driver, cookies):
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+
+def capturar_requisicao_csv(driver):
+    """
+    Procura no log de rede do navegador a requisição cuja resposta foi o CSV
+    exportado e retorna {url, method, headers, postData} (ou None).
+    """
+    eventos = [json.loads(entrada["message"])["message"] for entrada in driver.get_log("performance")]
+    enviadas = {
+        evento["params"]["requestId"]: evento["params"]["request"]
+        for evento in eventos if evento["method"] == "Network.requestWillBeSent"
+    }
+
+    for evento in reversed(eventos):
+        if evento["method"] != "Network.responseReceived":
+            continue
+        resposta = evento["params"]["response"]
+        cabecalhos = {chave.lower(): valor for chave, valor in resposta.get("headers", {}).items()}
+        if "csv" not in resposta.get("mimeType", "") and "attachment" not in cabecalhos.get("content-disposition", ""):
+            continue
+        requisicao = enviadas.get(evento["params"]["requestId"])
+        if requisicao:
+            return {
+                "url": requisicao["url"],
+                "method": requisicao.get("method", "GET"),
+                "headers": requisicao.get("headers", {}),
+                "postData": requisicao.get("postData"),
+            }
+    return None
+
+############################################################
+#                 ESPERAS NA PÁGINA                        #
+############################################################
+
+def esperar(driver, condicao, descricao, timeout='pagina'):
+    """
+    Espera a condição do Selenium (ex: EC.element_to_be_clickable(...)) e retorna
+    o resultado. timeout é uma chave de timeouts ou um número de segundos.
+    Se o tempo acabar, levanta RuntimeError dizendo o que não apareceu.
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+
+    segundos = timeouts[timeout] if isinstance(timeout, str) else timeout
+    inicio = time.monotonic()
+    try:
+        # A tabela é redesenhada enquanto carrega; elementos "velhos" só contam como ainda não pronto
+        return WebDriverWait(driver, segundos, ignored_exceptions=[StaleElementReferenceException]).until(condicao)
+    except TimeoutException:
+        raise RuntimeError(
+            f"{descricao} não apareceu em {segundos}s; a página do Explore pode ter mudado."
+        ) from None
+    finally:
+        medicao.contar('espera_selenium', time.monotonic() - inicio)
+
+def _tabela_carregada(driver):
+    # Botão de exportar habilitado e nenhum indicador de carregamento visível
+    botoes = driver.find_elements(*seletores['exportar'])
+    if not botoes or not botoes[0].is_displayed() or not botoes[0].is_enabled():
+        return False
+    if botoes[0].get_attribute("aria-disabled") == "true":
+        return False
+    if any(elemento.is_displayed() for elemento in driver.find_elements(*seletores['carregando'])):
+        return False
+    return botoes[0]
+
+def filtrar_periodo(driver, opcao):
+    """
+    Aplica o filtro de data do dashboard: 'Tempo' > 'Simples' > opcao (ex:
+    'Ontem', 'Última semana') e fecha o menu. Se algum passo falhar, levanta
+    a exceção (RuntimeError no tempo esgotado): exportar sem o filtro
+    baixaria outro período.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    print(f"🔄 Aplicando o filtro de data '{opcao}'...")
+    esperar(driver, EC.element_to_be_clickable(seletores['filtro_tempo']), "O botão 'Tempo'").click()
+    esperar(driver, EC.element_to_be_clickable(seletores['filtro_simples']), "A opção 'Simples'").click()
+    esperar(
+        driver, EC.element_to_be_clickable((By.XPATH, f"//div[contains(text(), '{opcao}')]")), f"A opção '{opcao}'"
+    ).click()
+    esperar(driver, EC.element_to_be_clickable(seletores['filtro_tempo']), "O botão 'Tempo' (para fechar)").click()
+    print(f"✅ Filtro de data ({opcao}) aplicado com sucesso!")
+
+def clicar_metrica(driver, localizador, nome):
+    """
+    Clica no número de uma métrica (KPI) do dashboard, com o clique "realista"
+    (move até o elemento, faz pausa e clica) que o Explore exige.
+    """
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.action_chains import ActionChains
+
+    print(f"🔎 Procurando a métrica '{nome}'...")
+    elemento = esperar(driver, EC.presence_of_element_located(localizador), f"A métrica '{nome}'")
+    ActionChains(driver).move_to_element(elemento).pause(1).click().perform()
+    print(f"✅ Clique na métrica '{nome}' realizado!")
+
+def abrir_detalhamento(driver):
+    from selenium.webdriver.support import expected_conditions as EC
+
+    print("🔍 Aguardando botão 'Detalhar' aparecer...")
+    esperar(driver, EC.element_to_be_clickable(seletores['detalhar']), "O botão 'Detalhar'").click()
+    print("✅ Botão 'Detalhar' clicado com sucesso!")
+
+def aguardar_tabela(driver):
+    """
+    Espera a tabela do detalhamento terminar de carregar (botão 'Exportar'
+    habilitado e sem indicador de carregamento) e retorna o botão 'Exportar'.
+    """
+    print("⏳ Aguardando a tabela do detalhamento carregar...")
+    inicio = time.time()
+    botao = esperar(driver, _tabela_carregada, "A tabela do detalhamento carregada", 'tabela')
+    print(f"✅ Tabela carregada em {time.time() - inicio:.1f}s.")
+    return botao
+
+############################################################
+#                 EXPORTAÇÕES EM PARALELO                  #
+############################################################
+
+def _observar_pasta(diretorio, aviso):
+    """
+    Inicia um observador do watchdog que acorda aguardar_csv (aviso.set())
+    quando um arquivo é criado/renomeado na pasta (o .crdownload vira .csv).
+    Retorna None se o watchdog não estiver instalado.
+    """
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+    except ImportError:  # sem watchdog, aguardar_csv consulta a pasta periodicamente
+        return None
+
+    class AvisoDownload(FileSystemEventHandler):
+        def on_any_event(self, event):
+            aviso.set()
+
+    observer = Observer()
+    observer.schedule(AvisoDownload(), diretorio)
+    observer.start()
+    return observer
+
+def _csv_concluido(diretorio):
+    arquivos = os.listdir(diretorio)
+    if any(f.endswith(".crdownload") for f in arquivos):
+        return None
+    csvs = [f for f in arquivos if f.lower().endswith(".csv")]
+    return os.path.join(diretorio, csvs[0]) if csvs else None
+
+def _tamanho_estavel(caminho, intervalo=0.5):
+    try:
+        antes = os.path.getsize(caminho)
+        time.sleep(intervalo)
+        return os.path.getsize(caminho) == antes
+    except OSError:
+        return False
+
+def aguardar_csv(diretorio, timeout=None):
+    """
+    Aguarda o CSV da exportação ficar pronto na pasta (exclusiva da exportação):
+    sem .crdownload em andamento e com tamanho estável.
+    Com o watchdog instalado (inotify no Linux) a espera termina assim que o
+    Chrome renomeia o arquivo final; sem ele, a pasta é consultada a cada
+    intervalo_consulta segundos.
+    Retorna o caminho do arquivo ou None se o tempo acabar.
+    """
+    prazo = time.monotonic() + (timeout or timeout_download)
+    aviso = threading.Event()
+
+    observer = _observar_pasta(diretorio, aviso)
+
+    try:
+        while time.monotonic() < prazo:
+            aviso.clear()
+            arquivo = _csv_concluido(diretorio)
+            if arquivo and _tamanho_estavel(arquivo):
+                return arquivo
+            # Com o watchdog, a espera máxima é só uma salvaguarda caso um evento se perca
+            espera = 5.0 if observer is not None else intervalo_consulta
+            aviso.wait(min(espera, max(0.0, prazo - time.monotonic())))
+        return None
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
+def _destino_livre(download_dir, nome_arquivo):
+    # O Explore repete o nome do arquivo; um CSV pendente de outra execução não pode ser sobrescrito
+    base, extensao = os.path.splitext(nome_arquivo)
+    destino, n = os.path.join(download_dir, nome_arquivo), 1
+    while os.path.exists(destino):
+        destino = os.path.join(download_dir, f"{base} ({n}){extensao}")
+        n += 1
+    return destino
+
+def _rodar_exportacao(exportacao, driver, pasta, download_dir, cookies):
+    with medicao.etapa('exportar_explore_navegador', exportacao=exportacao["nome"]) as registro:
+        destino = _exportar_no_navegador(exportacao, driver, pasta, download_dir, cookies)
+        registro['ok'] = destino is not None
+        return destino
+
+def _exportar_no_navegador(exportacao, driver, pasta, download_dir, cookies):
+    nome = exportacao["nome"]
+    try:
+        if driver is None:
+            driver = configure_browser(pasta)
+            aplicar_cookies(driver, cookies)
+            driver.get(exportacao["url"])
+
+        if exportacao.get("filtrar"):
+            exportacao["filtrar"](driver)
+        exportacao["baixar"](driver)
+
+        print(f"⏳ [{nome}] Aguardando o download do CSV...")
+        with medicao.etapa('aguardar_csv', tempo_em='espera_selenium', exportacao=nome) as registro:
+            arquivo = aguardar_csv(pasta)
+            registro['ok'] = arquivo is not None
+        if arquivo is None:
+            print(f"⚠️ [{nome}] Tempo limite atingido! Nenhum CSV baixado.")
+            return None
+
+        destino = _destino_livre(download_dir, os.path.basename(arquivo))
+        shutil.move(arquivo, destino)
+        print(f"✅ [{nome}] Download concluído: {os.path.basename(destino)}")
+
+        try:
+            requisicao = capturar_requisicao_csv(driver)
+            if requisicao:
+                explore_http.salvar_requisicao(nome, requisicao, exportacao.get("periodo"))
+                print(f"📝 [{nome}] Requisição da exportação capturada para o modo HTTP.")
+        except Exception as e:
+            # A captura é só para o modo HTTP; o CSV já está baixado
+            print(f"⚠️ [{nome}] Não foi possível capturar a requisição da exportação: {e}")
+        return destino
+    except Exception as e:
+        print(f"❌ [{nome}] Erro na exportação: {e}")
+        return None
+    finally:
+        if driver is not None:
+            driver.quit()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+def executar_exportacoes(exportacoes, download_dir):
+    """
+    Faz login uma vez e roda todas as exportações em paralelo, um navegador
+    por exportação, compartilhando a sessão por cookies. O navegador do login
+    é reaproveitado pela primeira exportação.
+    Os CSVs terminam em download_dir.
+
+    Retorna:
+    - dict nome -> caminho do CSV baixado (None se a exportação falhou),
+      ou {} se o login falhou.
+    """
+    os.makedirs(download_dir, exist_ok=True)
+    pastas = {exp["nome"]: os.path.join(download_dir, f"tmp_{exp['nome']}") for exp in exportacoes}
+
+    primeira = exportacoes[0]
+    driver_login = configure_browser(pastas[primeira["nome"]])
+    if not login(driver_login, primeira["url"]):
+        driver_login.quit()
+        shutil.rmtree(pastas[primeira["nome"]], ignore_errors=True)
+        return {}
+    cookies = obter_cookies(driver_login)
+    explore_http.salvar_cookies(cookies)
+
+    print(f"🚀 Iniciando {len(exportacoes)} exportação(ões) em paralelo...")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(exportacoes)) as executor:
+        futures = {
+            exp["nome"]: executor.submit(
+                _rodar_exportacao, exp, driver_login if exp is primeira else None,
+                pastas[exp["nome"]], download_dir, cookies
+            )
+            for exp in exportacoes
+        }
+        return {nome: future.result() for nome, future in futures.items()}
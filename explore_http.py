@@ -0,0 +1,216 @@
+import os
+import json
+import tempfile
+import threading
+import concurrent.futures
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlparse
+import medicao
+
+"""
+Exportação do Zendesk Explore sem navegador.
+Numa execução com Selenium (explore.py), a requisição que devolve o CSV de
+cada exportação e os cookies da sessão são capturados e guardados em
+capturas_path, por exportação e filtro de data (periodo). No modo HTTP essa
+requisição é repetida com httpx, sem Chrome: o corpo da resposta é baixado
+em streaming para um arquivo temporário, conferido inteiro e só então lido
+pelo script.
+
+Se a sessão expirou, a resposta não é o CSV esperado ou as datas dele estão
+fora do período (conferir_periodo), exportar() retorna None sem gravar
+nenhuma linha, e o script volta ao navegador, que faz login e atualiza a
+captura.
+"""
+
+# Arquivo com as requisições e cookies capturados (fica fora do git, como o checkpoint)
+capturas_path = Path(
+    os.getenv('ZENDESK_EXPLORE_CAPTURAS', Path(__file__).resolve().parent / 'explore_capturas.json')
+)
+
+# ZENDESK_EXPLORE_MODO=http tenta a exportação sem navegador antes do Selenium
+modo_http = os.getenv('ZENDESK_EXPLORE_MODO', 'navegador') == 'http'
+
+# Segundos para a resposta da exportação (o Explore monta o CSV antes de começar a enviar)
+timeout_resposta = 300
+
+# Cabeçalhos que não devem ser repetidos (o httpx recalcula ou vêm dos cookies atuais)
+_cabecalhos_ignorados = {'cookie', 'content-length', 'host', 'connection', 'accept-encoding'}
+
+# Dias que cada filtro de data cobre, terminando ontem. "Última semana" é a semana completa
+# anterior; a folga cobre semanas começando no domingo ou na segunda
+dias_periodo = {'ontem': 1, 'ultima_semana': 14}
+
+_lock = threading.Lock()
+
+class PeriodoDivergente(ValueError):
+    """O CSV repetido trouxe datas fora do período pedido (ex: captura de um intervalo fixo antigo)."""
+
+############################################################
+#                        CAPTURAS                          #
+############################################################
+
+def carregar_capturas():
+    if not capturas_path.exists():
+        return {'cookies': [], 'requisicoes': {}}
+    with open(capturas_path, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+def _salvar(capturas):
+    temporario = capturas_path.with_suffix('.tmp')
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(capturas, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, capturas_path)
+
+def salvar_cookies(cookies):
+    with _lock:
+        capturas = carregar_capturas()
+        capturas['cookies'] = cookies
+        _salvar(capturas)
+
+def _chave(nome, periodo):
+    # A mesma exportação com outro filtro de data é outra requisição
+    return f"{nome}:{periodo}" if periodo else nome
+
+def salvar_requisicao(nome, requisicao, periodo=None):
+    """
+    Guarda a requisição (url, method, headers, postData) que gerou o CSV da
+    exportação nome com o filtro de data periodo ("ontem", "ultima_semana").
+    """
+    with _lock:
+        capturas = carregar_capturas()
+        capturas['requisicoes'][_chave(nome, periodo)] = requisicao
+        _salvar(capturas)
+
+def _cabecalho_cookie(cookies, url):
+    host = urlparse(url).hostname or ''
+    return '; '.join(
+        f"{cookie['name']}={cookie['value']}" for cookie in cookies
+        if host == cookie['domain'].lstrip('.') or host.endswith('.' + cookie['domain'].lstrip('.'))
+    )
+
+############################################################
+#                   PERÍODO DO CSV                         #
+############################################################
+
+def conferir_periodo(df, coluna, periodo, hoje=None):
+    """
+    Confere se as datas de df[coluna] (já convertidas pelo tratamento) estão
+    no período (dias_periodo, terminando ontem) e devolve df.
+    Levanta PeriodoDivergente se alguma estiver fora e ValueError se a coluna
+    não existir (a resposta não é o CSV da exportação). Períodos desconhecidos
+    não são conferidos.
+    """
+    if periodo not in dias_periodo:
+        return df
+    if coluna not in df.columns:
+        raise ValueError(f"coluna {coluna} ausente; colunas recebidas: {list(df.columns)[:5]}")
+
+    fim = datetime.combine(hoje or datetime.now().date(), datetime.min.time())
+    inicio = fim - timedelta(days=dias_periodo[periodo])
+    datas = df[coluna].dropna()
+    fora = datas[(datas < inicio) | (datas >= fim)]
+    if len(fora):
+        raise PeriodoDivergente(
+            f"{len(fora)} linha(s) com {coluna} fora de {inicio:%Y-%m-%d} a {fim - timedelta(days=1):%Y-%m-%d} "
+            f"(ex: {fora.iloc[0]})"
+        )
+    return df
+
+############################################################
+#                      REPETIÇÃO (HTTP)                    #
+############################################################
+
+def _baixar_corpo(response, destino):
+    # Grava a resposta em blocos, sem carregá-la inteira em memória
+    for bloco in response.iter_bytes():
+        medicao.contar('bytes', len(bloco))
+        destino.write(bloco)
+
+def exportar(nome, ler_csv, periodo=None, conferir=None):
+    """
+    Repete a requisição capturada da exportação nome com o filtro periodo e
+    baixa o corpo da resposta para um arquivo temporário. conferir(caminho)
+    (ex: as datas do CSV inteiro com conferir_periodo) roda antes de
+    ler_csv(caminho) (ex: a leitura e gravação no banco do script), para que
+    uma resposta de outro período não chegue a gravar nenhuma linha.
+
+    Retorna:
+    - o resultado de ler_csv, ou None se não houver captura para o período,
+      a sessão tiver expirado, a resposta não puder ser lida como o CSV
+      esperado ou trouxer datas de outro período.
+    """
+    with medicao.etapa('exportar_explore_http', exportacao=nome, periodo=periodo) as registro:
+        resultado = _exportar(nome, ler_csv, periodo, conferir)
+        registro['ok'] = resultado is not None and resultado is not False
+        return resultado
+
+def _exportar(nome, ler_csv, periodo, conferir):
+    # Só o modo HTTP usa o httpx; a exportação pelo navegador não precisa carregá-lo
+    import httpx
+
+    capturas = carregar_capturas()
+    requisicao = capturas['requisicoes'].get(_chave(nome, periodo))
+    if not requisicao:
+        print(f"⚠️ [{nome}] Nenhuma requisição capturada ainda para o período {periodo}; "
+              f"é preciso uma execução pelo navegador.")
+        return None
+
+    cabecalhos = {
+        chave: valor for chave, valor in requisicao.get('headers', {}).items()
+        if chave.lower() not in _cabecalhos_ignorados and not chave.startswith(':')
+    }
+    cabecalhos['Cookie'] = _cabecalho_cookie(capturas['cookies'], requisicao['url'])
+
+    print(f"🌐 [{nome}] Exportando via HTTP (sem navegador)...")
+    medicao.contar('http')
+    with tempfile.NamedTemporaryFile(prefix=f'explore_{nome}_', suffix='.csv', delete=False) as temporario:
+        caminho = temporario.name
+    try:
+        with httpx.stream(
+            requisicao.get('method', 'GET'), requisicao['url'], headers=cabecalhos,
+            content=requisicao.get('postData'), timeout=httpx.Timeout(timeout_resposta),
+        ) as response:
+            tipo = response.headers.get('content-type', '')
+            anexo = 'attachment' in response.headers.get('content-disposition', '')
+            if response.status_code != 200 or not ('csv' in tipo or anexo):
+                print(f"⚠️ [{nome}] Resposta inesperada (HTTP {response.status_code}, {tipo or 'sem content-type'}). "
+                      f"A sessão pode ter expirado.")
+                return None
+            with open(caminho, 'wb') as destino:
+                _baixar_corpo(response, destino)
+
+        if conferir:
+            conferir(caminho)
+        resultado = ler_csv(caminho)
+    except httpx.HTTPError as e:
+        print(f"⚠️ [{nome}] Falha na exportação via HTTP: {e}")
+        return None
+    except PeriodoDivergente as e:
+        print(f"⚠️ [{nome}] A requisição capturada trouxe outro período ({e}). A captura será refeita pelo navegador.")
+        return None
+    except (ValueError, KeyError) as e:
+        # ParserError, EmptyDataError e UnicodeDecodeError são ValueError; KeyError vem das colunas
+        # esperadas pelo tratamento (ex: uma página HTML de erro lida como CSV)
+        print(f"⚠️ [{nome}] A resposta não pôde ser lida como o CSV da exportação: {type(e).__name__}: {e}")
+        return None
+    finally:
+        os.remove(caminho)
+
+    print(f"✅ [{nome}] Exportação via HTTP concluída.")
+    return resultado
+
+def exportar_varios(leitores, periodo=None, conferidores=None):
+    """
+    Roda exportar() em paralelo, com o mesmo periodo, para cada exportação de
+    leitores (dict nome -> ler_csv daquela exportação). conferidores é um dict
+    nome -> conferir, opcional.
+    Retorna dict nome -> resultado (None nas que falharam).
+    """
+    conferidores = conferidores or {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(leitores)) as executor:
+        futures = {
+            nome: executor.submit(exportar, nome, ler_csv, periodo, conferidores.get(nome))
+            for nome, ler_csv in leitores.items()
+        }
+        return {nome: future.result() for nome, future in futures.items()}
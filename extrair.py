@@ -0,0 +1,194 @@
+import sys
+import argparse
+import importlib
+from datetime import datetime, timedelta
+
+"""
+Ponto de entrada único das extrações, sem editar os valores fixos dos scripts:
+
+    python extrair.py tickets --dias 5
+    python extrair.py tickets --inicio 2024-01-01 --fim 2024-01-31 --buscas 4 --gravadores 2 --lote 500
+    python extrair.py tickets --modo incremental
+    python extrair.py activities --destino excel
+    python extrair.py explore-created-solved --periodo ultima_semana --gravadores 4
+    python extrair.py explore-atribuicao --sem-scraping
+
+Cada subcomando carrega só o script que vai rodar, ajusta as variáveis de
+configuração dele (concorrência, tamanho dos lotes) e chama a mesma função
+que o __main__ do script. Os scripts continuam rodando sozinhos com os
+valores fixos de antes. O código de saída é 1 se a extração não terminou.
+"""
+
+# Scripts carregados pelo importlib (os do Explore têm hífen no nome do arquivo)
+SCRIPTS = {
+    'tickets': 'tickets',
+    'activities': 'activities',
+    'explore-created-solved': 'ScrapCriadosResolvidos_D-1',
+    'explore-atribuicao': 'ScrapTicketAtribuicao_D-1',
+}
+
+def _data(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida: {valor!r} (use YYYY-MM-DD)") from None
+
+def _positivo(valor):
+    numero = int(valor)
+    if numero < 1:
+        raise argparse.ArgumentTypeError(f"precisa ser maior que zero: {valor}")
+    return numero
+
+############################################################
+#                      SUBCOMANDOS                         #
+############################################################
+
+def rodar_tickets(script, args):
+    import zendesk_http
+
+    if args.buscas:
+        # O limite real das buscas é o do endpoint no zendesk_http
+        zendesk_http.configurar_concorrencia('search', args.buscas)
+        script.concorrencia_pipeline['busca'] = args.buscas
+    if args.tratadores:
+        script.concorrencia_pipeline['tratamento'] = args.tratadores
+    if args.gravadores:
+        script.concorrencia_pipeline['carga'] = args.gravadores
+    if args.lote:
+        script.tamanho_lote = args.lote
+    exportar_para_banco = args.destino == 'banco'
+
+    if args.modo == 'incremental':
+        # Sem cursor salvo, começa em --inicio (padrão: D-1), como a opção 7 do menu
+        inicio = args.inicio or datetime.now() - timedelta(days=1)
+        concluido = script.executar_extracao_incremental(exportar_para_banco, start_date=inicio)
+    elif args.modo == 'backfill':
+        concluido = script.executar_extracao_incremental(
+            exportar_para_banco, start_date=args.inicio, ignorar_cursor=True
+        )
+    else:
+        if args.inicio:
+            inicio = args.inicio
+            fim = (args.fim or args.inicio) + timedelta(days=1)
+        else:
+            inicio, fim = datetime.now() - timedelta(days=args.dias), datetime.now()
+        concluido = script.executar_extracao_paralelo(inicio, fim, exportar_para_banco)
+
+    if args.remover_duplicados:
+        script.remover_duplicados()
+    return concluido
+
+def rodar_activities(script, args):
+    if args.lote:
+        script.tamanho_lote = args.lote
+    if args.paginas_por_lote:
+        script.paginas_por_lote = args.paginas_por_lote
+    concluido = script.executar_extracao(exportar_para_banco=args.destino == 'banco')
+    if args.remover_duplicados:
+        script.excluir_registros_duplicados()
+    return concluido
+
+def _configurar_explore(script, args):
+    import explore_http
+
+    if args.modo_explore:
+        explore_http.modo_http = args.modo_explore == 'http'
+    if args.lote:
+        script.tamanho_chunk = args.lote
+    if args.gravadores:
+        script.max_workers_carga = args.gravadores
+
+def rodar_created_solved(script, args):
+    _configurar_explore(script, args)
+    concluido = script.executar(args.periodo, acao='2' if args.destino == 'banco' else '1')
+    if args.remover_duplicados:
+        for tabela in ("BD_CreatedTicketsSAC", "BD_SolvedTicketsSAC"):
+            script.remover_duplicatas_banco(tabela)
+    return concluido
+
+def rodar_atribuicao(script, args):
+    _configurar_explore(script, args)
+    concluido = script.executar(args.periodo, executar_scraping=not args.sem_scraping)
+    if args.remover_duplicados:
+        script.remover_duplicatas_banco()
+    return concluido
+
+############################################################
+#                       ARGUMENTOS                         #
+############################################################
+
+def _argumentos_comuns(parser, destinos=('banco',), gravadores=True):
+    parser.add_argument('--destino', choices=destinos, default='banco', help='onde gravar os dados (padrão: banco)')
+    parser.add_argument('--lote', type=_positivo, help='linhas por lote gravado no banco')
+    if gravadores:
+        parser.add_argument('--gravadores', type=_positivo, help='threads gravando no banco ao mesmo tempo')
+    parser.add_argument('--remover-duplicados', action='store_true',
+                        help='roda a varredura completa de duplicatas depois da extração')
+
+def _argumentos_explore(parser):
+    parser.add_argument('--periodo', choices=['ontem', 'ultima_semana'], default='ontem',
+                        help='filtro de data aplicado no Explore (padrão: ontem)')
+    parser.add_argument('--modo-explore', choices=['navegador', 'http'],
+                        help='sobrescreve ZENDESK_EXPLORE_MODO')
+
+def montar_parser():
+    parser = argparse.ArgumentParser(description='Extrações do Zendesk para o SQL Server.')
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+
+    tickets = subcomandos.add_parser('tickets', help='tickets pela API de busca ou pela exportação incremental')
+    tickets.add_argument('--modo', choices=['dias', 'incremental', 'backfill'], default='dias',
+                         help='dias: busca dia a dia em paralelo (padrão); incremental: a partir do cursor salvo; '
+                              'backfill: exportação incremental completa')
+    tickets.add_argument('--inicio', type=_data, help='primeiro dia (YYYY-MM-DD)')
+    tickets.add_argument('--fim', type=_data, help='último dia, inclusive (padrão: o próprio --inicio)')
+    tickets.add_argument('--dias', type=_positivo, default=5,
+                         help='sem --inicio, busca os últimos N dias até agora (padrão: 5)')
+    tickets.add_argument('--buscas', type=_positivo, help='buscas simultâneas na API')
+    tickets.add_argument('--tratadores', type=_positivo, help='processos rodando o tratamento')
+    _argumentos_comuns(tickets, destinos=('banco', 'excel'))
+    tickets.set_defaults(executar=rodar_tickets)
+
+    # A paginação de /activities é sequencial (cada página traz a próxima) e a gravação é uma só thread
+    activities = subcomandos.add_parser('activities', help='atividades dos últimos 30 dias')
+    activities.add_argument('--paginas-por-lote', type=_positivo, help='páginas tratadas e gravadas juntas')
+    _argumentos_comuns(activities, destinos=('banco', 'excel'), gravadores=False)
+    activities.set_defaults(executar=rodar_activities)
+
+    created_solved = subcomandos.add_parser('explore-created-solved', help='Created e Solved Tickets do Explore')
+    _argumentos_explore(created_solved)
+    _argumentos_comuns(created_solved, destinos=('banco', 'excel'))
+    created_solved.set_defaults(executar=rodar_created_solved)
+
+    atribuicao = subcomandos.add_parser('explore-atribuicao', help='atualizações de agentes (atribuição) do Explore')
+    _argumentos_explore(atribuicao)
+    atribuicao.add_argument('--sem-scraping', action='store_true',
+                            help='só grava os CSVs baixados antes e ainda pendentes')
+    _argumentos_comuns(atribuicao)
+    atribuicao.set_defaults(executar=rodar_atribuicao)
+
+    return parser
+
+def main(argv=None):
+    args = montar_parser().parse_args(argv)
+    if args.comando == 'tickets' and args.fim and not args.inicio:
+        montar_parser().error('--fim exige --inicio')
+
+    script = importlib.import_module(SCRIPTS[args.comando])
+    import banco
+    import medicao
+
+    # Mesmo nome de job de quando o script roda sozinho
+    medicao.script = f"{SCRIPTS[args.comando]}.py"
+    try:
+        concluido = args.executar(script, args)
+    finally:
+        # Os scrapers do Explore não usam a API: o cliente só é fechado se foi carregado
+        zendesk_http = sys.modules.get('zendesk_http')
+        if zendesk_http is not None:
+            zendesk_http.fechar()
+        banco.fechar()
+        medicao.finalizar()
+    return 0 if concluido else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
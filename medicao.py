@@ -0,0 +1,280 @@
+import os
+import sys
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import metricas
+
+"""
+Medição leve das execuções dos scripts de extração.
+Cada etapa (busca, tratamento, gravação, deduplicação, exportação do
+Explore) é medida com etapa() ou com o decorador medido() e vira uma linha
+no log JSON-lines (log_path) com duração, linhas, bytes, chamadas HTTP,
+repetições e idas ao banco. No fim, finalizar() imprime o resumo da
+execução agrupado por etapa.
+
+Os contadores (http, repeticoes, bytes, idas_banco) são globais e
+incrementados por zendesk_http, explore_http, banco e carga com contar().
+Cada etapa registra quanto eles andaram enquanto ela rodava; etapas que
+rodam ao mesmo tempo em threads diferentes dividem os mesmos contadores.
+
+O resumo das etapas deste processo é somado em memória. Processos filhos
+(ex: o ProcessPoolExecutor do tickets.py) herdam o id da execução pela
+variável ZENDESK_EXECUCAO e gravam no mesmo log; o resumo lê só as linhas
+gravadas desde o início da execução para incluir as etapas deles. No início
+de cada execução, um log maior que tamanho_max_log é girado para .1.
+"""
+
+# Log das etapas (uma linha JSON por etapa); fica fora do git, como o checkpoint
+log_path = Path(
+    os.getenv('ZENDESK_LOG_EXECUCAO', Path(__file__).resolve().parent / 'execucoes.jsonl')
+)
+
+# Bytes a partir dos quais o log é girado no início da execução (o anterior fica em <log>.1)
+tamanho_max_log = 20 * 1024 * 1024
+
+# Identificador da execução, repassado aos processos filhos pelo ambiente
+_processo_filho = bool(os.getenv('ZENDESK_EXECUCAO'))
+execucao = os.getenv('ZENDESK_EXECUCAO') or f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+os.environ['ZENDESK_EXECUCAO'] = execucao
+
+CONTADORES = [
+    'http', 'repeticoes', 'respostas_429', 'paginas', 'bytes', 'idas_banco',
+    'linhas_buscadas', 'linhas_gravadas', 'linhas_rejeitadas',
+    'espera_selenium', 'deduplicacao',
+]
+
+_contadores = dict.fromkeys(CONTADORES, 0)
+# Primeiro e último instante (perf_counter) em que cada contador andou
+_instantes = {}
+# Resumo por etapa das medições deste processo
+_agregado = {}
+_lock = threading.Lock()
+_inicio = time.perf_counter()
+
+def _tamanho_log():
+    try:
+        return log_path.stat().st_size
+    except OSError:
+        return 0
+
+def _girar_log():
+    if _tamanho_log() <= tamanho_max_log:
+        return
+    try:
+        os.replace(log_path, log_path.with_name(log_path.name + '.1'))
+    except OSError as e:
+        print(f"⚠️ Não foi possível girar o log de execução ({log_path}): {e}")
+
+# Só o processo principal gira o log; o resumo lê a partir do tamanho que ele tinha no início
+if not _processo_filho:
+    _girar_log()
+_inicio_log = _tamanho_log()
+
+# Nome do job no log e nas métricas; padrão: o arquivo executado (o extrair.py informa o script que roda)
+script = None
+
+def _script():
+    if script:
+        return script
+    return os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python'
+
+def contar(nome, quantidade=1):
+    agora = time.perf_counter()
+    with _lock:
+        _contadores[nome] += quantidade
+        _instantes.setdefault(nome, [agora, agora])[1] = agora
+
+def instantes(nome):
+    """
+    (primeiro, último) instante em segundos desde o início da execução em que
+    o contador nome andou, ou None se ele nunca andou.
+    """
+    with _lock:
+        marcados = _instantes.get(nome)
+    return None if marcados is None else (marcados[0] - _inicio, marcados[1] - _inicio)
+
+def _copiar_contadores():
+    with _lock:
+        return dict(_contadores)
+
+def _registrar(registro):
+    linha = json.dumps(registro, ensure_ascii=False, default=str)
+    with _lock:
+        try:
+            with open(log_path, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(linha + '\n')
+        except OSError as e:
+            print(f"⚠️ Não foi possível gravar o log de execução ({log_path}): {e}")
+
+############################################################
+#                        ETAPAS                            #
+############################################################
+
+@contextmanager
+def etapa(nome, linhas_em=None, tempo_em=None, **campos):
+    """
+    Mede o bloco como uma etapa. O dict devolvido pode receber 'linhas',
+    'bytes', 'ok' ou outros campos, gravados junto com a medição:
+
+        with medicao.etapa('tratar_dados') as registro:
+            df = tratar(...)
+            registro['linhas'] = len(df)
+
+    linhas_em e tempo_em somam as linhas e a duração da etapa a um contador
+    (ex: linhas_em='linhas_buscadas', tempo_em='deduplicacao').
+    Uma exceção no bloco marca a etapa com ok=False e o erro, e é repassada.
+    """
+    registro = {'linhas': None, 'ok': True, **campos}
+    antes = _copiar_contadores()
+    inicio = datetime.now()
+    relogio = time.perf_counter()
+    try:
+        yield registro
+    except BaseException as e:
+        registro['ok'] = False
+        registro['erro'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duracao = time.perf_counter() - relogio
+        if linhas_em and registro.get('linhas'):
+            contar(linhas_em, registro['linhas'])
+        if tempo_em:
+            contar(tempo_em, duracao)
+        depois = _copiar_contadores()
+        deltas = {contador: round(depois[contador] - antes[contador], 4) for contador in CONTADORES}
+        if registro.get('bytes') is not None:
+            deltas['bytes'] = registro.pop('bytes')
+        medida = {
+            'execucao': execucao,
+            'script': _script(),
+            'pid': os.getpid(),
+            'etapa': nome,
+            'inicio': inicio.isoformat(timespec='seconds'),
+            'duracao': round(duracao, 4),
+            **deltas,
+            **registro,
+        }
+        with _lock:
+            _somar(_agregado, medida)
+        _registrar(medida)
+
+def _contar_linhas(valor):
+    try:
+        return len(valor)
+    except TypeError:
+        return None
+
+def medido(nome, linhas=None, linhas_em=None, tempo_em=None):
+    """
+    Decorador que mede cada chamada da função como a etapa nome.
+    linhas: 'resultado' conta len() do retorno; 'entrada', len() do primeiro argumento.
+    linhas_em e tempo_em: como em etapa().
+    Se a função retornar False (falha tratada), a etapa fica com ok=False.
+    """
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            with etapa(nome, linhas_em=linhas_em, tempo_em=tempo_em) as registro:
+                if linhas == 'entrada' and args:
+                    registro['linhas'] = _contar_linhas(args[0])
+                resultado = funcao(*args, **kwargs)
+                if linhas == 'resultado':
+                    registro['linhas'] = _contar_linhas(resultado)
+                if resultado is False:
+                    registro['ok'] = False
+                return resultado
+        return medida
+    return decorar
+
+############################################################
+#                   RESUMO DA EXECUÇÃO                     #
+############################################################
+
+def _somar(agregado, registro):
+    item = agregado.setdefault(registro['etapa'], {
+        'chamadas': 0, 'falhas': 0, 'duracao': 0.0, 'linhas': 0, **dict.fromkeys(CONTADORES, 0)
+    })
+    item['chamadas'] += 1
+    item['falhas'] += 0 if registro.get('ok', True) else 1
+    item['duracao'] += registro.get('duracao') or 0
+    item['linhas'] += registro.get('linhas') or 0
+    for contador in CONTADORES:
+        item[contador] += registro.get(contador) or 0
+
+def _etapas_dos_filhos():
+    # Só as linhas gravadas desde o início desta execução (se o log foi girado no meio, lê o novo inteiro)
+    if not log_path.exists():
+        return []
+    etapas = []
+    with open(log_path, 'rb') as arquivo:
+        arquivo.seek(_inicio_log if _tamanho_log() >= _inicio_log else 0)
+        for linha in arquivo:
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                continue
+            if registro.get('execucao') == execucao and 'etapa' in registro and registro.get('pid') != os.getpid():
+                etapas.append(registro)
+    return etapas
+
+def resumo():
+    """
+    Agrega as etapas desta execução por nome: chamadas, falhas, tempo total,
+    linhas e contadores. As deste processo vêm da memória; as dos processos
+    filhos, das linhas do log gravadas durante a execução.
+    """
+    with _lock:
+        agregado = {nome: dict(item) for nome, item in _agregado.items()}
+    for registro in _etapas_dos_filhos():
+        _somar(agregado, registro)
+    return agregado
+
+def _bytes_legiveis(valor):
+    for unidade in ['B', 'KB', 'MB']:
+        if valor < 1024:
+            return f"{valor:.0f}{unidade}"
+        valor /= 1024
+    return f"{valor:.1f}GB"
+
+def paginas_por_segundo():
+    """
+    Páginas da API recebidas por segundo, entre a primeira requisição HTTP
+    e a última página recebida (0 se nenhuma página foi buscada).
+    """
+    paginas, requisicoes = instantes('paginas'), instantes('http')
+    if paginas is None or requisicoes is None:
+        return 0.0
+    janela = paginas[1] - requisicoes[0]
+    return _copiar_contadores()['paginas'] / janela if janela > 0 else 0.0
+
+def finalizar():
+    """
+    Imprime o resumo da execução, grava no log uma linha com os totais e
+    exporta as métricas (metricas.py, se configurado).
+    Chamar no fim do script, junto com zendesk_http.fechar().
+    """
+    agregado = resumo()
+    total = time.perf_counter() - _inicio
+    contadores = _copiar_contadores()
+    fim = datetime.now()
+    _registrar({'execucao': execucao, 'script': _script(), 'pid': os.getpid(),
+                'fim': fim.isoformat(timespec='seconds'), 'duracao_total': round(total, 4), **contadores})
+    metricas.exportar(metricas.nome_job(_script()), contadores, agregado, total, paginas_por_segundo(), fim)
+
+    print(f"\n📊 Resumo da execução {execucao} ({total:.1f}s)")
+    if not agregado:
+        print("   Nenhuma etapa medida.")
+        return
+    print(f"{'etapa':<30} {'chamadas':>8} {'falhas':>6} {'tempo(s)':>9} {'linhas':>9} {'linhas/s':>9} "
+          f"{'http':>6} {'repet.':>6} {'bytes':>8} {'banco':>7}")
+    for nome, item in sorted(agregado.items(), key=lambda par: -par[1]['duracao']):
+        por_segundo = item['linhas'] / item['duracao'] if item['duracao'] and item['linhas'] else 0
+        print(f"{nome:<30} {item['chamadas']:>8} {item['falhas']:>6} {item['duracao']:>9.2f} {item['linhas']:>9} "
+              f"{por_segundo:>9.0f} {item['http']:>6} {item['repeticoes']:>6} "
+              f"{_bytes_legiveis(item['bytes']):>8} {item['idas_banco']:>7}")
+    print(f"📝 Detalhes por etapa em {log_path}")
@@ -0,0 +1,132 @@
+import os
+import re
+
+"""
+Exportação opcional das métricas de cada execução no formato texto do
+Prometheus, para alertar sobre queda de vazão dos jobs agendados (D-1) e
+acompanhar a carga no SQL Server. Fica desligada se nenhuma das variáveis
+abaixo estiver definida (no .env ou no ambiente):
+
+- ZENDESK_METRICAS_DIR: pasta lida pelo textfile collector do node_exporter;
+  cada job grava <pasta>/zendesk_<job>.prom, substituído a cada execução.
+- ZENDESK_PUSHGATEWAY: URL de um Pushgateway (ex: http://localhost:9091);
+  cada execução substitui o grupo /metrics/job/<job>.
+
+As métricas são da última execução (gauges), com o rótulo processo=<job>.
+Os valores vêm de medicao.finalizar().
+"""
+
+# Segundos para o envio ao Pushgateway
+timeout_push = 10
+
+_METRICAS = [
+    # (nome, contador do medicao, descrição)
+    ('zendesk_linhas_buscadas', 'linhas_buscadas', 'Linhas lidas da API ou dos CSVs do Explore'),
+    ('zendesk_linhas_gravadas', 'linhas_gravadas', 'Linhas inseridas/atualizadas pelo MERGE'),
+    ('zendesk_linhas_rejeitadas', 'linhas_rejeitadas', 'Linhas rejeitadas na carga'),
+    ('zendesk_paginas', 'paginas', 'Páginas da API recebidas com sucesso'),
+    ('zendesk_requisicoes_http', 'http', 'Requisições HTTP feitas (inclui repetições)'),
+    ('zendesk_repeticoes_http', 'repeticoes', 'Requisições repetidas (429, 5xx, falha de rede)'),
+    ('zendesk_respostas_429', 'respostas_429', 'Respostas 429 (limite da API)'),
+    ('zendesk_bytes_recebidos', 'bytes', 'Bytes recebidos da API e do Explore'),
+    ('zendesk_idas_banco', 'idas_banco', 'Comandos e commits enviados ao SQL Server'),
+    ('zendesk_espera_selenium_segundos', 'espera_selenium', 'Tempo esperando a página ou o download no navegador'),
+    ('zendesk_deduplicacao_segundos', 'deduplicacao', 'Tempo das varreduras de deduplicação'),
+]
+
+_METRICAS_ETAPA = [
+    # (nome, campo do resumo por etapa, descrição)
+    ('zendesk_etapa_segundos', 'duracao', 'Tempo total da etapa'),
+    ('zendesk_etapa_linhas', 'linhas', 'Linhas processadas pela etapa'),
+    ('zendesk_etapa_chamadas', 'chamadas', 'Vezes que a etapa rodou'),
+    ('zendesk_etapa_falhas', 'falhas', 'Vezes que a etapa falhou'),
+]
+
+def nome_job(script):
+    # 'ScrapCriadosResolvidos_D-1.py' -> 'ScrapCriadosResolvidos_D-1'
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', os.path.splitext(script)[0]) or 'python'
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _amostra(nome, rotulos, valor):
+    rotulos_txt = ','.join(f'{chave}="{_escapar(v)}"' for chave, v in rotulos.items())
+    valor = float(valor)
+    valor_txt = str(int(valor)) if valor.is_integer() else repr(round(valor, 6))
+    return f'{nome}{{{rotulos_txt}}} {valor_txt}'
+
+def formatar(job, contadores, etapas, duracao_total, paginas_por_segundo, fim):
+    """
+    Monta o texto no formato de exposição do Prometheus.
+    - contadores: totais da execução (medicao.CONTADORES)
+    - etapas: resumo por etapa (medicao.resumo())
+    - fim: datetime do fim da execução
+    """
+    rotulos = {'processo': job}
+    linhas = []
+
+    def metrica(nome, descricao, amostras):
+        linhas.append(f'# HELP {nome} {descricao}')
+        linhas.append(f'# TYPE {nome} gauge')
+        linhas.extend(_amostra(nome, r, valor) for r, valor in amostras)
+
+    for nome, contador, descricao in _METRICAS:
+        metrica(nome, descricao, [(rotulos, contadores.get(contador, 0))])
+    metrica('zendesk_paginas_por_segundo', 'Páginas da API por segundo durante a busca',
+            [(rotulos, paginas_por_segundo)])
+    metrica('zendesk_execucao_segundos', 'Duração da execução', [(rotulos, duracao_total)])
+    metrica('zendesk_execucao_fim_timestamp_segundos', 'Fim da execução (unix), para alertar sobre jobs parados',
+            [(rotulos, fim.timestamp())])
+
+    for nome, campo, descricao in _METRICAS_ETAPA:
+        metrica(nome, descricao, [({**rotulos, 'etapa': etapa}, item[campo]) for etapa, item in sorted(etapas.items())])
+
+    return '\n'.join(linhas) + '\n'
+
+def _gravar_textfile(pasta, job, texto):
+    os.makedirs(pasta, exist_ok=True)
+    destino = os.path.join(pasta, f'zendesk_{job}.prom')
+    # Grava num temporário e renomeia, para o collector nunca ler um arquivo pela metade
+    temporario = f'{destino}.{os.getpid()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(texto)
+    os.replace(temporario, destino)
+    print(f"📈 Métricas gravadas em {destino}")
+
+def _enviar_pushgateway(url, job, texto):
+    import httpx
+
+    destino = f"{url.rstrip('/')}/metrics/job/{job}"
+    response = httpx.put(
+        destino, content=texto.encode('utf-8'),
+        headers={'Content-Type': 'text/plain; version=0.0.4'}, timeout=timeout_push,
+    )
+    if response.status_code >= 300:
+        print(f"⚠️ Pushgateway recusou as métricas (HTTP {response.status_code}): {response.text[:200]}")
+        return
+    print(f"📈 Métricas enviadas para {destino}")
+
+def exportar(job, contadores, etapas, duracao_total, paginas_por_segundo, fim):
+    """
+    Grava e/ou envia as métricas da execução, conforme ZENDESK_METRICAS_DIR
+    e ZENDESK_PUSHGATEWAY. Falhas só são avisadas: a extração já terminou.
+    """
+    pasta = os.getenv('ZENDESK_METRICAS_DIR')
+    url = os.getenv('ZENDESK_PUSHGATEWAY')
+    if not pasta and not url:
+        return
+
+    texto = formatar(job, contadores, etapas, duracao_total, paginas_por_segundo, fim)
+    if pasta:
+        try:
+            _gravar_textfile(pasta, job, texto)
+        except OSError as e:
+            print(f"⚠️ Não foi possível gravar as métricas em {pasta}: {e}")
+    if url:
+        # O httpx só é carregado quando há Pushgateway configurado
+        import httpx
+
+        try:
+            _enviar_pushgateway(url, job, texto)
+        except httpx.HTTPError as e:
+            print(f"⚠️ Não foi possível enviar as métricas ao Pushgateway ({url}): {e}")
@@ -0,0 +1,53 @@
+import pandas as pd
+
+"""
+Normalização por coluna compartilhada pelos tratamentos dos CSVs do Explore.
+As conversões são vetorizadas (uma operação por coluna), em vez de uma
+função Python aplicada célula a célula com apply/map.
+"""
+
+# Faixa aceita pelo DATETIME do SQL Server; datas fora dela são gravadas como NULL
+data_minima = pd.Timestamp('1753-01-01')
+data_maxima = pd.Timestamp('9999-12-31 23:59:59')
+
+def converter_datas(serie, formato):
+    """
+    Converte uma coluna de texto para datetime no formato indicado
+    (ex: '%Y-%m-%dT%H:%M:%S').
+
+    Valores vazios, fora do formato ou fora da faixa do DATETIME do
+    SQL Server viram NaT (NULL no banco). Uma coluna que já é datetime
+    (ex: lida de um Excel) só passa pela verificação da faixa.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        datas = serie
+    else:
+        datas = pd.to_datetime(serie.astype(str).str.strip(), format=formato, errors='coerce')
+    return datas.where(datas.between(data_minima, data_maxima))
+
+def vazios_para_nulo(df):
+    """
+    Troca textos vazios ou só com espaços por nulo nas colunas de texto.
+    Colunas numéricas e de data não são tocadas; os demais textos são
+    mantidos como vieram (sem strip).
+    """
+    df = df.copy()
+    _anular_vazios(df)
+    return df
+
+def _anular_vazios(df):
+    for coluna in df.select_dtypes(include=['object', 'string']).columns:
+        vazio = df[coluna].str.strip().eq('').fillna(False).astype(bool)
+        df[coluna] = df[coluna].mask(vazio)
+
+def normalizar(df, colunas_data=None):
+    """
+    Aplica converter_datas às colunas de colunas_data (dict coluna -> formato)
+    que existirem no DataFrame e depois vazios_para_nulo.
+    """
+    df = df.copy()
+    for coluna, formato in (colunas_data or {}).items():
+        if coluna in df.columns:
+            df[coluna] = converter_datas(df[coluna], formato)
+    _anular_vazios(df)
+    return df
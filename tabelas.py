@@ -0,0 +1,364 @@
+import json
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import carga
+
+"""
+Registro das tabelas de destino no SQL Server.
+Cada tabela declara, num único lugar, as colunas gravadas (com o nome de
+origem na API/CSV, o tipo e o tamanho máximo), a chave natural usada no
+MERGE e a coluna que decide a versão mais recente de uma chave repetida.
+
+Os scripts usam o registro para renomear as colunas (mapeamento), converter
+as datas (formatos_data) e gravar (mesclar). Na gravação, cada coluna passa
+por um conversor do seu tipo, aplicado à coluna inteira, e os comandos do
+MERGE são montados uma vez por conjunto de colunas; as linhas saem prontas
+para o executemany, sem montar dicts nem testar o tipo de cada valor.
+
+Tipos:
+- texto: str (cortado em tamanho, se houver)
+- inteiro: int
+- data: datetime (com formato, para os textos dos CSVs do Explore)
+- booleano: bool
+- json: dict/list viram JSON; os demais valores viram texto
+- auto: o valor como veio (campos personalizados, cujo tipo é definido no Zendesk)
+Nulos (NaN/NaT/NA) viram None em todos os tipos.
+"""
+
+def coluna(nome, tipo='texto', origem=None, tamanho=None, formato=None, campo=None):
+    """
+    Declara uma coluna do destino. origem é o nome na API/CSV (padrão: o próprio nome)
+    e campo, o id do campo personalizado do Zendesk que a preenche.
+    """
+    return {'nome': nome, 'tipo': tipo, 'origem': origem or nome,
+            'tamanho': tamanho, 'formato': formato, 'campo': campo}
+
+def _campo(nome, origem, campo):
+    return coluna(nome, 'auto', origem=origem, campo=campo)
+
+TABELAS = {
+    'BD_TicketsSAC': {
+        'tabela': 'BD_TicketsSAC',
+        'chave': ['id'],
+        'ordenar_por': 'updated_at',
+        'colunas': [
+            coluna('url'),
+            coluna('id', 'inteiro'),
+            coluna('external_id'),
+            coluna('via', 'json'),
+            coluna('created_at', 'data'),
+            coluna('updated_at', 'data'),
+            coluna('generated_timestamp', 'inteiro'),
+            coluna('type'),
+            coluna('subject'),
+            coluna('raw_subject'),
+            coluna('description'),
+            coluna('priority'),
+            coluna('status'),
+            coluna('recipient'),
+            coluna('requester_id', 'inteiro'),
+            coluna('submitter_id', 'inteiro'),
+            coluna('assignee_id', 'inteiro'),
+            coluna('organization_id', 'inteiro'),
+            coluna('group_id', 'inteiro'),
+            coluna('has_incidents', 'booleano'),
+            coluna('is_public', 'booleano'),
+            coluna('tags'),
+            coluna('satisfaction_rating', 'json'),
+            coluna('sharing_agreement_ids'),
+            coluna('custom_status_id', 'inteiro'),
+            coluna('encoded_id'),
+            coluna('ticket_form_id', 'inteiro'),
+            coluna('brand_id', 'inteiro'),
+            coluna('allow_channelback', 'booleano'),
+            coluna('allow_attachments', 'booleano'),
+            coluna('from_messaging_channel', 'booleano'),
+            coluna('result_type'),
+            # Colunas personalizadas
+            _campo('Area_Retorno', 'Área Retorno', 20481751634964),
+            _campo('Data_de_Envio_Area_Responsavel', 'Data de Envio Área Responsável', 23450471389460),
+            _campo('Previsao_de_Retorno_Area_Responsável', 'Previsão de Retorno Área Responsável', 23450335909780),
+            _campo('Assunto_do_Email', 'Assunto do Email', 7896616478612),
+            _campo('Canal_de_Entrada', 'Canal de Entrada', 360041469032),
+            _campo('Duvida', 'Dúvida', 360041468692),
+            _campo('Solicitacao', 'Solicitação', 360041432051),
+            _campo('Problema', 'Problema', 360041431951),
+            _campo('Outros', 'Outros', 360041432091),
+            _campo('Transportadora', 'Transportadora', 22541325),
+            _campo('Produto', 'Produto', 8225162131348),
+            _campo('Numero_do_Pedido', 'Número do Pedido', 360041040172),
+            _campo('SKU_dos_Produtos', 'SKU dos Produtos', 360030577731),
+            _campo('Numero_da_NF', 'Número da NF', 360040274491),
+            _campo('Estorno_Valor', 'Estorno: Valor', 23507539076884),
+            _campo('Tipo_de_Estorno', 'Tipo de Estorno', 23465090667540),
+            _campo('Atendente', 'Atendente', 24157626991892),
+            _campo('Nome_Titular_do_Pedido', 'Nome Titular do Pedido', 360030496932),
+            _campo('Estorno_Causa_Raiz', 'Estorno: Causa Raiz', 23555735385236),
+            _campo('Estorno_Tipo_de_Problema', 'Estorno: Tipo de Problema', 23555716189844),
+            _campo('Estorno_Tipo_de_Pagamento', 'Estorno: Tipo de Pagamento', 25219880343316),
+            _campo('Numero_da_Loja', 'Número da Loja', 26678660208916),
+            _campo('Numero_da_NFD', 'Número da NFD', 25427606175380),
+            _campo('Etapas_de_Coleta', 'Etapas de Coleta', 25780172368020),
+            _campo('CD_Troca_e_Acionamento_de_Garantia', 'CD: Troca e Acionamento de Garantia', 25783014985492),
+            _campo('CD_Devolucao_e_Voucher', 'CD: Devolução e Voucher', 25808063108756),
+            _campo('Demanda', 'Demanda', 25820195084948),
+            _campo('CD_Outras_Demandas', 'CD: Outras Demandas', 25907732988436),
+            _campo('Numero_da_OS', 'Número da OS', 25966692319380),
+            _campo('Prazo_1_Cobranca', 'Prazo 1ª Cobrança', 26241374621588),
+            _campo('Status_de_Assistencia_Tecnica', 'Status de Assistência Técnica', 26241507056916),
+            _campo('Plano_de_Acao_OS_Vencidas', 'Plano de Ação OS Vencidas', 26256563363348),
+            _campo('Plano_de_Acao_Insatisfacao_Resultado_de_OS', 'Plano de Ação Insatisfação Resultado de OS', 26256620215444),
+            _campo('Loja_Fisica_ou_Loja_Virtual', 'Loja Física ou Loja Virtual', 27112048306068),
+            _campo('Replica', 'Réplica?', 27112064079636),
+            _campo('Avaliacao_no_RA', 'Avaliação no RA?', 27112103294868),
+            _campo('Nota_da_Avaliacao', 'Nota da Avaliação', 27112199178132),
+            _campo('Coleta_Solicitada_Mais_de_uma_Vez', 'Coleta Solicitada Mais de uma Vez?', 27112338364436),
+            _campo('Status_da_Coleta', 'Status da Coleta', 27112346684948),
+            _campo('Cliente_Reincidente', 'Cliente Reincidente?', 27265194513556),
+            _campo('Caso_Resolvido_no_Atendimento_Anterior', 'Caso 100% Resolvido no Atendimento Anterior?', 27265259806228),
+            _campo('Sentimento', 'Sentimento', 28405635340308),
+            # Colunas subdivididas
+            coluna('via_channel'),
+            coluna('via_from_name'),
+            coluna('via_from_address'),
+            coluna('via_from_ticket_id', 'inteiro'),
+            coluna('via_from_subject'),
+            coluna('via_to_name'),
+            coluna('via_to_address'),
+            coluna('via_rel'),
+            coluna('satisfaction_score'),
+            coluna('satisfaction_comment'),
+            coluna('satisfaction_reason'),
+            coluna('satisfaction_reason_id', 'inteiro'),
+            coluna('satisfaction_id'),
+            _campo('Atribuido_Para', 'Atribuido_Para', 22333255),
+        ],
+    },
+
+    # Atividades: tudo é gravado como texto (dict/list como JSON); 'nan'/'None'/'' viram NULL
+    'BD_AtividadesSAC': {
+        'tabela': 'BD_AtividadesSAC',
+        'chave': ['id'],
+        'ordenar_por': 'updated_at',
+        'nulos_texto': ['nan', 'None', ''],
+        'colunas': [
+            coluna('id'),
+            coluna('title'),
+            coluna('verb'),
+            coluna('user_id'),
+            coluna('actor_id'),
+            coluna('actor_name'),
+            coluna('created_at'),
+            coluna('updated_at'),
+            coluna('created_at_data'),
+            coluna('created_at_hora'),
+            coluna('updated_at_data'),
+            coluna('updated_at_hora'),
+            coluna('object', 'json'),
+            coluna('user', 'json'),
+            coluna('ticket_id'),
+            coluna('ticket_type'),
+            coluna('action'),
+            coluna('activity_url'),
+            coluna('comment'),
+            coluna('subject'),
+            coluna('público'),
+        ],
+    },
+
+    # Um ticket criado por linha
+    'BD_CreatedTicketsSAC': {
+        'tabela': 'BD_CreatedTicketsSAC',
+        'chave': ['id_ticket'],
+        'colunas': [
+            coluna('id_ticket', 'inteiro', origem='ID do ticket'),
+            coluna('status_ticket', origem='Status do ticket', tamanho=255),
+            coluna('nome_atribuido', origem='Nome do atribuído', tamanho=255),
+            coluna('canal_ticket', origem='Canal do ticket', tamanho=255),
+            coluna('canal_entrada', origem='Canal de Entrada', tamanho=255),
+            coluna('area_retorno', origem='Área retorno', tamanho=255),
+            coluna('funcao_solicitante', origem='Função do solicitante', tamanho=255),
+            coluna('funcao_emissor', origem='Função do emissor', tamanho=255),
+            coluna('data_criacao', 'data', origem='Criação do ticket - Carimbo de data/hora', formato='%Y-%m-%dT%H:%M:%S'),
+            coluna('data_resolucao', 'data', origem='Resolução do ticket - Carimbo de data/hora', formato='%Y-%m-%dT%H:%M:%S'),
+            coluna('problema', origem='Problema', tamanho=255),
+            coluna('duvida', origem='Dúvida', tamanho=255),
+            coluna('solicitacao', origem='Solicitação', tamanho=255),
+            coluna('outros', origem='Outros', tamanho=255),
+            coluna('email_solicitante', origem='E-mail do solicitante', tamanho=255),
+            coluna('email_emissor', origem='E-mail do emissor', tamanho=255),
+            coluna('org_ticket', origem='Nome da organização do ticket', tamanho=255),
+            coluna('org_solicitante', origem='Nome da organização do solicitante', tamanho=255),
+            coluna('marca_ticket', origem='Marca do ticket', tamanho=255),
+            coluna('formulario_ticket', origem='Formulário de ticket', tamanho=255),
+        ],
+    },
+
+    # Uma resolução por ticket e data
+    'BD_SolvedTicketsSAC': {
+        'tabela': 'BD_SolvedTicketsSAC',
+        'chave': ['id_ticket', 'data_resolucao'],
+        'colunas': [
+            coluna('id_ticket', 'inteiro', origem='ID do ticket'),
+            coluna('status_ticket', origem='Status do ticket', tamanho=255),
+            coluna('nome_atribuido', origem='Nome do atribuído', tamanho=255),
+            coluna('data_criacao', 'data', origem='Criação do ticket - Data', formato='%Y-%m-%d'),
+            coluna('data_resolucao', 'data', origem='Resolução do ticket - Data', formato='%Y-%m-%d'),
+            coluna('nome_emissor', origem='Nome do emissor', tamanho=255),
+            coluna('nome_solicitante', origem='Nome do solicitante', tamanho=255),
+            coluna('funcao_solicitante', origem='Função do solicitante', tamanho=255),
+            coluna('org_ticket', origem='Nome da organização do ticket', tamanho=255),
+            coluna('org_solicitante', origem='Nome da organização do solicitante', tamanho=255),
+            coluna('marca_ticket', origem='Marca do ticket', tamanho=255),
+            coluna('canal_ticket', origem='Canal do ticket', tamanho=255),
+            coluna('canal_entrada', origem='Canal de Entrada', tamanho=255),
+            coluna('formulario_ticket', origem='Formulário de ticket', tamanho=255),
+            coluna('funcao_emissor', origem='Função do emissor', tamanho=255),
+        ],
+    },
+
+    # Uma atualização de ticket (mesmas colunas que a deduplicação antiga usava como chave)
+    'BD_TicketsAtribuicaoSAC': {
+        'tabela': 'dbo.BD_TicketsAtribuicaoSAC',
+        'chave': ['ID', 'Data_Atualizacao', 'Nome_Atualizador', 'Atribuicao_Ticket', 'status', 'canal'],
+        'colunas': [
+            coluna('ID', 'inteiro', origem='ID do ticket da atualização'),
+            coluna('Data_Atualizacao', 'data', origem='Atualização - Carimbo de data/hora', formato='%Y-%m-%dT%H:%M:%S'),
+            coluna('Grupo', origem='Grupo do ticket na atualização'),
+            coluna('Nome_Atualizador', origem='Nome do atualizador'),
+            coluna('Atribuicao_Ticket', origem='Atribuído do ticket na atualização'),
+            coluna('status', origem='Status do ticket na atualização'),
+            coluna('canal', origem='Canal da atualização'),
+            coluna('assunto', origem='Assunto do ticket'),
+            coluna('tipo_comentario', origem='Tipo de comentário'),
+        ],
+    },
+}
+
+############################################################
+#                  CONSULTAS AO REGISTRO                   #
+############################################################
+
+def colunas(nome):
+    """Colunas do destino, na ordem do registro."""
+    return [col['nome'] for col in TABELAS[nome]['colunas']]
+
+def chave(nome):
+    return list(TABELAS[nome]['chave'])
+
+def mapeamento(nome):
+    """dict nome de origem (API/CSV) -> coluna do destino, para df.rename."""
+    return {col['origem']: col['nome'] for col in TABELAS[nome]['colunas']}
+
+def origem(nome, coluna):
+    """Nome de origem (API/CSV) da coluna do destino."""
+    return next(col['origem'] for col in TABELAS[nome]['colunas'] if col['nome'] == coluna)
+
+def formatos_data(nome):
+    """dict coluna -> formato das colunas de data que vêm como texto (CSVs do Explore)."""
+    return {col['nome']: col['formato'] for col in TABELAS[nome]['colunas'] if col['formato']}
+
+def campos_personalizados(nome):
+    """dict id do campo personalizado (int) -> nome de origem da coluna que ele preenche."""
+    return {col['campo']: col['origem'] for col in TABELAS[nome]['colunas'] if col['campo']}
+
+############################################################
+#                      CONVERSORES                         #
+############################################################
+
+# Cada conversor recebe a coluna inteira (Series) e devolve um array de objetos Python
+
+def _texto(serie, tamanho=None, nulos=None):
+    texto = serie.astype('string')
+    if tamanho:
+        texto = texto.str.slice(0, tamanho)
+    if nulos:
+        texto = texto.mask(texto.isin(nulos))
+    return texto.to_numpy(dtype=object, na_value=None)
+
+def _inteiro(serie):
+    return pd.to_numeric(serie, errors='coerce').astype('Int64').to_numpy(dtype=object, na_value=None)
+
+def _data(serie):
+    datas = pd.to_datetime(serie, errors='coerce')
+    valores = np.array(datas.dt.to_pydatetime(), dtype=object)
+    valores[datas.isna().to_numpy()] = None
+    return valores
+
+def _booleano(serie):
+    return serie.astype('boolean').to_numpy(dtype=object, na_value=None)
+
+def _json(serie, tamanho=None, nulos=None):
+    # Só as colunas json olham valor a valor (dict/list são objetos por natureza)
+    valores = pd.Series(
+        [json.dumps(valor) if isinstance(valor, (dict, list)) else valor for valor in serie],
+        index=serie.index, dtype=object
+    )
+    return _texto(valores, tamanho, nulos)
+
+def _auto(serie):
+    return serie.to_numpy(dtype=object, na_value=None)
+
+def _conversor(col, nulos):
+    tipo = col['tipo']
+    if tipo == 'texto':
+        return lambda serie: _texto(serie, col['tamanho'], nulos)
+    if tipo == 'json':
+        return lambda serie: _json(serie, col['tamanho'], nulos)
+    if tipo == 'inteiro':
+        return _inteiro
+    if tipo == 'data':
+        return _data
+    if tipo == 'booleano':
+        return _booleano
+    if tipo == 'auto':
+        return _auto
+    raise ValueError(f"Tipo de coluna desconhecido: {tipo} ({col['nome']})")
+
+@lru_cache(maxsize=None)
+def _conversores(nome):
+    nulos = TABELAS[nome].get('nulos_texto')
+    return {col['nome']: _conversor(col, nulos) for col in TABELAS[nome]['colunas']}
+
+@lru_cache(maxsize=None)
+def _sql(nome, colunas_presentes):
+    tabela = TABELAS[nome]
+    return carga.montar_sql_merge(
+        tabela['tabela'], list(colunas_presentes), tabela['chave'], tabela.get('ordenar_por')
+    )
+
+############################################################
+#                        GRAVAÇÃO                          #
+############################################################
+
+def linhas(nome, df):
+    """
+    Converte as colunas do registro presentes no DataFrame (já com os nomes
+    do destino) e devolve (colunas, lista de tuplas) para o executemany.
+    """
+    conversores = _conversores(nome)
+    presentes = [col for col in conversores if col in df.columns]
+    valores = [conversores[col](df[col]) for col in presentes]
+    return presentes, list(zip(*valores))
+
+def mesclar(conn, nome, df, tamanho_lote=1000, descrever_linha=None):
+    """
+    Grava o DataFrame na tabela nome do registro com carga.mesclar_em_tabela
+    (staging + MERGE pela chave). Só as colunas presentes no DataFrame são
+    gravadas; as demais ficam como estão no destino.
+    descrever_linha, se informada, recebe a linha com erro como dict coluna -> valor.
+
+    Retorna:
+    - (linhas afetadas pelo MERGE, linhas rejeitadas na carga da staging)
+    """
+    tabela = TABELAS[nome]
+    presentes, tuplas = linhas(nome, df)
+    descrever = None
+    if descrever_linha:
+        descrever = lambda linha: descrever_linha(dict(zip(presentes, linha)))
+    return carga.mesclar_em_tabela(
+        conn, tabela['tabela'], presentes, tabela['chave'], tuplas,
+        tamanho_lote=tamanho_lote, ordenar_por=tabela.get('ordenar_por'),
+        descrever_linha=descrever, sql=_sql(nome, tuple(presentes))
+    )
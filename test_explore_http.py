@@ -0,0 +1,142 @@
+import os
+import json
+import importlib.util
+from datetime import datetime, timedelta
+import httpx
+import pytest
+import explore_http
+import tabelas
+
+"""
+Exportação do Explore via HTTP (explore_http.exportar) nos dois scripts Scrap*_D-1:
+uma requisição capturada que devolve outro período não pode gravar nenhuma
+linha antes de o script voltar ao navegador.
+
+O httpx.stream é trocado por uma resposta fixa e a gravação no banco
+(inserir_chunk) por uma lista. Como o test_tickets.py, importa os scripts
+normalmente: o .env (PRIVATE_BAG.ENV) e as dependências precisam estar disponíveis.
+
+    python -m pytest -q test_explore_http.py
+"""
+
+def importar_script(nome, arquivo):
+    # Os scripts do Explore têm hífen no nome e não podem ser importados com import
+    spec = importlib.util.spec_from_file_location(nome, os.path.join(os.path.dirname(os.path.abspath(__file__)), arquivo))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+atribuicao = importar_script('atribuicao', 'ScrapTicketAtribuicao_D-1.py')
+criados_resolvidos = importar_script('criados_resolvidos', 'ScrapCriadosResolvidos_D-1.py')
+
+ONTEM = datetime.combine(datetime.now().date() - timedelta(days=1), datetime.min.time()) + timedelta(hours=10)
+MES_PASSADO = ONTEM - timedelta(days=30)
+
+############################################################
+#                  RESPOSTA DO EXPLORE                     #
+############################################################
+
+def csv_explore(tabela, datas):
+    """CSV no formato do Explore (sep ';', BOM) com uma linha por data em todas as colunas de data da tabela."""
+    origens = list(tabelas.mapeamento(tabela))
+    formatos = {tabelas.origem(tabela, coluna): formato for coluna, formato in tabelas.formatos_data(tabela).items()}
+    linhas = [';'.join(origens)]
+    for indice, data in enumerate(datas):
+        linhas.append(';'.join(
+            data.strftime(formatos[origem]) if origem in formatos else str(indice + 1) for origem in origens
+        ))
+    return ('\ufeff' + '\n'.join(linhas) + '\n').encode('utf-8')
+
+class RespostaFalsa:
+    def __init__(self, corpo):
+        self.status_code = 200
+        self.headers = {'content-type': 'text/csv'}
+        self.corpo = corpo
+
+    def iter_bytes(self):
+        # Em pedaços pequenos, como chega pela rede
+        for inicio in range(0, len(self.corpo), 100):
+            yield self.corpo[inicio:inicio + 100]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+@pytest.fixture
+def explore(tmp_path, monkeypatch):
+    """Captura para cada exportação em 'ontem'; respostas[nome] é o corpo devolvido."""
+    capturas = tmp_path / 'capturas.json'
+    requisicoes = {
+        f'{nome}:ontem': {'url': f'https://bagaggio.zendesk.com/explore/{nome}.csv', 'method': 'GET', 'headers': {}}
+        for nome in ['agent_updates', 'created', 'solved']
+    }
+    capturas.write_text(json.dumps({'cookies': [], 'requisicoes': requisicoes}), encoding='utf-8')
+    monkeypatch.setattr(explore_http, 'capturas_path', capturas)
+
+    respostas = {}
+    monkeypatch.setattr(
+        httpx, 'stream', lambda metodo, url, **kwargs: RespostaFalsa(respostas[url.rsplit('/', 1)[1][:-4]])
+    )
+    return respostas
+
+@pytest.fixture
+def gravados(monkeypatch):
+    """Linhas que chegaram à gravação no banco, por tabela."""
+    linhas = {}
+
+    def gravar(tabela):
+        def inserir(df_chunk, chunk_id, *args):
+            linhas.setdefault(tabela, []).extend(df_chunk.to_dict('records'))
+            return True
+        return inserir
+
+    monkeypatch.setattr(atribuicao, 'inserir_chunk', gravar('BD_TicketsAtribuicaoSAC'))
+    monkeypatch.setattr(
+        criados_resolvidos, 'inserir_chunk_generico',
+        lambda df_chunk, chunk_id, tabela: gravar(tabela)(df_chunk, chunk_id)
+    )
+    return linhas
+
+############################################################
+#                       TESTES                             #
+############################################################
+
+def test_atribuicao_dentro_do_periodo_grava_tudo(explore, gravados):
+    explore['agent_updates'] = csv_explore('BD_TicketsAtribuicaoSAC', [ONTEM] * 5)
+
+    assert atribuicao.exportar_http('ontem') is True
+    assert len(gravados['BD_TicketsAtribuicaoSAC']) == 5
+
+def test_atribuicao_fora_do_periodo_nao_grava_nada(explore, gravados, monkeypatch):
+    # O CSV é maior que uma leitura; a data fora do período está só no último bloco
+    monkeypatch.setattr(atribuicao, 'linhas_por_leitura', 10)
+    explore['agent_updates'] = csv_explore('BD_TicketsAtribuicaoSAC', [ONTEM] * 35 + [MES_PASSADO])
+
+    assert atribuicao.exportar_http('ontem') is None
+    assert gravados == {}
+
+def test_atribuicao_resposta_sem_a_coluna_de_data_nao_grava_nada(explore, gravados):
+    explore['agent_updates'] = b'<html><body>Sess\xc3\xa3o expirada</body></html>\n'
+
+    assert atribuicao.exportar_http('ontem') is None
+    assert gravados == {}
+
+def test_created_solved_fora_do_periodo_nao_grava_nada(explore, gravados, monkeypatch):
+    monkeypatch.setattr(criados_resolvidos, 'linhas_por_leitura', 10)
+    explore['created'] = csv_explore('BD_CreatedTicketsSAC', [ONTEM] * 3)
+    explore['solved'] = csv_explore('BD_SolvedTicketsSAC', [ONTEM] * 25 + [MES_PASSADO])
+
+    resultados = criados_resolvidos.exportar_http('ontem')
+
+    assert resultados == {'created': True, 'solved': None}
+    assert len(gravados['BD_CreatedTicketsSAC']) == 3
+    assert 'BD_SolvedTicketsSAC' not in gravados
+
+def test_arquivo_temporario_removido(explore, gravados, tmp_path, monkeypatch):
+    monkeypatch.setattr(explore_http.tempfile, 'tempdir', str(tmp_path))
+    explore['agent_updates'] = csv_explore('BD_TicketsAtribuicaoSAC', [MES_PASSADO])
+
+    assert atribuicao.exportar_http('ontem') is None
+    assert not list(tmp_path.glob('explore_*.csv'))
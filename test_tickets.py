@@ -0,0 +1,208 @@
+import re
+import numpy as np
+import pandas as pd
+import pytest
+import tickets
+
+"""
+Regressão do tickets.tratar_dados vetorizado contra a implementação antiga
+(linha a linha, com .apply), copiada abaixo como estava antes da mudança.
+As colunas (na mesma ordem), os tipos e os valores têm que ser os mesmos.
+Diferenças aceitas, porque as duas formas viram NULL no banco: None no lugar
+de NaN em célula vazia, e coluna toda vazia como object em vez de float64.
+
+Como o benchmark.py, importa o tickets.py normalmente: o .env
+(PRIVATE_BAG.ENV) e as dependências precisam estar disponíveis.
+
+    python -m pytest -q test_tickets.py
+"""
+
+############################################################
+#                 IMPLEMENTAÇÃO ANTIGA                     #
+############################################################
+
+def injetar_campos_legado(tickets_data):
+    # A busca antiga gravava os campos personalizados mapeados dentro de cada ticket
+    custom_field_ids = {str(id_campo): nome for id_campo, nome in tickets.campos_personalizados.items()}
+    for ticket in tickets_data:
+        custom_fields_data = {custom_field_ids.get(str(field['id']), str(field['id'])): field.get('value')
+                              for field in ticket.get('custom_fields', [])
+                              if str(field['id']) in custom_field_ids}
+        ticket.update(custom_fields_data)
+    return tickets_data
+
+def tratar_dados_legado(tickets_data):
+    df = pd.DataFrame(tickets_data)
+
+    colunas_para_remover = ['custom_fields', 'fields', 'followup_ids', 'due_at', 'collaborator_ids', 'follower_ids', 'email_cc_ids', 'forum_topic_id', 'problem_id']
+    df = df.drop(columns=[col for col in colunas_para_remover if col in df.columns], errors='ignore')
+
+    def extrair_via_info(via):
+        if isinstance(via, dict):
+            return {
+                'via_channel': via.get('channel'),
+                'via_from_name': via.get('source', {}).get('from', {}).get('name'),
+                'via_from_address': via.get('source', {}).get('from', {}).get('address'),
+                'via_from_ticket_id': via.get('source', {}).get('from', {}).get('ticket_id'),
+                'via_from_subject': via.get('source', {}).get('from', {}).get('subject'),
+                'via_to_name': via.get('source', {}).get('to', {}).get('name'),
+                'via_to_address': via.get('source', {}).get('to', {}).get('address'),
+                'via_rel': via.get('source', {}).get('rel')
+            }
+        return {}
+
+    via_info_df = df['via'].apply(extrair_via_info).apply(pd.Series)
+    df = pd.concat([df, via_info_df], axis=1)
+
+    def extrair_satisfaction_info(satisfaction):
+        if isinstance(satisfaction, dict):
+            return {
+                'satisfaction_score': satisfaction.get('score'),
+                'satisfaction_comment': satisfaction.get('comment'),
+                'satisfaction_reason': satisfaction.get('reason'),
+                'satisfaction_reason_id': satisfaction.get('reason_id'),
+                'satisfaction_id': str(satisfaction.get('id'))
+            }
+        return {}
+
+    satisfaction_info_df = df['satisfaction_rating'].apply(extrair_satisfaction_info).apply(pd.Series)
+    df = pd.concat([df, satisfaction_info_df], axis=1)
+
+    df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce').dt.tz_localize(None)
+    df['updated_at'] = pd.to_datetime(df['updated_at'], errors='coerce').dt.tz_localize(None)
+
+    def tratar_valor(valor):
+        if isinstance(valor, list):
+            return ', '.join(map(str, valor))
+        elif isinstance(valor, str):
+            return re.sub(r'[\[\]]', '', valor)
+        return valor
+
+    for col in df.columns:
+        df[col] = df[col].apply(tratar_valor)
+
+    return df
+
+############################################################
+#                  TICKETS DE EXEMPLO                      #
+############################################################
+
+def ticket_completo(id_ticket, **extra):
+    ticket = {
+        'id': id_ticket,
+        'url': f'https://bagaggio.zendesk.com/api/v2/tickets/{id_ticket}.json',
+        'created_at': '2024-01-01T10:00:00Z',
+        'updated_at': '2024-01-02T11:30:00Z',
+        'subject': f'[Pedido {id_ticket}] Troca',
+        'status': 'open',
+        'priority': None,
+        'requester_id': 1000 + id_ticket,
+        'assignee_id': 2000 + id_ticket,
+        'tags': ['troca', 'loja_virtual'],
+        'collaborator_ids': [],
+        'follower_ids': [5, 6],
+        'email_cc_ids': [],
+        'followup_ids': [],
+        'due_at': None,
+        'problem_id': None,
+        'forum_topic_id': None,
+        'fields': [{'id': 360041469032, 'value': 'email'}],
+        'custom_fields': [
+            {'id': 360041469032, 'value': 'email'},
+            {'id': 360030577731, 'value': ['sku_1', 'sku_2']},
+            {'id': 22333255, 'value': None},
+            {'id': 99999999, 'value': 'campo não mapeado'},
+        ],
+        'via': {
+            'channel': 'email',
+            'source': {
+                'from': {'name': 'Cliente', 'address': 'cliente@exemplo.com', 'ticket_id': 10, 'subject': '[Re] Troca'},
+                'to': {'name': 'SAC', 'address': 'sac@exemplo.com'},
+                'rel': None,
+            },
+        },
+        'satisfaction_rating': {'score': 'good', 'comment': 'Ótimo [atendimento]', 'reason': None,
+                                'reason_id': 7, 'id': 123456789012},
+    }
+    ticket.update(extra)
+    return ticket
+
+def tickets_exemplo():
+    return [
+        ticket_completo(1),
+        # Sem source no via, sem satisfação e com listas vazias
+        ticket_completo(2, via={'channel': 'web'}, satisfaction_rating=None, tags=[], custom_fields=[]),
+        # via só com from (sem to) e satisfação sem id
+        ticket_completo(3, via={'channel': 'api', 'source': {'from': {}, 'rel': 'follow_up'}},
+                        satisfaction_rating={'score': 'offered'}),
+        # Campos ausentes e via que não é dicionário
+        {'id': 4, 'created_at': 'data inválida', 'updated_at': None, 'via': None,
+         'custom_fields': [{'id': 360041469032, 'value': '[canal]'}]},
+        ticket_completo(5, tags=['a', 1, None], subject=None),
+    ]
+
+############################################################
+#                       TESTES                             #
+############################################################
+
+def _mesmo_valor(novo, antigo):
+    if isinstance(antigo, float) and np.isnan(antigo) or antigo is None or antigo is pd.NaT:
+        return novo is None or novo is pd.NaT or isinstance(novo, float) and np.isnan(novo)
+    return novo == antigo and type(novo) == type(antigo)
+
+def comparar(novo, antigo):
+    assert list(novo.columns) == list(antigo.columns)
+    assert len(novo) == len(antigo)
+    for coluna in antigo.columns:
+        if not (antigo[coluna].isna().all() and novo[coluna].isna().all()):
+            assert novo[coluna].dtype == antigo[coluna].dtype, coluna
+        diferentes = [
+            (posicao, valor_novo, valor_antigo)
+            for posicao, (valor_novo, valor_antigo) in enumerate(zip(novo[coluna].tolist(), antigo[coluna].tolist()))
+            if not _mesmo_valor(valor_novo, valor_antigo)
+        ]
+        assert not diferentes, f'{coluna}: {diferentes}'
+
+@pytest.mark.parametrize('quantidade', [1, 5, 200])
+def test_tratar_dados_igual_ao_legado(quantidade):
+    exemplos = tickets_exemplo()
+    dados = [dict(exemplos[n % len(exemplos)], id=n + 1) for n in range(quantidade)]
+
+    novo = tickets.tratar_dados([dict(ticket) for ticket in dados])
+    antigo = tratar_dados_legado(injetar_campos_legado([dict(ticket) for ticket in dados]))
+
+    assert not novo.empty
+    comparar(novo, antigo)
+
+def test_tratar_dados_sem_via_nem_satisfacao_em_dicionario():
+    dados = [ticket_completo(1, via=None, satisfaction_rating=None, custom_fields=[])]
+
+    novo = tickets.tratar_dados([dict(ticket) for ticket in dados])
+    antigo = tratar_dados_legado(injetar_campos_legado([dict(ticket) for ticket in dados]))
+
+    assert not set(tickets.colunas_via) & set(novo.columns)
+    assert not {*tickets.colunas_satisfaction, 'satisfaction_id'} & set(novo.columns)
+    comparar(novo, antigo)
+
+def test_tratar_dados_colunas_e_valores():
+    df = tickets.tratar_dados(tickets_exemplo())
+
+    primeiro = df.iloc[0]
+    assert primeiro['Canal de Entrada'] == 'email'
+    assert primeiro['SKU dos Produtos'] == 'sku_1, sku_2'
+    assert primeiro['tags'] == 'troca, loja_virtual'
+    assert primeiro['subject'] == 'Pedido 1 Troca'
+    assert primeiro['via_from_subject'] == 'Re Troca'
+    assert primeiro['via_from_ticket_id'] == 10
+    assert primeiro['satisfaction_comment'] == 'Ótimo atendimento'
+    assert primeiro['satisfaction_id'] == '123456789012'
+    assert primeiro['created_at'] == pd.Timestamp('2024-01-01 10:00:00')
+    assert pd.api.types.is_datetime64_dtype(df['created_at'])
+
+    # Ticket sem campos: nulos, sem quebrar as outras linhas
+    quarto = df.iloc[3]
+    assert pd.isna(quarto['created_at']) and pd.isna(quarto['via_channel'])
+    assert quarto['Canal de Entrada'] == 'canal'
+    assert df.iloc[2]['satisfaction_id'] == 'None'
+    for coluna in ['custom_fields', 'fields', 'collaborator_ids', 'follower_ids', 'due_at', 'problem_id']:
+        assert coluna not in df.columns
@@ -1,14 +1,19 @@
-import requests
-from requests.auth import HTTPBasicAuth
 import pandas as pd
-from datetime import datetime, timedelta
-import time
-import re
+import numpy as np
+from datetime import datetime, timedelta, timezone
 import pyodbc
-import json  # Import necessário para converter dicionários em strings JSON
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import os  # Import os
+import time
+import asyncio
+import queue
+import threading
+from types import MappingProxyType
+import banco
+import zendesk_http
+import checkpoint
+import medicao
+import tabelas
 
 """Config dotenv"""
 from dotenv import load_dotenv
@@ -23,180 +28,254 @@ def localizar_env(diretorio_raiz="PRIVATE_BAG.ENV"):
 env_path = localizar_env()
 load_dotenv(dotenv_path=env_path)
 
-# Dados de autenticação
-email_address = os.getenv('ZENDESK_EMAIL')
-api_token = os.getenv('ZENDESK_TOKEN')
-auth = HTTPBasicAuth(f'{email_address}/token', api_token)
-
-# Mapeamento dos campos personalizados
-custom_field_ids = {
-    '20481751634964': 'Área Retorno',
-    '23450471389460': 'Data de Envio Área Responsável',
-    '23450335909780': 'Previsão de Retorno Área Responsável',
-    '7896616478612': 'Assunto do Email',
-    '360041469032': 'Canal de Entrada',
-    '360041468692': 'Dúvida',
-    '360041432051': 'Solicitação',
-    '360041431951': 'Problema',
-    '360041432091': 'Outros',
-    '22541325': 'Transportadora',
-    '8225162131348': 'Produto',
-    '360041040172': 'Número do Pedido',
-    '360030577731': 'SKU dos Produtos',
-    '360040274491': 'Número da NF',
-    '23507539076884': 'Estorno: Valor',
-    '23465090667540': 'Tipo de Estorno',
-    '24157626991892': 'Atendente',
-    '360030496932': 'Nome Titular do Pedido',
-    '23555735385236': 'Estorno: Causa Raiz',
-    '23555716189844': 'Estorno: Tipo de Problema',
-    '25219880343316': 'Estorno: Tipo de Pagamento',
-    '27112346684948': 'Status da Coleta',
-    '25783014985492': 'CD: Troca e Acionamento de Garantia',
-    '27112338364436': 'Coleta Solicitada Mais de uma Vez?',
-    '27265259806228': 'Caso 100% Resolvido no Atendimento Anterior?',
-    '26678660208916': 'Número da Loja',
-    '25907732988436': 'CD: Outras Demandas',
-    '27112064079636': 'Réplica?',
-    '28405635340308': 'Sentimento',
-    '26241507056916': 'Status de Assistência Técnica',
-    '26256563363348': 'Plano de Ação OS Vencidas',
-    '26241374621588': 'Prazo 1ª Cobrança',
-    '25808063108756': 'CD: Devolução e Voucher',
-    '27112048306068': 'Loja Física ou Loja Virtual',
-    '25780172368020': 'Etapas de Coleta',
-    '27112103294868': 'Avaliação no RA?',
-    '27112199178132': 'Nota da Avaliação',
-    '25820195084948': 'Demanda',
-    '26256620215444': 'Plano de Ação Insatisfação Resultado de OS',
-    '25966692319380': 'Número da OS',
-    '27265194513556': 'Cliente Reincidente?',
-    '25427606175380': 'Número da NFD',
-    '22333255': 'Atribuido_Para'
-}
+# A autenticação na API (ZENDESK_EMAIL / ZENDESK_TOKEN) é feita pelo zendesk_http
+
+# Campos personalizados mapeados: id (int, como vem da API) -> nome da coluna.
+# Montado uma vez a partir do registro de tabelas.py e somente leitura
+campos_personalizados = MappingProxyType(tabelas.campos_personalizados('BD_TicketsSAC'))
 
 # Lista para armazenar os tickets
 tickets_data = []
 
-# Função para buscar tickets de um único dia
-def buscar_tickets_por_dia(start_date, end_date):
-    query = f'type:ticket created_at>="{start_date}" created_at<"{end_date}"'
+# Linhas por executemany na carga do banco
+tamanho_lote = 1000
+
+# Nomes dos processos no checkpoint local
+PROCESSO_DIAS = 'tickets_por_dia'
+PROCESSO_INCREMENTAL = 'tickets_incremental'
+
+# Função para extrair os campos personalizados mapeados direto em colunas
+def extrair_campos_personalizados(tickets):
+    """
+    Lê os custom_fields de todos os tickets numa única passada e devolve as
+    colunas mapeadas (nome -> lista com um valor por ticket), sem alterar os
+    tickets. Só entram as colunas que aparecem em pelo menos um ticket; os
+    tickets sem o campo ficam com None.
+    """
+    total = len(tickets)
+    colunas = {}
+    nome_do_campo = campos_personalizados.get
+    for posicao, ticket in enumerate(tickets):
+        for campo in ticket.get('custom_fields') or ():
+            nome = nome_do_campo(campo['id'])
+            if nome is None:
+                continue
+            coluna = colunas.get(nome)
+            if coluna is None:
+                coluna = colunas[nome] = [None] * total
+            coluna[posicao] = campo.get('value')
+    return colunas
+
+# A Search API devolve no máximo 1000 resultados por consulta; janelas com mais
+# tickets são divididas ao meio até caberem (ou até a janela mínima)
+limite_busca = 1000
+janela_minima = timedelta(minutes=1)
+
+# Fuso da conta do Zendesk (Brasília, sem horário de verão). Os dias das janelas, do
+# checkpoint e dos arquivos tickets_zendesk_<dia>.xlsx são dias nesse fuso
+fuso_conta = timezone(timedelta(hours=-3))
+
+def _filtro_data(valor):
+    # Sempre data/hora em UTC: a data simples seria lida no fuso da conta, e um dia
+    # dividido em sub-janelas não cobriria o mesmo intervalo do dia inteiro.
+    # valor tem fuso (ex: meia-noite em fuso_conta) e é convertido para UTC
+    return valor.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+async def _buscar_pagina(url, descricao, page_count):
+    try:
+        response = await zendesk_http.requisitar(url)
+    except zendesk_http.ErroRequisicao as e:
+        print(f'Erro ao fazer a requisição: {e}')
+        raise RuntimeError(f'Página {page_count} de {descricao} não pôde ser buscada: {e}') from e
+
+    if response.status_code != 200:
+        print(f'Erro ao buscar a página {page_count}: {response.status_code}')
+        print(f'Mensagem da API: {response.text}')
+        # As repetições já se esgotaram no zendesk_http: falha a janela inteira em vez de
+        # devolvê-la pela metade, para que ela não seja gravada nem marcada como concluída
+        raise RuntimeError(f'Página {page_count} de {descricao} não pôde ser buscada (HTTP {response.status_code})')
+    return response.json()
+
+async def _buscar_janela(inicio, fim):
+    """
+    Busca os tickets criados em [inicio, fim). Se a primeira página informar
+    count acima de limite_busca, a janela é dividida ao meio e as duas metades
+    são buscadas ao mesmo tempo (recursivamente), sem perder os tickets além
+    do limite. Dias normais continuam com uma única consulta paginada.
+    """
+    de, ate = _filtro_data(inicio), _filtro_data(fim)
+    descricao = f'{de} até {ate}'
+    query = f'type:ticket created_at>="{de}" created_at<"{ate}"'
     url = f'https://bagaggio.zendesk.com/api/v2/search.json?query={query}'
-    page_count = 1
-    tickets_data = []  # Agora é uma variável local
-
-    while url:
-        try:
-            print(f'Buscando dados de {start_date} até {end_date} - Página {page_count}...')
-            response = requests.get(url, auth=auth)
-
-            if response.status_code != 200:
-                print(f'Erro ao buscar a página {page_count}: {response.status_code}')
-                print(f'Mensagem da API: {response.text}')
-                break
-
-            data = response.json()
-            tickets = data.get('results', [])
 
-            print(f'Total de tickets nesta página: {len(tickets)}')
+    print(f'Buscando dados de {descricao} - Página 1...')
+    data = await _buscar_pagina(url, descricao, 1)
+    total = data.get('count') or 0
+
+    if total > limite_busca:
+        if fim - inicio > janela_minima:
+            # As janelas partem da meia-noite local e são cortadas em minutos inteiros
+            meio = (inicio + (fim - inicio) / 2).replace(second=0, microsecond=0)
+            print(f'🔀 {total} tickets entre {descricao} (limite {limite_busca}). Dividindo a janela em {_filtro_data(meio)}...')
+            metades = await asyncio.gather(_buscar_janela(inicio, meio), _buscar_janela(meio, fim))
+            return metades[0] + metades[1]
+        print(f'⚠️ {total} tickets entre {descricao}, acima do limite de {limite_busca} mesmo na janela mínima. '
+              f'Apenas os primeiros {limite_busca} serão buscados.')
+
+    tickets_data = []
+    page_count = 1
+    while True:
+        tickets = data.get('results', [])
+        print(f'Total de tickets nesta página: {len(tickets)}')
+        tickets_data.extend(tickets)
+        print(f'Total de tickets acumulados até agora: {len(tickets_data)}')
+
+        url = data.get('next_page')
+        if not url or len(tickets_data) >= limite_busca:
+            break
+        page_count += 1
+        print(f'Buscando dados de {descricao} - Página {page_count}...')
+        data = await _buscar_pagina(url, descricao, page_count)
 
-            for ticket in tickets:
-                custom_fields_data = {custom_field_ids.get(str(field['id']), str(field['id'])): field.get('value') 
-                                      for field in ticket.get('custom_fields', []) 
-                                      if str(field['id']) in custom_field_ids}
-                ticket.update(custom_fields_data)
-                tickets_data.append(ticket)
+    return tickets_data
 
-            print(f'Total de tickets acumulados até agora: {len(tickets_data)}')
+# Função para buscar tickets de um único dia
+@medicao.medido('buscar_tickets', linhas='resultado', linhas_em='linhas_buscadas')
+def buscar_tickets_por_dia(start_date, end_date):
+    # Dias locais: de meia-noite a meia-noite em fuso_conta (03:00 a 03:00 em UTC)
+    inicio = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=fuso_conta)
+    fim = datetime.strptime(end_date, '%Y-%m-%d').replace(tzinfo=fuso_conta)
+    tickets_data = zendesk_http.executar(_buscar_janela(inicio, fim))
+    print(f"Tipo retornado por buscar_tickets_por_dia ({start_date} até {end_date}): {type(tickets_data)}")
+    return tickets_data
 
-            url = data.get('next_page')
-            page_count += 1
-            time.sleep(1)  # Pausa para evitar sobrecarga da API
-        except requests.RequestException as e:
-            print(f'Erro ao fazer a requisição: {e}')
-            break
-        print(f"Tipo retornado por buscar_tickets_por_dia ({start_date} até {end_date}): {type(tickets_data)}")
+# Colunas extraídas de 'via' e 'satisfaction_rating' (coluna final -> caminho gerado pelo json_normalize)
+colunas_via = {
+    'via_channel': 'channel',
+    'via_from_name': 'source.from.name',
+    'via_from_address': 'source.from.address',
+    'via_from_ticket_id': 'source.from.ticket_id',
+    'via_from_subject': 'source.from.subject',
+    'via_to_name': 'source.to.name',
+    'via_to_address': 'source.to.address',
+    'via_rel': 'source.rel'
+}
+colunas_satisfaction = {
+    'satisfaction_score': 'score',
+    'satisfaction_comment': 'comment',
+    'satisfaction_reason': 'reason',
+    'satisfaction_reason_id': 'reason_id'
+}
 
-    return tickets_data
+# Função para subdividir uma coluna de dicionários em várias colunas
+def expandir_coluna_json(serie, colunas):
+    """
+    Achata os dicionários da série com um único pd.json_normalize e devolve
+    as colunas pedidas (já renomeadas). Linhas sem dicionário ficam nulas.
+    Se nenhuma linha tiver dicionário, não devolve colunas.
+    """
+    eh_dict = [isinstance(valor, dict) for valor in serie]
+    if not any(eh_dict):
+        return pd.DataFrame(index=serie.index)
+
+    registros = [valor if ok else {} for valor, ok in zip(serie, eh_dict)]
+    normalizado = pd.json_normalize(registros).reindex(columns=list(colunas.values()))
+    normalizado.columns = list(colunas.keys())
+    normalizado.index = serie.index
+
+    # json_normalize converte inteiros com nulos para float; mantém os valores originais (como o .get fazia)
+    for coluna in normalizado.columns[normalizado.dtypes == 'float64']:
+        caminho = colunas[coluna].split('.')
+        originais = []
+        for valor, ok in zip(registros, eh_dict):
+            for parte in caminho:
+                valor = valor.get(parte) if isinstance(valor, dict) else None
+            originais.append(valor if ok else np.nan)
+        normalizado[coluna] = pd.Series(originais, index=serie.index, dtype=object).infer_objects()
+    return normalizado
+
+# Função para remover colchetes e converter listas em strings, coluna a coluna
+def tratar_listas_e_colchetes(df):
+    """
+    Converte listas em texto separado por vírgula e remove colchetes de textos.
+    Só percorre colunas de texto/objeto e, dentro delas, só as células que
+    são listas ou textos com colchetes; colunas numéricas e de data são puladas.
+    """
+    for col in df.columns:
+        serie = df[col]
+        if not (pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)):
+            continue
+
+        tipo = pd.api.types.infer_dtype(serie, skipna=True)
+        if tipo == 'string':
+            eh_texto = serie.notna()
+            eh_lista = None
+        else:
+            tipos = serie.map(type)
+            eh_texto = tipos == str
+            eh_lista = tipos == list
+
+        alterada = False
+        if eh_lista is not None and eh_lista.any():
+            serie = serie.copy()
+            serie[eh_lista] = [', '.join(map(str, valor)) for valor in serie[eh_lista]]
+            eh_texto = eh_texto | eh_lista
+            alterada = True
+
+        if eh_texto.any():
+            textos = serie[eh_texto]
+            com_colchete = textos.str.contains(r'[\[\]]', regex=True)
+            if com_colchete.any():
+                if not alterada:
+                    serie = serie.copy()
+                indices = com_colchete[com_colchete].index
+                serie[indices] = textos[com_colchete].str.replace(r'[\[\]]', '', regex=True)
+                alterada = True
+
+        if alterada:
+            df[col] = serie.infer_objects()
+    return df
 
 # Função para tratar dados com Pandas
+@medicao.medido('tratar_dados_tickets', linhas='resultado')
 def tratar_dados(tickets_data):
     try:
         df = pd.DataFrame(tickets_data)
 
+        # Campos personalizados: lidos dos custom_fields direto em colunas (antes de removê-los)
+        campos_df = pd.DataFrame(extrair_campos_personalizados(tickets_data), index=df.index)
+
         # Remover colunas indesejadas
         colunas_para_remover = ['custom_fields', 'fields', 'followup_ids', 'due_at', 'collaborator_ids', 'follower_ids', 'email_cc_ids', 'forum_topic_id', 'problem_id']
         df = df.drop(columns=[col for col in colunas_para_remover if col in df.columns], errors='ignore')
 
         # Subdivisão da coluna 'via'
-        def extrair_via_info(via):
-            if isinstance(via, dict):
-                return {
-                    'via_channel': via.get('channel'),
-                    'via_from_name': via.get('source', {}).get('from', {}).get('name'),
-                    'via_from_address': via.get('source', {}).get('from', {}).get('address'),
-                    'via_from_ticket_id': via.get('source', {}).get('from', {}).get('ticket_id'),
-                    'via_from_subject': via.get('source', {}).get('from', {}).get('subject'),
-                    'via_to_name': via.get('source', {}).get('to', {}).get('name'),
-                    'via_to_address': via.get('source', {}).get('to', {}).get('address'),
-                    'via_rel': via.get('source', {}).get('rel')
-                }
-            return {}
-
-        # Aplicar a função de extração da coluna 'via'
-        via_info_df = df['via'].apply(extrair_via_info).apply(pd.Series)
-        df = pd.concat([df, via_info_df], axis=1)
-
-        # Subdivisão da coluna 'satisfaction_rating'
-        def extrair_satisfaction_info(satisfaction):
-            if isinstance(satisfaction, dict):
-                return {
-                    'satisfaction_score': satisfaction.get('score'),
-                    'satisfaction_comment': satisfaction.get('comment'),
-                    'satisfaction_reason': satisfaction.get('reason'),
-                    'satisfaction_reason_id': satisfaction.get('reason_id'),
-                    'satisfaction_id': str(satisfaction.get('id'))  # Convertendo para string
-                }
-            return {}
-
-        # Aplicar a função de extração da coluna 'satisfaction_rating'
-        satisfaction_info_df = df['satisfaction_rating'].apply(extrair_satisfaction_info).apply(pd.Series)
-        df = pd.concat([df, satisfaction_info_df], axis=1)
+        via_info_df = expandir_coluna_json(df['via'], colunas_via)
+
+        # Subdivisão da coluna 'satisfaction_rating' (o id é gravado como texto)
+        satisfaction_info_df = expandir_coluna_json(df['satisfaction_rating'], colunas_satisfaction)
+        if len(satisfaction_info_df.columns):
+            satisfaction_info_df['satisfaction_id'] = [
+                str(valor.get('id')) if isinstance(valor, dict) else np.nan
+                for valor in df['satisfaction_rating']
+            ]
+        df = pd.concat([df, campos_df, via_info_df, satisfaction_info_df], axis=1)
 
         # Conversão de colunas de data para datetime (removendo o fuso horário)
         df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce').dt.tz_localize(None)
         df['updated_at'] = pd.to_datetime(df['updated_at'], errors='coerce').dt.tz_localize(None)
 
-        # Função para remover colchetes e converter listas em strings
-        def tratar_valor(valor):
-            if isinstance(valor, list):
-                return ', '.join(map(str, valor))  # Converte lista em string separada por vírgula
-            elif isinstance(valor, str):
-                return re.sub(r'[\[\]]', '', valor)  # Remove colchetes de strings
-            return valor
-
-        # Aplicar a função em todas as colunas
-        for col in df.columns:
-            df[col] = df[col].apply(tratar_valor)
-
-        return df
+        # Remover colchetes e converter listas em strings
+        return tratar_listas_e_colchetes(df)
     except Exception as e:
         print(f'Erro ao tratar dados: {e}')
         return pd.DataFrame()
 
 # Função para remover registros duplicados
+# A carga já faz MERGE pelo id (inserir_dados_no_banco); isto só limpa duplicatas antigas (opção 9 do menu)
+@medicao.medido('remover_duplicados_tickets', tempo_em='deduplicacao')
 def remover_duplicados():
     try:
-        conn_str = (
-            f"DRIVER={db_config['DRIVER']};"
-            f"SERVER={db_config['SERVER']};"
-            f"DATABASE={db_config['DATABASE']};"
-            f"UID={db_config['UID']};"
-            f"PWD={db_config['PWD']}"
-        )
-        conn = pyodbc.connect(conn_str)
-        cursor = conn.cursor()
-
         sql = """
         WITH CTE AS (
             SELECT 
@@ -207,198 +286,72 @@ def remover_duplicados():
         )
         DELETE FROM CTE WHERE row_num > 1;
         """
-        cursor.execute(sql)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with banco.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            conn.commit()
+            cursor.close()
         print('Registros duplicados removidos com sucesso!')
     except pyodbc.Error as e:
         print(f'Erro ao remover registros duplicados: {e}')
 
-# Configuração do banco de dados
-db_config = {
-    'DRIVER': 'ODBC Driver 17 for SQL Server',
-    'SERVER': f"{os.getenv('DB_SERVER_EXCEL')},{os.getenv('DB_PORT_EXCEL')}",
-    'DATABASE': os.getenv('DB_DATABASE_EXCEL'),
-    'UID': os.getenv('DB_USER_EXCEL'),
-    'PWD': os.getenv('DB_PASSWORD_EXCEL')
-}
-
+# A conexão com o banco (DB_*_EXCEL) vem do pool do banco.py
 
-# Mapeamento das colunas do DataFrame para as colunas do banco de dados
-column_mapping = {
-    'url': 'url',
-    'id': 'id',
-    'external_id': 'external_id',
-    'via': 'via',
-    'created_at': 'created_at',
-    'updated_at': 'updated_at',
-    'generated_timestamp': 'generated_timestamp',
-    'type': 'type',
-    'subject': 'subject',
-    'raw_subject': 'raw_subject',
-    'description': 'description',
-    'priority': 'priority',
-    'status': 'status',
-    'recipient': 'recipient',
-    'requester_id': 'requester_id',
-    'submitter_id': 'submitter_id',
-    'assignee_id': 'assignee_id',
-    'organization_id': 'organization_id',
-    'group_id': 'group_id',
-    'has_incidents': 'has_incidents',
-    'is_public': 'is_public',
-    'tags': 'tags',
-    'satisfaction_rating': 'satisfaction_rating',
-    'sharing_agreement_ids': 'sharing_agreement_ids',
-    'custom_status_id': 'custom_status_id',
-    'encoded_id': 'encoded_id',
-    'ticket_form_id': 'ticket_form_id',
-    'brand_id': 'brand_id',
-    'allow_channelback': 'allow_channelback',
-    'allow_attachments': 'allow_attachments',
-    'from_messaging_channel': 'from_messaging_channel',
-    'result_type': 'result_type',
-    # Colunas personalizadas
-    'Área Retorno': 'Area_Retorno',
-    'Data de Envio Área Responsável': 'Data_de_Envio_Area_Responsavel',
-    'Previsão de Retorno Área Responsável': 'Previsao_de_Retorno_Area_Responsável',
-    'Assunto do Email': 'Assunto_do_Email',
-    'Canal de Entrada': 'Canal_de_Entrada',
-    'Dúvida': 'Duvida',
-    'Solicitação': 'Solicitacao',
-    'Problema': 'Problema',
-    'Outros': 'Outros',
-    'Transportadora': 'Transportadora',
-    'Produto': 'Produto',
-    'Número do Pedido': 'Numero_do_Pedido',
-    'SKU dos Produtos': 'SKU_dos_Produtos',
-    'Número da NF': 'Numero_da_NF',
-    'Estorno: Valor': 'Estorno_Valor',
-    'Tipo de Estorno': 'Tipo_de_Estorno',
-    'Atendente': 'Atendente',
-    'Nome Titular do Pedido': 'Nome_Titular_do_Pedido',
-    'Estorno: Causa Raiz': 'Estorno_Causa_Raiz',
-    'Estorno: Tipo de Problema': 'Estorno_Tipo_de_Problema',
-    'Estorno: Tipo de Pagamento': 'Estorno_Tipo_de_Pagamento',
-    'Número da Loja': 'Numero_da_Loja',
-    'Número da NFD': 'Numero_da_NFD',
-    'Etapas de Coleta': 'Etapas_de_Coleta',
-    'CD: Troca e Acionamento de Garantia': 'CD_Troca_e_Acionamento_de_Garantia',
-    'CD: Devolução e Voucher': 'CD_Devolucao_e_Voucher',
-    'Demanda': 'Demanda',
-    'CD: Outras Demandas': 'CD_Outras_Demandas',
-    'Número da OS': 'Numero_da_OS',
-    'Prazo 1ª Cobrança': 'Prazo_1_Cobranca',
-    'Status de Assistência Técnica': 'Status_de_Assistencia_Tecnica',
-    'Plano de Ação OS Vencidas': 'Plano_de_Acao_OS_Vencidas',
-    'Plano de Ação Insatisfação Resultado de OS': 'Plano_de_Acao_Insatisfacao_Resultado_de_OS',
-    'Loja Física ou Loja Virtual': 'Loja_Fisica_ou_Loja_Virtual',
-    'Réplica?': 'Replica',
-    'Avaliação no RA?': 'Avaliacao_no_RA',
-    'Nota da Avaliação': 'Nota_da_Avaliacao',
-    'Coleta Solicitada Mais de uma Vez?': 'Coleta_Solicitada_Mais_de_uma_Vez',
-    'Status da Coleta': 'Status_da_Coleta',
-    'Cliente Reincidente?': 'Cliente_Reincidente',
-    'Caso 100% Resolvido no Atendimento Anterior?': 'Caso_Resolvido_no_Atendimento_Anterior',
-    'Sentimento': 'Sentimento',
-    # Colunas subdivididas
-    'via_channel': 'via_channel',
-    'via_from_name': 'via_from_name',
-    'via_from_address': 'via_from_address',
-    'via_from_ticket_id': 'via_from_ticket_id',
-    'via_from_subject': 'via_from_subject',
-    'via_to_name': 'via_to_name',
-    'via_to_address': 'via_to_address',
-    'via_rel': 'via_rel',
-    'satisfaction_score': 'satisfaction_score',
-    'satisfaction_comment': 'satisfaction_comment',
-    'satisfaction_reason': 'satisfaction_reason',
-    'satisfaction_reason_id': 'satisfaction_reason_id',
-    'satisfaction_id': 'satisfaction_id',
-    'Atribuido_Para': 'Atribuido_Para' 
-}
+# Colunas, tipos e chave de BD_TicketsSAC ficam no registro de tabelas.py
 
 # Função para inserir dados no banco de dados em batches
-def inserir_dados_no_banco(df, batch_size=1000):
+@medicao.medido('inserir_tickets', linhas='entrada')
+def inserir_dados_no_banco(df, batch_size=None):
     try:
-        conn_str = (
-            f"DRIVER={db_config['DRIVER']};"
-            f"SERVER={db_config['SERVER']};"
-            f"DATABASE={db_config['DATABASE']};"
-            f"UID={db_config['UID']};"
-            f"PWD={db_config['PWD']}"
-        )
-
-        conn = pyodbc.connect(conn_str)
-        cursor = conn.cursor()
-
-        # Filtra apenas as colunas mapeadas e que existem no DataFrame
-        colunas_validas = [col for col in column_mapping.keys() if col in df.columns]
-        
-        for start in range(0, len(df), batch_size):
-            batch = df.iloc[start:start + batch_size]
-            for _, row in batch.iterrows():
-                # Prepara os dados para inserção
-                data = {}
-                for col in colunas_validas:
-                    valor = row[col]
-                    
-                    # Converter dicionários em strings JSON
-                    if isinstance(valor, dict):
-                        valor = json.dumps(valor)
-                    
-                    # Tratar valores nulos
-                    if pd.isnull(valor):
-                        valor = None
-                    
-                    data[col] = valor
-
-                placeholders = ', '.join(['?'] * len(data))
-                columns = ', '.join([column_mapping[col] for col in data.keys()])
-                
-                # Nome correto da tabela
-                sql = f"INSERT INTO BD_TicketsSAC ({columns}) VALUES ({placeholders})"
-
-                try:
-                    cursor.execute(sql, list(data.values()))
-                except pyodbc.Error as e:
-                    print(f"Erro ao inserir o ticket ID {row.get('id', 'desconhecido')}: {e}")
-
-        conn.commit()
-        cursor.close()
-        conn.close()
+        # Só as colunas do registro que existem no DataFrame são gravadas, já convertidas pelo tipo
+        df = df.rename(columns=tabelas.mapeamento('BD_TicketsSAC'))
+
+        # Upsert pelo id do ticket: a versão mais recente (updated_at) substitui a gravada
+        with banco.conexao() as conn:
+            afetadas, rejeitadas = tabelas.mesclar(
+                conn, 'BD_TicketsSAC', df, tamanho_lote=batch_size or tamanho_lote,
+                descrever_linha=lambda linha: f"ticket ID {linha['id']}"
+            )
+        print(f'{afetadas} tickets inseridos/atualizados ({rejeitadas} com erro).')
+        return True
     except pyodbc.Error as e:
         print(f'Erro ao inserir dados no banco: {e}')
+        return False
 
 # Função principal para executar a extração de dados
 def executar_extracao(start_date, end_date, exportar_para_banco):
     try:
         print(f'Iniciando a extração de tickets de {start_date} até {end_date}...')
 
-        # Remover registros duplicados antes de iniciar a extração
-        remover_duplicados()
-
+        falhas = 0
         # Loop para buscar dia por dia
         while start_date < end_date:
             next_day = start_date + timedelta(days=1)
-            tickets_data = buscar_tickets_por_dia(start_date.strftime('%Y-%m-%d'), next_day.strftime('%Y-%m-%d'))
+            start, end = start_date.strftime('%Y-%m-%d'), next_day.strftime('%Y-%m-%d')
+            if exportar_para_banco and checkpoint.janela_concluida(PROCESSO_DIAS, start, end):
+                print(f'Dia {start} já concluído em execução anterior, pulando...')
+                start_date = next_day
+                continue
+
+            tickets_data = buscar_tickets_por_dia(start, end)
 
             # Processar e inserir dados ao fim de cada dia
             if tickets_data:
                 df = tratar_dados(tickets_data)
                 if exportar_para_banco:
                     print(f'Inserindo dados no banco de dados para o dia {start_date.strftime("%Y-%m-%d")}...')
-                    inserir_dados_no_banco(df)
+                    if not inserir_dados_no_banco(df):
+                        falhas += 1
+                    elif janela_fechada(end):
+                        checkpoint.marcar_janela_concluida(PROCESSO_DIAS, start, end)
                 else:
                     print(f'Exportando dados para o arquivo tickets_zendesk_{start_date.strftime("%Y-%m-%d")}.xlsx...')
                     df.to_excel(f'tickets_zendesk_{start_date.strftime("%Y-%m-%d")}.xlsx', index=False)
 
             start_date = next_day
 
-        # Remover registros duplicados após a inserção
-        remover_duplicados()
-
+        if exportar_para_banco and not falhas:
+            encerrar_janelas()
         print('Processo concluído com sucesso! 🚀')
     except Exception as e:
         print(f'Erro ao executar a extração: {e}')
@@ -408,7 +361,7 @@ def buscar_primeiro_ticket():
     
     try:
         print("Buscando o primeiro ticket registrado...")
-        response = requests.get(url, auth=auth)
+        response = zendesk_http.get(url)
         
         if response.status_code != 200:
             print(f'Erro ao buscar o primeiro ticket: {response.status_code}')
@@ -429,53 +382,337 @@ def buscar_primeiro_ticket():
             print("Nenhum ticket encontrado.")
             return None
 
-    except requests.RequestException as e:
+    except zendesk_http.ErroRequisicao as e:
         print(f'Erro na requisição: {e}')
         return None
 
 
-# Função para executar a extração em paralelo
-def executar_extracao_paralelo(start_date, end_date, exportar_para_banco):
+def carregar_cursor_incremental():
+    """
+    Lê o último cursor salvo da exportação incremental no checkpoint local.
+    Retorna None se ainda não houver cursor persistido.
+    """
     try:
-        num_workers = max(1, multiprocessing.cpu_count() - 1)
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            date_ranges = []
-            current_date = start_date
-            while current_date < end_date:
-                next_day = current_date + timedelta(days=1)
-                date_ranges.append((current_date.strftime('%Y-%m-%d'), next_day.strftime('%Y-%m-%d')))
-                current_date = next_day
-
-            # Submete tarefas e mapeia para suas datas
-            future_to_date = {
-                executor.submit(buscar_tickets_por_dia, start, end): (start, end)
-                for start, end in date_ranges
-            }
-
-            for future in as_completed(future_to_date):
-                start, end = future_to_date[future]
-                try:
-                    tickets_data = future.result()
-                    print(f"Tipo retornado por buscar_tickets_por_dia ({start} até {end}): {type(tickets_data)}")
+        return checkpoint.obter_cursor(PROCESSO_INCREMENTAL)
+    except Exception as e:
+        print(f'Erro ao ler o cursor incremental: {e}')
+        return None
 
-                    if tickets_data:
-                        df = tratar_dados(tickets_data)
+def salvar_cursor_incremental(after_cursor):
+    checkpoint.salvar_cursor(PROCESSO_INCREMENTAL, after_cursor)
+
+# Uma janela só é dada como concluída se já terminou (o dia de hoje ainda recebe tickets)
+def janela_fechada(end):
+    return end <= datetime.now(fuso_conta).strftime('%Y-%m-%d')
+
+# As janelas concluídas só servem para retomar uma execução interrompida: depois de uma
+# execução completa elas são apagadas, e a próxima rebusca os dias (tickets atualizados depois)
+def encerrar_janelas():
+    checkpoint.limpar_janelas(PROCESSO_DIAS)
+
+# Função para buscar tickets pela exportação incremental (paginação por cursor)
+def buscar_tickets_incrementais(start_time=None, cursor=None):
+    """
+    Percorre o endpoint /incremental/tickets/cursor.json página a página.
+    Começa pelo cursor informado ou, na falta dele, pelo start_time (unix).
+    Para cada página devolve (tickets, after_cursor, end_of_stream), para que
+    quem consome só persista o cursor depois de gravar os tickets da página.
+    """
+    base_url = 'https://bagaggio.zendesk.com/api/v2/incremental/tickets/cursor.json'
+    if cursor:
+        url = f'{base_url}?cursor={cursor}'
+    else:
+        url = f'{base_url}?start_time={int(start_time or 0)}'
+    page_count = 1
 
-                        if exportar_para_banco:
-                            print(f'Inserindo dados no banco de dados para o dia {start}...')
-                            inserir_dados_no_banco(df)
-                        else:
-                            print(f'Exportando dados para o arquivo tickets_zendesk_{start}.xlsx...')
-                            df.to_excel(f'tickets_zendesk_{start}.xlsx', index=False)
+    while url:
+        try:
+            print(f'Buscando exportação incremental - Página {page_count}...')
+            response = zendesk_http.get(url)
 
-                except Exception as e:
-                    print(f"❌ Erro ao processar dados de {start} a {end}: {e}")
+            if response.status_code != 200:
+                print(f'Erro ao buscar a página {page_count}: {response.status_code}')
+                print(f'Mensagem da API: {response.text}')
+                return
+
+            data = response.json()
+            tickets = data.get('tickets', [])
+            end_of_stream = data.get('end_of_stream', True)
+            print(f'Total de tickets nesta página: {len(tickets)}')
+            medicao.contar('linhas_buscadas', len(tickets))
+
+            yield tickets, data.get('after_cursor'), end_of_stream
+
+            url = None if end_of_stream else data.get('after_url')
+            page_count += 1
+        except zendesk_http.ErroRequisicao as e:
+            print(f'Erro ao fazer a requisição: {e}')
+            return
+
+# Função para executar a extração incremental a partir do cursor persistido
+def executar_extracao_incremental(exportar_para_banco, start_date=None, ignorar_cursor=False):
+    """
+    Puxa apenas os tickets alterados desde a última execução.
+    Sem cursor salvo (ou com ignorar_cursor=True) começa em start_date;
+    sem start_date faz o backfill completo desde o primeiro ticket.
+    Retorna True se a exportação chegou ao fim com todas as páginas gravadas.
+    """
+    try:
+        cursor = None if ignorar_cursor else carregar_cursor_incremental()
+        start_time = int(start_date.timestamp()) if start_date else 0
+        if cursor:
+            print('Retomando a exportação incremental a partir do cursor salvo...')
+        else:
+            print(f'Iniciando a exportação incremental a partir de {datetime.fromtimestamp(start_time)}...')
+
+        dfs_excel = []
+        total_tickets = 0
+        completo = False
+        for tickets, after_cursor, end_of_stream in buscar_tickets_incrementais(start_time=start_time, cursor=cursor):
+            gravado = True
+            if tickets:
+                df = tratar_dados(tickets)
+                if df.empty:
+                    # tratar_dados devolve vazio quando falha
+                    gravado = False
+                elif exportar_para_banco:
+                    print(f'Inserindo {len(df)} tickets no banco de dados...')
+                    gravado = inserir_dados_no_banco(df)
+                else:
+                    dfs_excel.append(df)
+                total_tickets += len(tickets)
+
+            # Só avança o cursor depois que a página foi gravada
+            if not gravado:
+                print('A página não foi gravada; o cursor não será avançado.')
+                break
+            if after_cursor and exportar_para_banco:
+                salvar_cursor_incremental(after_cursor)
+            completo = end_of_stream
+
+        if not exportar_para_banco and dfs_excel:
+            nome_arquivo = f'tickets_zendesk_incremental_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+            print(f'Exportando dados para o arquivo {nome_arquivo}...')
+            pd.concat(dfs_excel, ignore_index=True).to_excel(nome_arquivo, index=False)
+
+        if not completo:
+            print(f'Exportação incremental interrompida: {total_tickets} tickets processados. '
+                  f'A próxima execução retoma do último cursor salvo.')
+            return False
+        print(f'Exportação incremental concluída: {total_tickets} tickets processados. 🚀')
+        return True
+    except Exception as e:
+        print(f'Erro ao executar a extração incremental: {e}')
+        return False
+
+
+# Concorrência de cada estágio da extração em paralelo:
+# busca = threads aguardando a API (o limite real é o do endpoint de busca no zendesk_http),
+# tratamento = processos rodando tratar_dados, carga = gravadores (tamanho do pool de conexões do banco.py)
+concorrencia_pipeline = {
+    'busca': zendesk_http.limites_concorrencia['search'],
+    'tratamento': max(1, min(4, (os.cpu_count() or 2) - 1)),
+    'carga': 2,
+}
+
+# Dias aguardando em cada fila entre os estágios (limita a memória)
+tamanho_filas = {
+    'tratamento': 8,
+    'carga': 4,
+}
 
-        remover_duplicados()
+# Intervalo (segundos) entre as impressões da profundidade das filas
+intervalo_metricas = 15
+
+_FIM = None
+
+def _resumo_pipeline(metricas, amostras):
+    print('📊 Resumo do pipeline:')
+    for nome, profundidades in amostras.items():
+        if profundidades:
+            media = sum(profundidades) / len(profundidades)
+            print(f'   Fila {nome}: média {media:.1f}, máximo {max(profundidades)} de {tamanho_filas[nome]}')
+    for estagio, valores in metricas.items():
+        print(
+            f"   {estagio}: {valores['itens']} dia(s), {valores['falhas']} falha(s), ocioso {valores['ocioso']:.1f}s, "
+            f"bloqueado pela fila seguinte {valores['bloqueado']:.1f}s"
+        )
+    print('   Fila de tratamento cheia = tratamento é o gargalo; fila de carga cheia = banco é o gargalo; '
+          'ambas vazias = API é o gargalo.')
+
+# Função para executar a extração em paralelo
+def executar_extracao_paralelo(start_date, end_date, exportar_para_banco):
+    """
+    Extração em três estágios ligados por filas limitadas:
+      busca (threads) -> fila de tratamento -> tratar_dados (processos) -> fila de carga -> gravação (threads com conexões do pool)
+    Assim a gravação no banco não segura o consumo das buscas, e o tratamento
+    roda fora do GIL. Os gravadores não têm conexão própria: cada dia pega uma
+    conexão do pool do banco.py (banco.conexao()), limitado a concorrencia_pipeline['carga'].
+    Um dia só é marcado como concluído depois de gravado, e as marcas são
+    apagadas quando todos os dias da execução foram gravados.
+
+    Como o tratar_dados roda nos processos filhos, a medição dele (tempo e
+    linhas) não passa pelos contadores deste processo: os filhos gravam as
+    etapas no log do medicao, e elas só entram no resumo do medicao.finalizar()
+    quando ele relê esse log.
+    Retorna True se todos os dias foram buscados, tratados e gravados.
+    """
+    try:
+        date_ranges = []
+        current_date = start_date
+        while current_date < end_date:
+            next_day = current_date + timedelta(days=1)
+            date_ranges.append((current_date.strftime('%Y-%m-%d'), next_day.strftime('%Y-%m-%d')))
+            current_date = next_day
+
+        # Retoma de onde uma execução interrompida parou: dias já gravados nela são pulados
+        if exportar_para_banco:
+            pendentes = [(start, end) for start, end in date_ranges
+                         if not checkpoint.janela_concluida(PROCESSO_DIAS, start, end)]
+            if len(pendentes) < len(date_ranges):
+                print(f'{len(date_ranges) - len(pendentes)} dia(s) já concluído(s) em execução anterior, pulando...')
+            date_ranges = pendentes
+
+        fila_dias = queue.Queue()
+        for janela in date_ranges:
+            fila_dias.put(janela)
+
+        fila_tratamento = queue.Queue(maxsize=tamanho_filas['tratamento'])
+        fila_carga = queue.Queue(maxsize=tamanho_filas['carga'])
+        metricas = {estagio: {'itens': 0, 'falhas': 0, 'ocioso': 0.0, 'bloqueado': 0.0} for estagio in concorrencia_pipeline}
+        amostras = {'tratamento': [], 'carga': []}
+        lock_metricas = threading.Lock()
+        terminou = threading.Event()
+
+        def contar(estagio, campo, valor=1):
+            with lock_metricas:
+                metricas[estagio][campo] += valor
+
+        # put/get medindo quanto tempo o estágio ficou parado esperando a fila
+        def colocar(fila, item, estagio):
+            inicio = time.monotonic()
+            fila.put(item)
+            contar(estagio, 'bloqueado', time.monotonic() - inicio)
+
+        def retirar(fila, estagio):
+            inicio = time.monotonic()
+            item = fila.get()
+            contar(estagio, 'ocioso', time.monotonic() - inicio)
+            return item
+
+        def buscar():
+            while True:
+                try:
+                    start, end = fila_dias.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    tickets_data = buscar_tickets_por_dia(start, end)
+                except Exception as e:
+                    print(f"❌ Erro ao buscar dados de {start} a {end}: {e}")
+                    contar('busca', 'falhas')
+                    continue
+                contar('busca', 'itens')
+                if tickets_data:
+                    colocar(fila_tratamento, (start, end, tickets_data), 'busca')
+
+        def tratar(processos):
+            while True:
+                item = retirar(fila_tratamento, 'tratamento')
+                if item is _FIM:
+                    return
+                start, end, tickets_data = item
+                try:
+                    df = processos.submit(tratar_dados, tickets_data).result()
+                except Exception as e:
+                    print(f"❌ Erro ao tratar dados de {start} a {end}: {e}")
+                    contar('tratamento', 'falhas')
+                    continue
+                if df.empty:
+                    # tratar_dados devolve vazio quando falha (o dia tem tickets)
+                    print(f"❌ Tratamento de {start} a {end} não devolveu dados.")
+                    contar('tratamento', 'falhas')
+                    continue
+                contar('tratamento', 'itens')
+                colocar(fila_carga, (start, end, df), 'tratamento')
+
+        def gravar():
+            # Cada gravador pega uma conexão do pool do banco.py a cada dia
+            while True:
+                item = retirar(fila_carga, 'carga')
+                if item is _FIM:
+                    return
+                start, end, df = item
+                try:
+                    if exportar_para_banco:
+                        print(f'Inserindo dados no banco de dados para o dia {start}...')
+                        if not inserir_dados_no_banco(df):
+                            contar('carga', 'falhas')
+                            continue
+                        if janela_fechada(end):
+                            checkpoint.marcar_janela_concluida(PROCESSO_DIAS, start, end)
+                    else:
+                        print(f'Exportando dados para o arquivo tickets_zendesk_{start}.xlsx...')
+                        df.to_excel(f'tickets_zendesk_{start}.xlsx', index=False)
+                except Exception as e:
+                    print(f"❌ Erro ao gravar dados de {start} a {end}: {e}")
+                    contar('carga', 'falhas')
+                    continue
+                contar('carga', 'itens')
+
+        def monitorar():
+            while not terminou.wait(intervalo_metricas):
+                profundidade_tratamento, profundidade_carga = fila_tratamento.qsize(), fila_carga.qsize()
+                amostras['tratamento'].append(profundidade_tratamento)
+                amostras['carga'].append(profundidade_carga)
+                print(
+                    f"📊 Filas: tratamento {profundidade_tratamento}/{tamanho_filas['tratamento']}, "
+                    f"carga {profundidade_carga}/{tamanho_filas['carga']} | "
+                    f"dias buscados {metricas['busca']['itens']}, tratados {metricas['tratamento']['itens']}, "
+                    f"gravados {metricas['carga']['itens']} de {len(date_ranges)}"
+                )
+
+        def iniciar(alvo, quantidade, nome, *args):
+            threads = [threading.Thread(target=alvo, args=args, name=f'{nome}-{n}', daemon=True) for n in range(quantidade)]
+            for thread in threads:
+                thread.start()
+            return threads
+
+        banco.configurar_pool(concorrencia_pipeline['carga'])
+        threading.Thread(target=monitorar, name='metricas-pipeline', daemon=True).start()
+        try:
+            with ProcessPoolExecutor(max_workers=concorrencia_pipeline['tratamento']) as processos:
+                gravadores = iniciar(gravar, concorrencia_pipeline['carga'], 'carga')
+                tratadores = iniciar(tratar, concorrencia_pipeline['tratamento'], 'tratamento', processos)
+                buscadores = iniciar(buscar, concorrencia_pipeline['busca'], 'busca')
+
+                # Cada estágio termina quando o anterior acabou e a fila esvaziou
+                for thread in buscadores:
+                    thread.join()
+                for _ in tratadores:
+                    fila_tratamento.put(_FIM)
+                for thread in tratadores:
+                    thread.join()
+            for _ in gravadores:
+                fila_carga.put(_FIM)
+            for thread in gravadores:
+                thread.join()
+        finally:
+            terminou.set()
+            _resumo_pipeline(metricas, amostras)
+
+        falhas = sum(valores['falhas'] for valores in metricas.values())
+        if falhas:
+            print(f'⚠️ {falhas} dia(s) não foram gravados; os já gravados serão pulados na próxima execução.')
+            return False
+        if exportar_para_banco:
+            encerrar_janelas()
         print('Processo concluído com sucesso! 🚀')
+        return True
 
     except Exception as e:
         print(f'Erro ao executar a extração em paralelo: {e}')
+        return False
 
 
 def menu():
@@ -486,6 +723,9 @@ def menu():
         print("4. Rodar para um intervalo de datas")
         print("5. Descobrir o primeiro ticket registrado")  # Nova opção
         print("6. Exportar para Excel")  # Nova opção
+        print("7. Rodar a exportação incremental (a partir do último cursor)")
+        print("8. Backfill completo pela exportação incremental")
+        print("9. Remover duplicados antigos da tabela (varredura completa)")
         
         opcao = '2'
         #opcao = input("Digite o número da opção desejada: ")
@@ -517,6 +757,14 @@ def menu():
             start_date = datetime.strptime(start_date_input, '%Y-%m-%d')
             end_date = datetime.strptime(end_date_input, '%Y-%m-%d') + timedelta(days=1)
             executar_extracao_paralelo(start_date, end_date, exportar_para_banco=False)
+        elif opcao == '7':
+            # Sem cursor salvo, a primeira execução começa em D-1
+            start_date = datetime.now() - timedelta(days=1)
+            executar_extracao_incremental(exportar_para_banco=True, start_date=start_date)
+        elif opcao == '8':
+            executar_extracao_incremental(exportar_para_banco=True, ignorar_cursor=True)
+        elif opcao == '9':
+            remover_duplicados()
         else:
             print("Opção inválida!")
 
@@ -524,4 +772,9 @@ def menu():
         print(f'Erro no menu: {e}')
 
 if __name__ == "__main__":
-    menu()
\ No newline at end of file
+    try:
+        menu()
+    finally:
+        zendesk_http.fechar()
+        banco.fechar()
+        medicao.finalizar()
\ No newline at end of file
@@ -0,0 +1,286 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from urllib.parse import urlparse
+import httpx
+import medicao
+
+"""
+Camada HTTP compartilhada para a API do Zendesk.
+Mantém um único httpx.AsyncClient (conexões keep-alive reaproveitadas)
+rodando num event loop em segundo plano, com limite de requisições
+simultâneas por endpoint. As threads dos scripts usam a função síncrona
+get(); código assíncrono pode aguardar requisitar() diretamente.
+
+Todas as requisições passam por baldes de tokens (um da conta e um por
+endpoint) que se ajustam pelos cabeçalhos de rate limit das respostas.
+429 e 5xx são repetidos com backoff exponencial com jitter, respeitando
+o Retry-After, e a pausa vale para todas as threads ao mesmo tempo.
+"""
+
+# Origem das requisições; ZENDESK_URL_BASE (ex: http://127.0.0.1:8080) manda todas
+# as URLs da API para outro servidor, como o servidor local do benchmark.py
+url_base = os.getenv('ZENDESK_URL_BASE')
+
+# Exceção levantada em falhas de rede/protocolo
+ErroRequisicao = httpx.HTTPError
+
+# Requisições simultâneas permitidas por endpoint
+limites_concorrencia = {
+    'search': 8,
+    'incremental': 2,
+    'activities': 4,
+    'outros': 4,
+}
+
+# Tamanho do pool de conexões keep-alive
+max_conexoes = sum(limites_concorrencia.values())
+
+# Requisições por minuto assumidas até a API informar o limite real nos cabeçalhos
+limites_por_minuto = {
+    'conta': 400,
+    'incremental': 10,
+}
+
+# Repetições para 429/5xx/falhas de rede e teto do backoff (segundos)
+max_tentativas = 6
+backoff_base = 1.0
+backoff_maximo = 60.0
+
+_loop = None
+_cliente = None
+_semaforos = {}
+_baldes = {}
+_lock = threading.Lock()
+
+def configurar_concorrencia(endpoint, limite):
+    """
+    Muda quantas requisições simultâneas o endpoint ('search', 'incremental',
+    'activities' ou 'outros') aceita. Chamar antes da primeira requisição:
+    o cliente e os semáforos são criados com os limites daquele momento.
+    """
+    global max_conexoes
+    limites_concorrencia[endpoint] = max(1, int(limite))
+    max_conexoes = sum(limites_concorrencia.values())
+
+def _endpoint(url):
+    caminho = urlparse(url).path
+    if '/incremental/' in caminho:
+        return 'incremental'
+    if caminho.endswith('/search.json') or caminho.endswith('/search'):
+        return 'search'
+    if '/activities' in caminho:
+        return 'activities'
+    return 'outros'
+
+def _redirecionar(url):
+    if not url_base:
+        return url
+    base = urlparse(url_base)
+    return urlparse(url)._replace(scheme=base.scheme, netloc=base.netloc).geturl()
+
+def _obter_loop():
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='zendesk-http', daemon=True).start()
+            _loop = loop
+    return _loop
+
+def _obter_cliente():
+    # Só é chamado dentro do event loop, então não precisa de lock
+    global _cliente
+    if _cliente is None:
+        email_address = os.getenv('ZENDESK_EMAIL')
+        api_token = os.getenv('ZENDESK_TOKEN', '')
+        _cliente = httpx.AsyncClient(
+            auth=(f'{email_address}/token', api_token),
+            limits=httpx.Limits(max_connections=max_conexoes, max_keepalive_connections=max_conexoes),
+            timeout=httpx.Timeout(60.0),
+        )
+    return _cliente
+
+def _obter_semaforo(endpoint):
+    if endpoint not in _semaforos:
+        _semaforos[endpoint] = asyncio.Semaphore(limites_concorrencia.get(endpoint, limites_concorrencia['outros']))
+    return _semaforos[endpoint]
+
+############################################################
+#                  LIMITADOR (TOKEN BUCKET)                #
+############################################################
+
+def _obter_balde(nome):
+    if nome not in _baldes:
+        por_minuto = limites_por_minuto[nome]
+        _baldes[nome] = {
+            'capacidade': por_minuto,
+            'taxa': por_minuto / 60.0,  # tokens por segundo
+            'tokens': float(por_minuto),
+            'atualizado': time.monotonic(),
+            'pausa_ate': 0.0,
+        }
+    return _baldes[nome]
+
+def _baldes_da_requisicao(endpoint):
+    nomes = ['conta']
+    if endpoint in limites_por_minuto:
+        nomes.append(endpoint)
+    return [_obter_balde(nome) for nome in nomes]
+
+def _reabastecer(balde, agora):
+    decorrido = agora - balde['atualizado']
+    balde['tokens'] = min(balde['capacidade'], balde['tokens'] + decorrido * balde['taxa'])
+    balde['atualizado'] = agora
+
+async def _aguardar_vez(baldes):
+    """
+    Espera até que todos os baldes tenham um token livre e o consome.
+    Como tudo roda no mesmo event loop, o ritmo vale para todas as threads.
+    """
+    while True:
+        agora = time.monotonic()
+        espera = max(balde['pausa_ate'] - agora for balde in baldes)
+        if espera <= 0:
+            for balde in baldes:
+                _reabastecer(balde, agora)
+            faltando = [(1 - balde['tokens']) / balde['taxa'] for balde in baldes if balde['tokens'] < 1]
+            if not faltando:
+                for balde in baldes:
+                    balde['tokens'] -= 1
+                return
+            espera = max(faltando)
+        await asyncio.sleep(espera)
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+def _ajustar_balde(balde, limite, restante, reset):
+    agora = time.monotonic()
+    if limite:
+        balde['capacidade'] = limite
+        balde['taxa'] = limite / 60.0
+    if restante is not None:
+        _reabastecer(balde, agora)
+        balde['tokens'] = min(balde['tokens'], restante)
+        if restante <= 0 and reset:
+            balde['pausa_ate'] = max(balde['pausa_ate'], agora + reset)
+
+def _atualizar_limites(endpoint, headers):
+    """
+    Ajusta os baldes pelos cabeçalhos de rate limit da resposta:
+    X-Rate-Limit / ratelimit-* para a conta e
+    Zendesk-RateLimit-<endpoint>: total=..; remaining=..; resets=.. para o endpoint.
+    """
+    _ajustar_balde(
+        _obter_balde('conta'),
+        _numero(headers.get('x-rate-limit') or headers.get('ratelimit-limit')),
+        _numero(headers.get('x-rate-limit-remaining') or headers.get('ratelimit-remaining')),
+        _numero(headers.get('ratelimit-reset')),
+    )
+
+    if endpoint not in limites_por_minuto:
+        return
+    for nome, valor in headers.items():
+        if not nome.lower().startswith('zendesk-ratelimit-'):
+            continue
+        campos = dict(
+            parte.strip().split('=', 1) for parte in valor.split(';') if '=' in parte
+        )
+        _ajustar_balde(
+            _obter_balde(endpoint),
+            _numero(campos.get('total')),
+            _numero(campos.get('remaining')),
+            _numero(campos.get('resets')),
+        )
+
+def _pausar(baldes, segundos):
+    pausa_ate = time.monotonic() + segundos
+    for balde in baldes:
+        balde['pausa_ate'] = max(balde['pausa_ate'], pausa_ate)
+
+def _backoff(tentativa):
+    # Backoff exponencial com jitter, para as threads não voltarem todas juntas
+    teto = min(backoff_maximo, backoff_base * (2 ** tentativa))
+    return teto / 2 + random.uniform(0, teto / 2)
+
+async def requisitar(url, params=None):
+    """
+    Faz um GET autenticado respeitando o limitador e o limite de concorrência
+    do endpoint. 429, 5xx e falhas de rede são repetidos até max_tentativas.
+    Retorna o httpx.Response (status_code, headers, text, json());
+    se as tentativas acabarem, retorna a última resposta recebida.
+    """
+    url = _redirecionar(url)
+    endpoint = _endpoint(url)
+    baldes = _baldes_da_requisicao(endpoint)
+
+    for tentativa in range(max_tentativas + 1):
+        ultima = tentativa == max_tentativas
+        await _aguardar_vez(baldes)
+        if tentativa:
+            medicao.contar('repeticoes')
+        medicao.contar('http')
+        try:
+            async with _obter_semaforo(endpoint):
+                response = await _obter_cliente().get(url, params=params)
+        except httpx.TransportError as e:
+            if ultima:
+                raise
+            espera = _backoff(tentativa)
+            print(f'⚠️ Falha de rede ({e}). Nova tentativa em {espera:.1f}s...')
+            await asyncio.sleep(espera)
+            continue
+
+        _atualizar_limites(endpoint, response.headers)
+
+        if response.status_code == 429:
+            medicao.contar('respostas_429')
+        if response.status_code == 429 and not ultima:
+            retry_after = _numero(response.headers.get('retry-after'))
+            espera = retry_after + random.uniform(0, 1) if retry_after is not None else _backoff(tentativa)
+            print(f'⏳ Limite da API atingido (429). Pausando as requisições por {espera:.1f}s...')
+            _pausar(baldes, espera)
+            continue
+
+        if response.status_code >= 500 and not ultima:
+            espera = _backoff(tentativa)
+            print(f'⚠️ Erro {response.status_code} da API. Nova tentativa em {espera:.1f}s...')
+            await asyncio.sleep(espera)
+            continue
+
+        medicao.contar('bytes', len(response.content))
+        if response.status_code == 200:
+            medicao.contar('paginas')
+        return response
+
+def executar(coroutine):
+    """
+    Executa uma coroutine no event loop compartilhado e aguarda o resultado.
+    Pode ser chamada de qualquer thread.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _obter_loop()).result()
+
+def get(url, params=None):
+    return executar(requisitar(url, params))
+
+def fechar():
+    """
+    Fecha o cliente e encerra o event loop (chamar no fim da execução).
+    """
+    global _loop, _cliente
+    with _lock:
+        if _loop is None:
+            return
+        if _cliente is not None:
+            asyncio.run_coroutine_threadsafe(_cliente.aclose(), _loop).result()
+            _cliente = None
+        _semaforos.clear()
+        _baldes.clear()
+        _loop.call_soon_threadsafe(_loop.stop)
+        _loop = None